@@ -15,6 +15,7 @@ from sentry.api.serializers import serialize
 from sentry.api.serializers.models.release_file import decode_release_file_id
 from sentry.models import Release, ReleaseFile
 from sentry.models.distribution import Distribution
+from sentry.models.file import DOWNLOAD_READ_AHEAD
 from sentry.models.releasefile import delete_from_artifact_index, read_artifact_index
 
 #: Cannot update release artifacts in release archives
@@ -49,7 +50,7 @@ class ReleaseFileDetailsMixin:
     @staticmethod
     def download(releasefile):
         file = releasefile.file
-        fp = file.getfile()
+        fp = file.getfile(read_ahead=DOWNLOAD_READ_AHEAD)
         response = FileResponse(
             fp,
             content_type=file.headers.get("content-type", "application/octet-stream"),
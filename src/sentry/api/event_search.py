@@ -10,6 +10,7 @@ from parsimonious.expressions import Optional
 from parsimonious.grammar import Grammar, NodeVisitor
 from parsimonious.nodes import Node
 
+from sentry import options
 from sentry.search.events.constants import (
     OPERATOR_NEGATION_MAP,
     SEARCH_MAP,
@@ -29,6 +30,7 @@ from sentry.search.utils import (
     parse_percentage,
 )
 from sentry.utils.compat import filter, map
+from sentry.utils.lru import LRUCache
 from sentry.utils.snuba import is_duration_measurement, is_measurement, is_span_op_breakdown
 from sentry.utils.validators import is_event_id
 
@@ -1037,12 +1039,29 @@ default_config = SearchConfig(
 )
 
 
+# Parse trees of recently seen queries. Only the trees are cached, since the
+# visitor output depends on the config and params, as well as on the current
+# time for relative dates. Trees are never modified by visitors.
+_parse_cache = LRUCache(
+    lambda: options.get("search.parse-cache-size"), metrics_key="search.parse_cache"
+)
+
+
 def parse_search_query(query, config=None, params=None) -> Sequence[SearchFilter]:
     if config is None:
         config = default_config
 
+    tree = _parse_cache.get(query)
+    if tree is None:
+        tree = _parse_query(query)
+        _parse_cache.set(query, tree)
+
+    return SearchVisitor(config, params=params).visit(tree)
+
+
+def _parse_query(query) -> Node:
     try:
-        tree = event_search_grammar.parse(query)
+        return event_search_grammar.parse(query)
     except IncompleteParseError as e:
         idx = e.column()
         prefix = query[max(0, idx - 5) : idx]
@@ -1053,4 +1072,3 @@ def parse_search_query(query, config=None, params=None) -> Sequence[SearchFilter
                 "This is commonly caused by unmatched parentheses. Enclose any text in double quotes.",
             )
         )
-    return SearchVisitor(config, params=params).visit(tree)
@@ -0,0 +1,7 @@
+from sentry.bgtasks.api import bgtask
+from sentry.models.file import fileblob_cache
+
+
+@bgtask()
+def clean_fileblobcache():
+    fileblob_cache.clear_old_entries()
@@ -1,6 +1,8 @@
 import logging
+import operator
+from functools import reduce
 
-from django.db.models import F
+from django.db.models import F, Q
 
 from sentry.signals import buffer_incr_complete
 from sentry.tasks.process_buffer import process_incr
@@ -82,3 +84,43 @@ class Buffer(Service, metaclass=BufferMount):
             created=created,
             sender=model,
         )
+
+    def process_batch(self, model, columns, filters_list):
+        """
+        Increments ``columns`` by the same amounts on every row of ``model``
+        matched by one of ``filters_list``, using a single UPDATE statement.
+
+        Rows that do not exist yet are left alone and their filters are
+        returned, so that the caller can create them through ``process``.
+        All filters need to have the same keys.
+        """
+        filter_keys = sorted(filters_list[0])
+
+        def make_lookup(filters_list):
+            return reduce(operator.or_, (Q(**filters) for filters in filters_list))
+
+        existing = set(model.objects.filter(make_lookup(filters_list)).values_list(*filter_keys))
+        found = []
+        missing = []
+        for filters in filters_list:
+            if tuple(filters[k] for k in filter_keys) in existing:
+                found.append(filters)
+            else:
+                missing.append(filters)
+
+        if found:
+            model.objects.filter(make_lookup(found)).update(
+                **{c: F(c) + v for c, v in columns.items()}
+            )
+
+        for filters in found:
+            buffer_incr_complete.send_robust(
+                model=model,
+                columns=columns,
+                filters=filters,
+                extra={},
+                created=False,
+                sender=model,
+            )
+
+        return missing
@@ -1,12 +1,15 @@
 import pickle
 import threading
+from collections import defaultdict
 from datetime import datetime
 from time import time
 
+import msgpack
 from django.db import models
 from django.utils import timezone
 from django.utils.encoding import force_bytes, force_text
 
+from sentry import options
 from sentry.buffer import Buffer
 from sentry.exceptions import InvalidConfiguration
 from sentry.tasks.process_buffer import process_incr, process_pending
@@ -14,11 +17,17 @@ from sentry.utils import json, metrics
 from sentry.utils.compat import crc32
 from sentry.utils.hashlib import md5_text
 from sentry.utils.imports import import_string
-from sentry.utils.redis import get_cluster_from_options
+from sentry.utils.redis import get_cluster_from_options, load_script
+
+clear_applied = load_script("buffer/clear.lua")
 
 _local_buffers = None
 _local_buffers_lock = threading.Lock()
 
+# Payloads in the compact encoding start with a version byte, which can be
+# told apart from the first byte of both JSON and pickle payloads.
+COMPACT_ENCODING_V1 = b"\x01"
+
 
 class PendingBuffer:
     def __init__(self, size):
@@ -51,12 +60,16 @@ class RedisBuffer(Buffer):
     key_expire = 60 * 60  # 1 hour
     pending_key = "b:p"
 
-    def __init__(self, pending_partitions=1, incr_batch_size=2, **options):
+    def __init__(
+        self, pending_partitions=1, incr_batch_size=2, pending_chunk_size=10000, **options
+    ):
         self.cluster, options = get_cluster_from_options("SENTRY_BUFFER_OPTIONS", options)
         self.pending_partitions = pending_partitions
         self.incr_batch_size = incr_batch_size
+        self.pending_chunk_size = pending_chunk_size
         assert self.pending_partitions > 0
         assert self.incr_batch_size > 0
+        assert self.pending_chunk_size > 0
 
     def validate(self):
         try:
@@ -142,6 +155,26 @@ class RedisBuffer(Buffer):
         else:
             raise TypeError(f"invalid type: {type_}")
 
+    def _encode(self, value):
+        """
+        Encodes filters and extra values. Once ``buffer.compact-encoding`` is
+        enabled, values are written as msgpack with a version prefix, and only
+        values msgpack can not represent (e.g. model instances or query
+        expressions) are still pickled.
+        """
+        if options.get("buffer.compact-encoding"):
+            try:
+                return COMPACT_ENCODING_V1 + msgpack.packb(value, use_bin_type=True, datetime=True)
+            except (TypeError, ValueError, OverflowError):
+                metrics.incr("buffer.encode.pickle-fallback", skip_internal=True)
+        return pickle.dumps(value)
+
+    def _decode(self, payload):
+        if payload.startswith(COMPACT_ENCODING_V1):
+            return msgpack.unpackb(payload[1:], raw=False, timestamp=3, strict_map_key=False)
+        # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
+        return pickle.loads(payload)
+
     def incr(self, model, columns, filters, extra=None, signal_only=None):
         """
         Increment the key by doing the following:
@@ -163,10 +196,7 @@ class RedisBuffer(Buffer):
 
         pipe = conn.pipeline()
         pipe.hsetnx(key, "m", f"{model.__module__}.{model.__name__}")
-        # TODO(dcramer): once this goes live in production, we can kill the pickle path
-        # (this is to ensure a zero downtime deploy where we can transition event processing)
-        pipe.hsetnx(key, "f", pickle.dumps(filters))
-        # pipe.hsetnx(key, 'f', json.dumps(self._dump_values(filters)))
+        pipe.hsetnx(key, "f", self._encode(filters))
         for column, amount in columns.items():
             pipe.hincrby(key, "i+" + column, amount)
 
@@ -175,10 +205,7 @@ class RedisBuffer(Buffer):
             # hook here
             # e.g. "update score if last_seen or times_seen is changed"
             for column, value in extra.items():
-                # TODO(dcramer): once this goes live in production, we can kill the pickle path
-                # (this is to ensure a zero downtime deploy where we can transition event processing)
-                pipe.hset(key, "e+" + column, pickle.dumps(value))
-                # pipe.hset(key, 'e+' + column, json.dumps(self._dump_value(value)))
+                pipe.hset(key, "e+" + column, self._encode(value))
 
         if signal_only is True:
             pipe.hset(key, "s", "1")
@@ -214,25 +241,40 @@ class RedisBuffer(Buffer):
 
         try:
             keycount = 0
-            with self.cluster.all() as conn:
-                results = conn.zrange(pending_key, 0, -1)
-
-            with self.cluster.all() as conn:
-                for host_id, keys in results.value.items():
-                    if not keys:
-                        continue
-                    keycount += len(keys)
-                    for key in keys:
+            oldest = None
+            for host_id in self.cluster.hosts:
+                conn = self.cluster.get_local_client(host_id)
+                # Only drain what is pending right now, keys that are added
+                # while we are at it are picked up by the next run.
+                remaining = conn.zcard(pending_key)
+                # Stream the pending keys in chunks instead of loading the
+                # whole set into memory at once.
+                while remaining > 0:
+                    items = conn.zrange(
+                        pending_key, 0, min(remaining, self.pending_chunk_size) - 1, withscores=True
+                    )
+                    if not items:
+                        break
+                    remaining -= len(items)
+                    keycount += len(items)
+                    keys = []
+                    for key, score in items:
+                        keys.append(key)
+                        if oldest is None or score < oldest:
+                            oldest = score
                         pending_buffer.append(key.decode("utf-8"))
                         if pending_buffer.full():
                             process_incr.apply_async(kwargs={"batch_keys": pending_buffer.flush()})
-                    conn.target([host_id]).zrem(pending_key, *keys)
+                    conn.zrem(pending_key, *keys)
 
             # queue up remainder of pending keys
             if not pending_buffer.empty():
                 process_incr.apply_async(kwargs={"batch_keys": pending_buffer.flush()})
 
             metrics.timing("buffer.pending-size", keycount)
+            if oldest is not None:
+                # Time since the oldest pending key was last incremented.
+                metrics.timing("buffer.flush-lag", time() - oldest)
         finally:
             client.delete(lock_key)
 
@@ -243,65 +285,178 @@ class RedisBuffer(Buffer):
         if key is not None:
             batch_keys = [key]
 
-        for key in batch_keys:
-            self._process_single_incr(key)
+        # the same key may have been queued more than once
+        batch_keys = list(dict.fromkeys(batch_keys))
 
-    def _process_single_incr(self, key):
-        client = self.cluster.get_routing_client()
-        lock_key = self._make_lock_key(key)
         # prevent a stampede due to the way we use celery etas + duplicate
         # tasks
-        if not client.set(lock_key, "1", nx=True, ex=10):
-            metrics.incr("buffer.revoked", tags={"reason": "locked"}, skip_internal=False)
-            self.logger.debug("buffer.revoked.locked", extra={"redis_key": key})
-            return
+        with self.cluster.map() as conn:
+            locks = {
+                key: conn.set(self._make_lock_key(key), "1", nx=True, ex=10) for key in batch_keys
+            }
+
+        locked_keys = []
+        for key, result in locks.items():
+            if result.value:
+                locked_keys.append(key)
+            else:
+                metrics.incr("buffer.revoked", tags={"reason": "locked"}, skip_internal=False)
+                self.logger.debug("buffer.revoked.locked", extra={"redis_key": key})
 
-        pending_key = self._make_pending_key_from_key(key)
+        if not locked_keys:
+            return
 
         try:
-            conn = self.cluster.get_local_client_for_key(key)
-            pipe = conn.pipeline()
-            pipe.hgetall(key)
-            pipe.zrem(pending_key, key)
-            pipe.delete(key)
-            values = pipe.execute()[0]
+            self._process_keys(locked_keys)
+        finally:
+            with self.cluster.map() as conn:
+                for key in locked_keys:
+                    conn.delete(self._make_lock_key(key))
+
+    def _keys_by_host(self, keys):
+        router = self.cluster.get_router()
+        keys_by_host = defaultdict(list)
+        for key in keys:
+            keys_by_host[router.get_host_for_key(key)].append(key)
+        return keys_by_host
+
+    def _read(self, keys):
+        """
+        Reads the hashes of all given keys, using one round trip per host.
+        """
+        values = {}
+        for host_id, host_keys in self._keys_by_host(keys).items():
+            pipe = self.cluster.get_local_client(host_id).pipeline(transaction=False)
+            for key in host_keys:
+                pipe.hgetall(key)
+            values.update(zip(host_keys, pipe.execute()))
+        return values
+
+    def _finish(self, applied, failed):
+        """
+        Removes the increments that have been applied from their hashes, with
+        one script call per host, and queues the keys that failed to apply
+        again. ``applied`` maps keys to the hashes that were read from them.
+        """
+        for host_id, host_keys in self._keys_by_host(applied).items():
+            keys = []
+            args = []
+            for key in host_keys:
+                keys.extend((key, self._make_pending_key_from_key(key)))
+                args.append(len(applied[key]))
+                for field, value in applied[key].items():
+                    args.extend((field, value))
+            clear_applied(self.cluster.get_local_client(host_id), keys, args)
+
+        for host_id, host_keys in self._keys_by_host(failed).items():
+            pipe = self.cluster.get_local_client(host_id).pipeline(transaction=False)
+            for key in host_keys:
+                pipe.zadd(self._make_pending_key_from_key(key), {key: time()})
+            pipe.execute()
+
+    def _process_keys(self, keys):
+        # A hash is only cleared once its increments are applied, so that a
+        # failing key is retried instead of being lost. A failing key does not
+        # stop the remaining ones, and the first error is raised once all keys
+        # have been processed.
+        hashes = self._read(keys)
+        applied = {}
+        failed = []
+        errors = []
+
+        def apply(keys, function, *args):
+            try:
+                rv = function(*args)
+            except Exception as e:
+                metrics.incr("buffer.process.failed", amount=len(keys), skip_internal=False)
+                if errors:
+                    self.logger.exception("buffer.process.failed", extra={"redis_keys": keys})
+                errors.append(e)
+                failed.extend(keys)
+                return None
+            applied.update((key, hashes[key]) for key in keys)
+            return rv
+
+        # Increments that only touch counters and are keyed by plain values
+        # can be applied with one UPDATE per model and set of increments. All
+        # other ones are applied row by row.
+        rows = []
+        batches = defaultdict(list)
+        for key, values in hashes.items():
+            if not values:
+                metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
+                self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
+                continue
 
             # XXX(python3): In python2 this isn't as important since redis will
             # return string tyes (be it, byte strings), but in py3 we get bytes
             # back, and really we just want to deal with keys as strings.
             values = {force_text(k): v for k, v in values.items()}
 
-            if not values:
-                metrics.incr("buffer.revoked", tags={"reason": "empty"}, skip_internal=False)
-                self.logger.debug("buffer.revoked.empty", extra={"redis_key": key})
-                return
-
-            # XXX(py3): Note that ``import_string`` explicitly wants a str in
-            # python2, so we'll decode (for python3) and then translate back to
-            # a byte string (in python2) for import_string.
-            model = import_string(str(values.pop("m").decode("utf-8")))  # NOQA
-
-            if values["f"].startswith(b"{"):
-                filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
+            model, incr_values, filters, extra_values, signal_only = self._load_incr(values)
+            if (
+                incr_values
+                and not extra_values
+                and not signal_only
+                and issubclass(model, models.Model)
+                and all(isinstance(v, (int, str)) for v in filters.values())
+            ):
+                batch_key = (model, tuple(sorted(filters)), tuple(sorted(incr_values.items())))
+                batches[batch_key].append((key, filters))
             else:
-                # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                filters = pickle.loads(values.pop("f"))
-
-            incr_values = {}
-            extra_values = {}
-            signal_only = None
-            for k, v in values.items():
-                if k.startswith("i+"):
-                    incr_values[k[2:]] = int(v)
-                elif k.startswith("e+"):
-                    if v.startswith(b"["):
-                        extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
-                    else:
-                        # TODO(dcramer): legacy pickle support - remove in Sentry 9.1
-                        extra_values[k[2:]] = pickle.loads(v)
-                elif k == "s":
-                    signal_only = bool(int(v))  # Should be 1 if set
-
-            super().process(model, incr_values, filters, extra_values, signal_only)
-        finally:
-            client.delete(lock_key)
+                rows.append((key, model, incr_values, filters, extra_values, signal_only))
+
+        for key, *args in rows:
+            apply([key], super().process, *args)
+
+        for (model, _, incr_values), batch in batches.items():
+            incr_values = dict(incr_values)
+            metrics.timing(
+                "buffer.process-batch.rows",
+                len(batch),
+                tags={"module": model.__module__, "model": model.__name__},
+            )
+            missing = apply(
+                [key for key, _ in batch],
+                self.process_batch,
+                model,
+                incr_values,
+                [filters for _, filters in batch],
+            )
+            # rows that do not exist yet need to be created one by one
+            for key, filters in batch:
+                if missing and filters in missing:
+                    del applied[key]
+                    apply([key], super().process, model, incr_values, filters, {}, None)
+
+        self._finish(applied, failed)
+
+        if errors:
+            raise errors[0]
+
+    def _load_incr(self, values):
+        # XXX(py3): Note that ``import_string`` explicitly wants a str in
+        # python2, so we'll decode (for python3) and then translate back to
+        # a byte string (in python2) for import_string.
+        model = import_string(str(values.pop("m").decode("utf-8")))  # NOQA
+
+        if values["f"].startswith(b"{"):
+            filters = self._load_values(json.loads(values.pop("f").decode("utf-8")))
+        else:
+            filters = self._decode(values.pop("f"))
+
+        incr_values = {}
+        extra_values = {}
+        signal_only = None
+        for k, v in values.items():
+            if k.startswith("i+"):
+                incr_values[k[2:]] = int(v)
+            elif k.startswith("e+"):
+                if v.startswith(b"["):
+                    extra_values[k[2:]] = self._load_value(json.loads(v.decode("utf-8")))
+                else:
+                    extra_values[k[2:]] = self._decode(v)
+            elif k == "s":
+                signal_only = bool(int(v))  # Should be 1 if set
+
+        return model, incr_values, filters, extra_values, signal_only
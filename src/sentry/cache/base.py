@@ -38,6 +38,25 @@ class BaseCache(local):
     def get(self, key, version=None, raw=False):
         raise NotImplementedError
 
+    def get_many(self, keys, version=None, raw=False):
+        """
+        Fetch several keys at once, returning a list of values (or ``None``
+        for missing keys) in the same order as ``keys``.
+        """
+        return [self.get(key, version=version, raw=raw) for key in keys]
+
+    def set_many(self, items, version=None, raw=False):
+        """
+        Set several keys at once. ``items`` is a sequence of ``(key, value,
+        timeout)`` triples.
+        """
+        for key, value, timeout in items:
+            self.set(key, value, timeout, version=version, raw=raw)
+
+    def delete_many(self, keys, version=None):
+        for key in keys:
+            self.delete(key, version=version)
+
     def _mark_transaction(self, op):
         """
         Mark transaction with a tag so we can identify system components that rely
@@ -16,11 +16,31 @@ class CommonRedisCache(BaseCache):
         self.client = client
         BaseCache.__init__(self, **options)
 
-    def set(self, key, value, timeout, version=None, raw=False):
-        key = self.make_key(key, version=version)
+    def _execute_many(self, commands):
+        """
+        Execute a sequence of ``(command, *args)`` tuples in as few round
+        trips as the client allows, returning their results in order.
+        """
+        with self.client.pipeline(transaction=False) as pipe:
+            for command, *args in commands:
+                getattr(pipe, command)(*args)
+            return pipe.execute()
+
+    def _encode(self, key, value, raw):
         v = json.dumps(value) if not raw else value
         if len(v) > self.max_size:
             raise ValueTooLarge(f"Cache key too large: {key!r} {len(v)!r}")
+        return v
+
+    def _make_set_command(self, key, value, timeout):
+        if timeout:
+            return ("setex", key, int(timeout), value)
+        else:
+            return ("set", key, value)
+
+    def set(self, key, value, timeout, version=None, raw=False):
+        key = self.make_key(key, version=version)
+        v = self._encode(key, value, raw)
         if timeout:
             self.client.setex(key, int(timeout), v)
         else:
@@ -28,12 +48,29 @@ class CommonRedisCache(BaseCache):
 
         self._mark_transaction("set")
 
+    def set_many(self, items, version=None, raw=False):
+        commands = []
+        for key, value, timeout in items:
+            key = self.make_key(key, version=version)
+            commands.append(self._make_set_command(key, self._encode(key, value, raw), timeout))
+        if commands:
+            self._execute_many(commands)
+
+        self._mark_transaction("set")
+
     def delete(self, key, version=None):
         key = self.make_key(key, version=version)
         self.client.delete(key)
 
         self._mark_transaction("delete")
 
+    def delete_many(self, keys, version=None):
+        commands = [("delete", self.make_key(key, version=version)) for key in keys]
+        if commands:
+            self._execute_many(commands)
+
+        self._mark_transaction("delete")
+
     def get(self, key, version=None, raw=False):
         key = self.make_key(key, version=version)
         result = self.client.get(key)
@@ -44,6 +81,16 @@ class CommonRedisCache(BaseCache):
 
         return result
 
+    def get_many(self, keys, version=None, raw=False):
+        commands = [("get", self.make_key(key, version=version)) for key in keys]
+        results = self._execute_many(commands) if commands else []
+        if not raw:
+            results = [json.loads(result) if result is not None else None for result in results]
+
+        self._mark_transaction("get")
+
+        return results
+
 
 class RbCache(CommonRedisCache):
     def __init__(self, **options):
@@ -51,6 +98,13 @@ class RbCache(CommonRedisCache):
         client = cluster.get_routing_client()
         CommonRedisCache.__init__(self, client, **options)
 
+    def _execute_many(self, commands):
+        # The routing client does not support pipelines, but ``map`` batches
+        # the commands for every host and sends them in parallel.
+        with self.client.map() as client:
+            promises = [getattr(client, command)(*args) for command, *args in commands]
+        return [promise.value for promise in promises]
+
 
 # Confusing legacy name for RbCache.  We don't actually have a pure redis cache
 RedisCache = RbCache
@@ -804,6 +804,10 @@ BGTASKS = {
         "interval": 5 * 60,
         "roles": ["worker"],
     },
+    "sentry.bgtasks.clean_fileblobcache:clean_fileblobcache": {
+        "interval": 5 * 60,
+        "roles": ["worker"],
+    },
 }
 
 # Sentry logs to two major places: stdout, and it's internal project.
@@ -1379,7 +1383,8 @@ SENTRY_METRICS_SKIP_INTERNAL_PREFIXES = []  # Order this by most frequent prefix
 
 # Metrics product
 SENTRY_METRICS_INDEXER = "sentry.sentry_metrics.indexer.postgres.PGStringIndexer"
-SENTRY_METRICS_INDEXER_OPTIONS = {}
+# Strings and IDs are also cached in each process, see ``LocalIndexerCache``.
+SENTRY_METRICS_INDEXER_OPTIONS = {"local_cache_size": 10000, "local_cache_negative_ttl": 60}
 SENTRY_METRICS_INDEXER_CACHE_TTL = 3600 * 2
 
 # Release Health
@@ -2333,6 +2338,10 @@ SENTRY_SYNTHETIC_MONITORING_PROJECT_ID = None
 SENTRY_SIMILARITY_INDEX_REDIS_CLUSTER = "default"
 # Similarity-v2: uses grouping components for diffing (None = fallback to setting for v1)
 SENTRY_SIMILARITY2_INDEX_REDIS_CLUSTER = None
+# Version of the MinHash signatures stored in the similarity indexes. Version 2
+# signatures are cheaper to build but are stored under their own namespace, so
+# switching versions starts with empty indexes.
+SENTRY_SIMILARITY_SIGNATURE_VERSION = 1
 
 # The grouping strategy to use for driving similarity-v2. You can add multiple
 # strategies here to index them all. This is useful for transitioning a
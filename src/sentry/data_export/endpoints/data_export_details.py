@@ -6,6 +6,7 @@ from sentry import features
 from sentry.api.bases.organization import OrganizationDataExportPermission, OrganizationEndpoint
 from sentry.api.serializers import serialize
 from sentry.models import Project
+from sentry.models.file import DOWNLOAD_READ_AHEAD
 from sentry.utils import metrics
 from sentry.utils.compat import map
 
@@ -44,7 +45,7 @@ class DataExportDetailsEndpoint(OrganizationEndpoint):
     def download(self, data_export):
         metrics.incr("dataexport.download", sample_rate=1.0)
         file = data_export._get_file()
-        raw_file = file.getfile()
+        raw_file = file.getfile(read_ahead=DOWNLOAD_READ_AHEAD)
         response = StreamingHttpResponse(
             iter(lambda: raw_file.read(4096), b""), content_type="text/csv"
         )
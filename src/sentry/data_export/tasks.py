@@ -11,14 +11,8 @@ from django.core.files.base import ContentFile
 from django.db import IntegrityError, router
 from django.utils import timezone
 
-from sentry.models import (
-    DEFAULT_BLOB_SIZE,
-    MAX_FILE_SIZE,
-    AssembleChecksumMismatch,
-    File,
-    FileBlob,
-    FileBlobIndex,
-)
+from sentry.models import DEFAULT_BLOB_SIZE, MAX_FILE_SIZE, File, FileBlob, FileBlobIndex
+from sentry.models.file import DOWNLOAD_READ_AHEAD
 from sentry.tasks.base import instrumented_task
 from sentry.utils import metrics
 from sentry.utils.db import atomic_transaction
@@ -335,24 +329,28 @@ def merge_export_blobs(data_export_id, **kwargs):
                     type="export.csv",
                     headers={"Content-Type": "text/csv"},
                 )
-                size = 0
-                file_checksum = sha1(b"")
+                export_blobs = list(
+                    ExportedDataBlob.objects.filter(data_export=data_export).order_by("offset")
+                )
+                blobs = FileBlob.objects.in_bulk({b.blob_id for b in export_blobs})
 
-                for export_blob in ExportedDataBlob.objects.filter(
-                    data_export=data_export
-                ).order_by("offset"):
-                    blob = FileBlob.objects.get(pk=export_blob.blob_id)
-                    FileBlobIndex.objects.create(file=file, blob=blob, offset=size)
+                size = 0
+                indexes = []
+                for export_blob in export_blobs:
+                    blob = blobs[export_blob.blob_id]
+                    indexes.append(FileBlobIndex(file=file, blob=blob, offset=size))
                     size += blob.size
-                    blob_checksum = sha1(b"")
+                FileBlobIndex.objects.bulk_create(indexes)
 
-                    for chunk in blob.getfile().chunks():
-                        blob_checksum.update(chunk)
+                # The blobs were written by several tasks, so the contents were
+                # never hashed as a whole. They are read back once, in order,
+                # fetching the next blobs in parallel, to compute the checksum
+                # that is shown to users next to the download.
+                file_checksum = sha1(b"")
+                with file.getfile(read_ahead=DOWNLOAD_READ_AHEAD) as fp:
+                    for chunk in fp.chunks():
                         file_checksum.update(chunk)
 
-                    if blob.checksum != blob_checksum.hexdigest():
-                        raise AssembleChecksumMismatch("Checksum mismatch")
-
                 file.size = size
                 file.checksum = file_checksum.hexdigest()
                 file.save()
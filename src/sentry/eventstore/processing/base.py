@@ -1,5 +1,5 @@
 from datetime import timedelta
-from typing import Any, Optional
+from typing import Any, Mapping, Optional, Sequence
 
 import sentry_sdk
 
@@ -46,10 +46,16 @@ class EventProcessingStore:
                 key = self.__get_unprocessed_key(key)
             return self.inner.get(key)
 
+    def get_many(self, keys: Sequence[str]) -> Mapping[str, Event]:
+        """
+        Returns the events that are present in the store, keyed by their key.
+        """
+        with sentry_sdk.start_span(op="eventstore.processing.get_many"):
+            return dict(self.inner.get_many(keys))
+
     def delete_by_key(self, key: str) -> None:
         with sentry_sdk.start_span(op="eventstore.processing.delete_by_key"):
-            self.inner.delete(key)
-            self.inner.delete(self.__get_unprocessed_key(key))
+            self.inner.delete_many([key, self.__get_unprocessed_key(key)])
 
     def delete(self, event: Event) -> None:
         key = cache_key_for_event(event)
@@ -3,7 +3,7 @@ import random
 from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from contextlib import contextmanager
 from enum import Enum
-from typing import Any, Generator, Mapping, Optional, Sequence
+from typing import Any, Generator, List, Mapping, Optional, Sequence
 
 from sentry import options
 from sentry.eventstream.kafka.protocol import (
@@ -11,7 +11,7 @@ from sentry.eventstream.kafka.protocol import (
     get_task_kwargs_for_message,
     get_task_kwargs_for_message_from_headers,
 )
-from sentry.tasks.post_process import post_process_group
+from sentry.tasks.post_process import MAX_BATCH_SIZE, post_process_group, post_process_group_batch
 from sentry.utils import metrics
 from sentry.utils.batching_kafka_consumer import AbstractBatchWorker
 from sentry.utils.cache import cache_key_for_event
@@ -23,6 +23,7 @@ _DURATION_METRIC = "eventstream.duration"
 _CONCURRENCY_METRIC = "eventstream.concurrency"
 _MESSAGES_METRIC = "eventstream.messages"
 _CONCURRENCY_OPTION = "post-process-forwarder:concurrency"
+_BATCH_SIZE_OPTION = "post-process-forwarder:batch-size"
 _TRANSACTION_FORWARDER_HEADER = "transaction_forwarder"
 
 
@@ -91,6 +92,34 @@ def dispatch_post_process_group_task(
         )
 
 
+def dispatch_post_process_group_batch_task(events: Sequence[Mapping[str, Any]]) -> None:
+    """
+    Dispatches a single ``post_process_group_batch`` task for all ``events``,
+    given as the arguments of ``dispatch_post_process_group_task``.
+    """
+    batch = []
+    for task_kwargs in events:
+        if task_kwargs.get("skip_consume"):
+            logger.info("post_process.skip.raw_event", extra={"event_id": task_kwargs["event_id"]})
+            continue
+
+        batch.append(
+            {
+                "is_new": task_kwargs["is_new"],
+                "is_regression": task_kwargs["is_regression"],
+                "is_new_group_environment": task_kwargs["is_new_group_environment"],
+                "primary_hash": task_kwargs["primary_hash"],
+                "cache_key": cache_key_for_event(
+                    {"project": task_kwargs["project_id"], "event_id": task_kwargs["event_id"]}
+                ),
+                "group_id": task_kwargs["group_id"],
+            }
+        )
+
+    if batch:
+        post_process_group_batch.delay(events=batch)
+
+
 def _get_task_kwargs_and_dispatch(message: Message):
     task_kwargs = _get_task_kwargs(message)
     if not task_kwargs:
@@ -100,6 +129,15 @@ def _get_task_kwargs_and_dispatch(message: Message):
     dispatch_post_process_group_task(**task_kwargs)
 
 
+def _get_task_kwargs_and_record_metrics(message: Message) -> Optional[Mapping[str, Any]]:
+    task_kwargs = _get_task_kwargs(message)
+    if not task_kwargs:
+        return None
+
+    _record_metrics(message.partition(), task_kwargs)
+    return task_kwargs
+
+
 class PostProcessForwarderWorker(AbstractBatchWorker):
     """
     Implementation of the AbstractBatchWorker which would be used for post process forwarder.
@@ -107,6 +145,10 @@ class PostProcessForwarderWorker(AbstractBatchWorker):
     because we want to be able to change the concurrency during runtime. This should be replaced
     by a thread pool executor once stress tests experiments are over and we start using the
     CLI arguments to set concurrency.
+
+    If the post-process-forwarder:batch-size option is set, events are not dispatched one by one
+    but in post_process_group_batch tasks of up to that many events (at most MAX_BATCH_SIZE) when
+    the batch is flushed.
     """
 
     def __init__(self, concurrency: Optional[int] = 1) -> None:
@@ -114,6 +156,7 @@ class PostProcessForwarderWorker(AbstractBatchWorker):
         logger.info(f"Starting post process forwarder with {concurrency} threads")
         metrics.incr(_CONCURRENCY_METRIC, amount=concurrency)
         self.__executor = ThreadPoolExecutor(max_workers=self.__current_concurrency)
+        self.__batch_size = min(options.get(_BATCH_SIZE_OPTION), MAX_BATCH_SIZE)
 
     def process_message(self, message: Message) -> Optional[Future]:
         """
@@ -121,6 +164,8 @@ class PostProcessForwarderWorker(AbstractBatchWorker):
         is stored in the batch of batching_kafka_consumer and provided as an argument to flush_batch. If None is
         returned, the batching_kafka_consumer will not add the return value to the batch.
         """
+        if self.__batch_size:
+            return self.__executor.submit(_get_task_kwargs_and_record_metrics, message)
         return self.__executor.submit(_get_task_kwargs_and_dispatch, message)
 
     def flush_batch(self, batch: Optional[Sequence[Future]]) -> None:
@@ -135,6 +180,16 @@ class PostProcessForwarderWorker(AbstractBatchWorker):
                 if exc is not None:
                     raise exc
 
+            if self.__batch_size:
+                results = (future.result() for future in batch)
+                events: List[Mapping[str, Any]] = [
+                    task_kwargs for task_kwargs in results if task_kwargs is not None
+                ]
+                for i in range(0, len(events), self.__batch_size):
+                    dispatch_post_process_group_batch_task(events[i : i + self.__batch_size])
+
+        self.__batch_size = min(options.get(_BATCH_SIZE_OPTION), MAX_BATCH_SIZE)
+
         # Check if the concurrency settings have changed. If yes, then shutdown the existing executor
         # and create a new one with the new settings
         new_concurrency = options.get(_CONCURRENCY_OPTION)
@@ -8,6 +8,7 @@ from parsimonious.grammar import Grammar, NodeVisitor
 
 from sentry import projectoptions
 from sentry.grouping.component import GroupingComponent
+from sentry.grouping.utils import MatchCache
 from sentry.utils.strings import unescape_string
 
 from .actions import Action, FlagAction, VarAction
@@ -16,8 +17,11 @@ from .matchers import (
     CalleeMatch,
     CallerMatch,
     ExceptionFieldMatch,
+    FamilyMatch,
     FrameMatch,
+    FunctionMatch,
     Match,
+    ModuleMatch,
     create_match_frame,
 )
 
@@ -96,6 +100,71 @@ class StacktraceState:
         return f"{hint} by stack trace rule ({description})"
 
 
+# Fields of match frames that rules can be dispatched on. These must not be
+# changed by actions (unlike ``in_app`` and ``category``).
+DISPATCH_FIELDS = ("family", "function", "module")
+
+# Characters that have a special meaning in glob patterns. Patterns without
+# any of them only match values that are equal to the pattern.
+GLOB_SPECIAL_CHARS = frozenset(b"*?[]{}\\")
+
+
+def _get_dispatch_values(matcher):
+    """Returns the field and set of values a frame must have in order to be
+    matched by ``matcher``, or ``None`` if that cannot be determined without
+    evaluating the matcher.
+    """
+    if not isinstance(matcher, FrameMatch) or matcher.negated:
+        return None
+
+    if isinstance(matcher, FamilyMatch):
+        if b"all" in matcher._flags:
+            return None
+        return "family", frozenset(matcher._flags)
+
+    if isinstance(matcher, (FunctionMatch, ModuleMatch)):
+        if GLOB_SPECIAL_CHARS.intersection(matcher._encoded_pattern):
+            return None
+        return matcher.key, frozenset([matcher._encoded_pattern])
+
+    return None
+
+
+class FrameIndex:
+    """Index of match frames by the values of their ``DISPATCH_FIELDS``.
+
+    Rules only need to be evaluated against the frames that have one of the
+    values the rule dispatches on (see ``Rule.dispatch``), rather than against
+    all frames of the stack trace.
+    """
+
+    def __init__(self, match_frames):
+        self.size = len(match_frames)
+        self._index = {field: {} for field in DISPATCH_FIELDS}
+        for idx, match_frame in enumerate(match_frames):
+            for field, values in self._index.items():
+                values.setdefault(match_frame[field], []).append(idx)
+
+    def get_candidates(self, dispatch):
+        """Returns the sorted indices of frames that satisfy ``dispatch``, a
+        mapping of field to the allowed values of that field.
+        """
+        if not dispatch:
+            return range(self.size)
+
+        candidates = None
+        for field, values in dispatch.items():
+            index = self._index[field]
+            matching = set()
+            for value in values:
+                matching.update(index.get(value, ()))
+            candidates = matching if candidates is None else candidates & matching
+            if not candidates:
+                return []
+
+        return sorted(candidates)
+
+
 class Enhancements:
 
     # NOTE: You must add a version to ``VERSIONS`` any time attributes are added
@@ -121,32 +190,46 @@ class Enhancements:
         does not affect grouping.
         """
 
-        cache = {}
+        cache = MatchCache()
 
         match_frames = [create_match_frame(frame, platform) for frame in frames]
+        frame_index = FrameIndex(match_frames)
 
         for rule in self._modifier_rules:
             for idx, action in rule.get_matching_frame_actions(
-                match_frames, platform, exception_data, cache
+                match_frames,
+                platform,
+                exception_data,
+                cache,
+                candidates=frame_index.get_candidates(rule.dispatch),
             ):
                 action.apply_modifications_to_frame(frames, match_frames, idx, rule=rule)
 
+        cache.record_metrics("enhancements")
+
     def update_frame_components_contributions(self, components, frames, platform, exception_data):
 
-        cache = {}
+        cache = MatchCache()
 
         match_frames = [create_match_frame(frame, platform) for frame in frames]
+        frame_index = FrameIndex(match_frames)
 
         stacktrace_state = StacktraceState()
         # Apply direct frame actions and update the stack state alongside
         for rule in self._updater_rules:
 
             for idx, action in rule.get_matching_frame_actions(
-                match_frames, platform, exception_data, cache
+                match_frames,
+                platform,
+                exception_data,
+                cache,
+                candidates=frame_index.get_candidates(rule.dispatch),
             ):
                 action.update_frame_components_contributions(components, frames, idx, rule=rule)
                 action.modify_stacktrace_state(stacktrace_state, rule)
 
+        cache.record_metrics("enhancements")
+
         # Use the stack state to update frame contributions again to trim
         # down to max-frames.  min-frames is handled on the other hand for
         # the entire stacktrace later.
@@ -279,12 +362,20 @@ class Rule:
 
         self._exception_matchers = []
         self._other_matchers = []
+        self._dispatch = {}
         for matcher in matchers:
             if isinstance(matcher, ExceptionFieldMatch):
                 self._exception_matchers.append(matcher)
             else:
                 self._other_matchers.append(matcher)
 
+            dispatch_values = _get_dispatch_values(matcher)
+            if dispatch_values is not None:
+                field, values = dispatch_values
+                if field in self._dispatch:
+                    values = self._dispatch[field] & values
+                self._dispatch[field] = values
+
         self.actions = actions
         self._is_updater = any(action.is_updater for action in actions)
         self._is_modifier = any(action.is_modifier for action in actions)
@@ -296,6 +387,13 @@ class Rule:
             rv = f"{rv} {action}"
         return rv
 
+    @property
+    def dispatch(self):
+        """Mapping of frame field to the values a frame must have for this
+        rule to possibly match it, see ``FrameIndex``.
+        """
+        return self._dispatch
+
     @property
     def is_modifier(self):
         """Does this rule modify the frame?"""
@@ -312,9 +410,14 @@ class Rule:
             matchers[matcher.key] = matcher.pattern
         return {"match": matchers, "actions": [str(x) for x in self.actions]}
 
-    def get_matching_frame_actions(self, frames, platform, exception_data=None, cache=None):
+    def get_matching_frame_actions(
+        self, frames, platform, exception_data=None, cache=None, candidates=None
+    ):
         """Given a frame returns all the matching actions based on this rule.
         If the rule does not match `None` is returned.
+
+        If ``candidates`` is given, only frames at those (ascending) indices
+        are considered.
         """
         if not self.matchers:
             return []
@@ -326,8 +429,11 @@ class Rule:
 
         rv = []
 
+        if candidates is None:
+            candidates = range(len(frames))
+
         # 2 - Check if frame matchers match
-        for idx, frame in enumerate(frames):
+        for idx in candidates:
             if all(
                 m.matches_frame(frames, idx, platform, exception_data, cache)
                 for m in self._other_matchers
@@ -3,8 +3,9 @@ import inspect
 from parsimonious.exceptions import ParseError
 from parsimonious.grammar import Grammar, NodeVisitor
 
-from sentry.grouping.utils import get_rule_bool
+from sentry.grouping.utils import MatchCache, get_rule_bool
 from sentry.stacktraces.platform import get_behavior_family_for_platform
+from sentry.utils.functional import cached
 from sentry.utils.glob import glob_match
 from sentry.utils.safe import get_path
 from sentry.utils.strings import unescape_string
@@ -177,10 +178,14 @@ class FingerprintingRules:
         if not self.rules:
             return
         access = EventAccess(event)
-        for rule in self.iter_rules():
-            new_values = rule.get_fingerprint_values_for_event_access(access)
-            if new_values is not None:
-                return (rule,) + new_values
+        cache = MatchCache()
+        try:
+            for rule in self.iter_rules():
+                new_values = rule.get_fingerprint_values_for_event_access(access, cache)
+                if new_values is not None:
+                    return (rule,) + new_values
+        finally:
+            cache.record_metrics("fingerprinting")
 
     @classmethod
     def _from_config_structure(cls, data):
@@ -240,6 +245,17 @@ MATCHERS = {
 }
 
 
+def _path_like_match(pattern, value):
+    """Stand-alone function for use with ``cached``"""
+    if glob_match(value, pattern, ignorecase=True, doublestar=True, path_normalize=True):
+        return True
+    if not value.startswith("/") and glob_match(
+        "/" + value, pattern, ignorecase=True, doublestar=True, path_normalize=True
+    ):
+        return True
+    return False
+
+
 class Match:
     def __init__(self, key, pattern, negated=False):
         if key.startswith("tags."):
@@ -264,32 +280,28 @@ class Match:
             return "tags"
         return "frames"
 
-    def matches(self, values):
-        rv = self._positive_match(values)
+    def matches(self, values, cache=None):
+        if cache is None:
+            cache = {}
+        rv = self._positive_match(values, cache)
         if self.negated:
             rv = not rv
         return rv
 
-    def _positive_path_match(self, value):
+    def _positive_path_match(self, value, cache):
         if value is None:
             return False
-        if glob_match(value, self.pattern, ignorecase=True, doublestar=True, path_normalize=True):
-            return True
-        if not value.startswith("/") and glob_match(
-            "/" + value, self.pattern, ignorecase=True, doublestar=True, path_normalize=True
-        ):
-            return True
-        return False
+        return cached(cache, _path_like_match, self.pattern, value)
 
-    def _positive_match(self, values):
+    def _positive_match(self, values, cache):
         # path is special in that it tests against two values (abs_path and path)
         if self.key == "path":
             value = values.get("abs_path")
-            if self._positive_path_match(value):
+            if self._positive_path_match(value, cache):
                 return True
             alt_value = values.get("filename")
             if alt_value != value:
-                if self._positive_path_match(value):
+                if self._positive_path_match(value, cache):
                     return True
             return False
 
@@ -305,7 +317,7 @@ class Match:
         if value is None:
             return False
         elif self.key == "package":
-            if self._positive_path_match(value):
+            if self._positive_path_match(value, cache):
                 return True
         elif self.key == "family":
             flags = self.pattern.split(",")
@@ -315,6 +327,11 @@ class Match:
             ref_val = get_rule_bool(self.pattern)
             if ref_val is not None and ref_val == value:
                 return True
+        elif self.match_group == "frames":
+            # Only frame values recur across events often enough to be worth
+            # caching, messages and tags would just churn the shared cache.
+            if cached(cache, glob_match, value, self.pattern):
+                return True
         elif glob_match(value, self.pattern, ignorecase=self.key in ("level", "value")):
             return True
         return False
@@ -350,14 +367,14 @@ class Rule:
         self.fingerprint = fingerprint
         self.attributes = attributes
 
-    def get_fingerprint_values_for_event_access(self, access):
+    def get_fingerprint_values_for_event_access(self, access, cache=None):
         by_match_group = {}
         for matcher in self.matchers:
             by_match_group.setdefault(matcher.match_group, []).append(matcher)
 
         for match_group, matchers in by_match_group.items():
             for values in access.get_values(match_group):
-                if all(x.matches(values) for x in matchers):
+                if all(x.matches(values, cache) for x in matchers):
                     break
             else:
                 return
@@ -3,7 +3,10 @@ from hashlib import md5
 
 from django.utils.encoding import force_bytes
 
+from sentry import options
 from sentry.stacktraces.processing import get_crash_frame_from_event_data
+from sentry.utils import metrics
+from sentry.utils.lru import LRUCache
 from sentry.utils.safe import get_path
 
 _fingerprint_var_re = re.compile(r"\{\{\s*(\S+)\s*\}\}")
@@ -26,6 +29,54 @@ def hash_from_values(values):
     return result.hexdigest()
 
 
+_shared_match_cache = LRUCache(lambda: options.get("grouping.match-cache-size"))
+
+
+class MatchCache:
+    """Cache for the results of matching rule patterns against frame and
+    event values, meant to be used with ``sentry.utils.functional.cached``.
+
+    An instance is created for every stack trace or event that is matched.
+    Lookups that miss the instance fall back to a bounded cache shared by the
+    whole process, so that the same (library) frames are not matched against
+    the same patterns again for every event. Only results of functions that
+    are pure in their arguments can be cached this way.
+
+    Results for values that rarely recur across events, such as exception
+    types and values, go into ``local`` instead, which is never shared.
+    """
+
+    def __init__(self):
+        self._results = {}
+        self.local = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, key):
+        if key in self._results:
+            return True
+
+        rv = _shared_match_cache.get(key)
+        if rv is None:
+            self.misses += 1
+            return False
+
+        self.hits += 1
+        self._results[key] = rv
+        return True
+
+    def __getitem__(self, key):
+        return self._results[key]
+
+    def __setitem__(self, key, value):
+        self._results[key] = value
+        _shared_match_cache.set(key, value)
+
+    def record_metrics(self, consumer):
+        metrics.incr("grouping.match_cache.hit", amount=self.hits, tags={"consumer": consumer})
+        metrics.incr("grouping.match_cache.miss", amount=self.misses, tags={"consumer": consumer})
+
+
 def get_rule_bool(value):
     if value:
         value = value.lower()
@@ -19,6 +19,7 @@ from sentry.db.models import (
 from sentry.db.models.manager import BaseManager
 from sentry.models import Team, User
 from sentry.snuba.models import QuerySubscription
+from sentry.snuba.subscription_cache import invalidate_subscription_metadata
 from sentry.utils import metrics
 from sentry.utils.retries import TimedRetryPolicy
 
@@ -682,6 +683,11 @@ post_save.connect(AlertRuleTriggerManager.clear_alert_rule_trigger_cache, sender
 post_save.connect(AlertRuleTriggerManager.clear_trigger_cache, sender=AlertRuleTrigger)
 post_delete.connect(AlertRuleTriggerManager.clear_trigger_cache, sender=AlertRuleTrigger)
 
+post_save.connect(invalidate_subscription_metadata, sender=AlertRule)
+post_delete.connect(invalidate_subscription_metadata, sender=AlertRule)
+post_save.connect(invalidate_subscription_metadata, sender=AlertRuleTrigger)
+post_delete.connect(invalidate_subscription_metadata, sender=AlertRuleTrigger)
+
 post_save.connect(IncidentManager.clear_active_incident_cache, sender=Incident)
 post_save.connect(IncidentManager.clear_active_incident_project_cache, sender=IncidentProject)
 post_delete.connect(IncidentManager.clear_active_incident_project_cache, sender=IncidentProject)
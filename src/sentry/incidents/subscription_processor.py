@@ -1,5 +1,6 @@
 import logging
 import operator
+from collections import defaultdict
 from copy import deepcopy
 from datetime import timedelta
 from typing import Optional
@@ -7,7 +8,7 @@ from typing import Optional
 from django.conf import settings
 from django.db import transaction
 
-from sentry import features
+from sentry import features, options
 from sentry.constants import CRASH_RATE_ALERT_AGGREGATE_ALIAS, CRASH_RATE_ALERT_SESSION_COUNT_ALIAS
 from sentry.incidents.logic import (
     CRITICAL_TRIGGER_LABEL,
@@ -31,6 +32,7 @@ from sentry.incidents.tasks import handle_trigger_action
 from sentry.models import Project
 from sentry.snuba.dataset import Dataset
 from sentry.snuba.models import QueryDatasets
+from sentry.snuba.subscription_cache import SubscriptionMetadataCache
 from sentry.snuba.tasks import build_snuba_filter
 from sentry.utils import metrics, redis
 from sentry.utils.compat import zip
@@ -44,6 +46,13 @@ ALERT_RULE_BASE_STAT_KEY = "%s:%s"
 ALERT_RULE_STAT_KEYS = ("last_update",)
 ALERT_RULE_BASE_TRIGGER_STAT_KEY = "%s:trigger:%s:%s"
 ALERT_RULE_TRIGGER_STAT_KEYS = ("alert_triggered", "resolve_triggered")
+COMPARISON_HISTORY_KEY = "%s:comparison:%s"
+# The comparison history keeps one slot per subscription update, comparisons that
+# would need more slots than this are always queried from Snuba.
+COMPARISON_HISTORY_MAX_SLOTS = 24 * 60
+# How much longer than the comparison delta the history of a subscription is kept
+# after its last update.
+COMPARISON_HISTORY_TTL_MARGIN = int(timedelta(hours=1).total_seconds())
 # Stores a minimum threshold that represents a session count under which we don't evaluate crash
 # rate alert, and the update is just dropped. If it is set to None, then no minimum threshold
 # check is applied
@@ -51,6 +60,20 @@ ALERT_RULE_TRIGGER_STAT_KEYS = ("alert_triggered", "resolve_triggered")
 #  functionality, then maybe we should move this to constants
 CRASH_RATE_ALERT_MINIMUM_THRESHOLD: Optional[int] = None
 
+# The alert rule and triggers of each subscription, filled in bulk by `prefetch_alert_rules`
+# for every batch of updates read by the subscription consumer.
+alert_rule_cache = SubscriptionMetadataCache(
+    "incidents.alert_rules.metadata_cache",
+    models=[
+        "sentry.AlertRule",
+        "sentry.AlertRuleTrigger",
+        "sentry.QuerySubscription",
+        "sentry.SnubaQuery",
+    ],
+    ttl=lambda: options.get("subscriptions-query.metadata-cache-ttl"),
+    max_size=lambda: options.get("subscriptions-query.metadata-cache-size"),
+)
+
 
 class SubscriptionProcessor:
     """
@@ -68,12 +91,17 @@ class SubscriptionProcessor:
 
     def __init__(self, subscription):
         self.subscription = subscription
-        try:
-            self.alert_rule = AlertRule.objects.get_for_subscription(subscription)
-        except AlertRule.DoesNotExist:
-            return
+        cached = alert_rule_cache.get(subscription.id)
+        if cached is not None:
+            self.alert_rule, triggers = cached
+            self.triggers = list(triggers)
+        else:
+            try:
+                self.alert_rule = AlertRule.objects.get_for_subscription(subscription)
+            except AlertRule.DoesNotExist:
+                return
 
-        self.triggers = AlertRuleTrigger.objects.get_for_alert_rule(self.alert_rule)
+            self.triggers = AlertRuleTrigger.objects.get_for_alert_rule(self.alert_rule)
         self.triggers.sort(key=lambda trigger: trigger.alert_threshold)
 
         (
@@ -168,8 +196,24 @@ class SubscriptionProcessor:
                 return it
 
     def get_comparison_aggregation_value(self, subscription_update, aggregation_value):
-        # For comparison alerts run a query over the comparison period and use it to calculate the
-        # % change.
+        # For comparison alerts look up the aggregate of the update from the comparison period
+        # ago, or run a query over the comparison period if we don't have it, and use it to
+        # calculate the % change.
+        if options.get("incidents.comparison-history-enabled"):
+            try:
+                comparison_aggregate = get_and_record_comparison_history(
+                    self.alert_rule,
+                    self.subscription,
+                    subscription_update["timestamp"],
+                    aggregation_value,
+                )
+            except Exception:
+                logger.exception("Failed to use comparison history")
+                comparison_aggregate = None
+
+            if comparison_aggregate is not None:
+                return self.get_comparison_change(aggregation_value, comparison_aggregate)
+
         delta = timedelta(seconds=self.alert_rule.comparison_delta)
         end = subscription_update["timestamp"] - delta
         snuba_query = self.subscription.snuba_query
@@ -204,6 +248,10 @@ class SubscriptionProcessor:
             logger.exception("Failed to run comparison query")
             return
 
+        return self.get_comparison_change(aggregation_value, comparison_aggregate)
+
+    @staticmethod
+    def get_comparison_change(aggregation_value, comparison_aggregate):
         if not comparison_aggregate:
             metrics.incr("incidents.alert_rules.skipping_update_comparison_value_invalid")
             return
@@ -648,6 +696,83 @@ def update_alert_rule_stats(alert_rule, subscription, last_update, alert_counts,
     pipeline.execute()
 
 
+def build_comparison_history_key(alert_rule, subscription):
+    key_base = ALERT_RULE_BASE_KEY % (alert_rule.id, subscription.project_id)
+    return COMPARISON_HISTORY_KEY % (key_base, subscription.subscription_id)
+
+
+def get_and_record_comparison_history(alert_rule, subscription, timestamp, aggregation_value):
+    """
+    Records the aggregate of a subscription update in the comparison history of the
+    subscription, and returns the aggregate of the update from `comparison_delta` ago
+    if it is in the history.
+
+    The history is a ring buffer in a redis hash, with one field per subscription update
+    in the comparison period. Each field holds the timestamp of the update next to its
+    aggregate, so fields that were never written or have been reused since are misses.
+    Subscriptions are recreated in Snuba when their query changes, so the history is
+    keyed by the Snuba subscription id.
+    :return: The aggregate from `comparison_delta` ago, or None if it isn't known
+    """
+    resolution = subscription.snuba_query.resolution
+    delta = alert_rule.comparison_delta
+    slots = delta // resolution + 2
+    if subscription.subscription_id is None or slots > COMPARISON_HISTORY_MAX_SLOTS:
+        return None
+
+    update_ts = int(to_timestamp(timestamp))
+    comparison_ts = update_ts - delta
+
+    key = build_comparison_history_key(alert_rule, subscription)
+    pipeline = get_redis_client().pipeline()
+    pipeline.hget(key, (comparison_ts // resolution) % slots)
+    pipeline.hset(key, (update_ts // resolution) % slots, f"{update_ts}:{aggregation_value}")
+    pipeline.expire(key, delta + COMPARISON_HISTORY_TTL_MARGIN)
+    result = pipeline.execute()[0]
+
+    if result is not None:
+        ts, value = result.split(":", 1)
+        if int(ts) == comparison_ts:
+            metrics.incr("incidents.alert_rules.comparison_history", tags={"result": "hit"})
+            return float(value)
+
+    metrics.incr("incidents.alert_rules.comparison_history", tags={"result": "miss"})
+    return None
+
+
+def prefetch_alert_rules(subscriptions):
+    """
+    Loads the alert rules and triggers of the given subscriptions that aren't in
+    `alert_rule_cache` yet, with one query for each.
+    """
+    alert_rule_cache.refresh_version()
+    missing = alert_rule_cache.missing(subscription.id for subscription in subscriptions)
+    subscriptions = [subscription for subscription in subscriptions if subscription.id in missing]
+    if not subscriptions:
+        return
+
+    alert_rules = {
+        alert_rule.snuba_query_id: alert_rule
+        for alert_rule in AlertRule.objects.filter(
+            snuba_query_id__in={subscription.snuba_query_id for subscription in subscriptions}
+        ).select_related("snuba_query")
+    }
+    triggers = defaultdict(list)
+    for trigger in AlertRuleTrigger.objects.filter(alert_rule__in=list(alert_rules.values())):
+        triggers[trigger.alert_rule_id].append(trigger)
+
+    alert_rule_cache.set_many(
+        {
+            subscription.id: (
+                alert_rules[subscription.snuba_query_id],
+                triggers[alert_rules[subscription.snuba_query_id].id],
+            )
+            for subscription in subscriptions
+            if subscription.snuba_query_id in alert_rules
+        }
+    )
+
+
 def get_redis_client():
     cluster_key = getattr(settings, "SENTRY_INCIDENT_RULES_REDIS_CLUSTER", "default")
     return redis.redis_clusters.get(cluster_key)
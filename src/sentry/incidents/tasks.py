@@ -20,7 +20,10 @@ from sentry.incidents.models import (
     PendingIncidentSnapshot,
 )
 from sentry.models import Project
-from sentry.snuba.query_subscription_consumer import register_subscriber
+from sentry.snuba.query_subscription_consumer import (
+    register_subscriber,
+    register_subscriber_prefetch,
+)
 from sentry.tasks.base import instrumented_task
 from sentry.utils import metrics
 from sentry.utils.email import MessageBuilder
@@ -120,6 +123,17 @@ def handle_snuba_query_update(subscription_update, subscription):
         SubscriptionProcessor(subscription).process_update(subscription_update)
 
 
+@register_subscriber_prefetch(INCIDENTS_SNUBA_SUBSCRIPTION_TYPE)
+def prefetch_snuba_query_alert_rules(subscriptions):
+    """
+    Loads the alert rules of a batch of `QuerySubscription`s before their updates are
+    handled by `handle_snuba_query_update`.
+    """
+    from sentry.incidents.subscription_processor import prefetch_alert_rules
+
+    prefetch_alert_rules(subscriptions)
+
+
 @register_subscriber(SUBSCRIPTION_LOAD_TEST_SUBSCRIPTION_TYPE)
 def handle_load_test_snuba_fake_query_update(subscription_update, subscription):
     # ToDo(ahmed): Remove this handler. This is only added as part of a load test for crash rate
@@ -3,8 +3,10 @@ import errno
 import logging
 import re
 import sys
+import threading
 import time
 import zlib
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from io import BytesIO
 from os.path import splitext
@@ -13,9 +15,11 @@ from urllib.parse import urlsplit
 
 import sentry_sdk
 from django.conf import settings
+from django.db import close_old_connections
 from django.utils import timezone
 from django.utils.encoding import force_bytes, force_text
 from requests.utils import get_encoding_from_headers
+from sentry_sdk import Hub
 from symbolic import SourceMapView
 
 from sentry import http, options
@@ -32,6 +36,7 @@ from sentry.utils.cache import cache
 from sentry.utils.files import compress_file
 from sentry.utils.hashlib import md5_text
 from sentry.utils.http import is_valid_origin
+from sentry.utils.lru import LRUCache
 from sentry.utils.retries import ConditionalRetryPolicy, exponential_delay
 from sentry.utils.safe import get_path
 from sentry.utils.urls import non_standard_url_join
@@ -720,6 +725,20 @@ def get_max_age(headers):
     return min(max_age, CACHE_CONTROL_MAX)
 
 
+def _get_sourcemap_view_cache_max_bytes():
+    return options.get("processing.sourcemap-view-cache-max-bytes")
+
+
+# Parsed source maps of release artifacts, shared by all events processed in
+# this process. Artifacts of a release do not change once uploaded, so the
+# parsed views can be reused instead of downloading and parsing them again for
+# every event. Entries are weighted by the size of the source map they were
+# parsed from.
+sourcemap_view_cache = LRUCache(
+    _get_sourcemap_view_cache_max_bytes, metrics_key="sourcemaps.view_cache"
+)
+
+
 def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=True):
     if is_data_uri(url):
         try:
@@ -729,7 +748,9 @@ def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=T
             )
         except TypeError as e:
             raise UnparseableSourcemap({"url": "<base64>", "reason": str(e)})
-    else:
+        return parse_sourcemap(url, body)
+
+    if release is None or _get_sourcemap_view_cache_max_bytes() <= 0:
         # look in the database and, if not found, optionally try to scrape the web
         result = fetch_file(
             url,
@@ -738,7 +759,29 @@ def fetch_sourcemap(url, project=None, release=None, dist=None, allow_scraping=T
             dist=dist,
             allow_scraping=allow_scraping,
         )
-        body = result.body
+        return parse_sourcemap(url, result.body)
+
+    cache_key = (release.id, dist.id if dist is not None else None, url)
+    sourcemap_view = sourcemap_view_cache.get(cache_key)
+    if sourcemap_view is not None:
+        return sourcemap_view
+
+    # Only source maps of release artifacts are cached. Scraped ones are subject
+    # to the HTTP cache headers, and may be replaced by an artifact later on.
+    try:
+        result = fetch_file(url, project=project, release=release, dist=dist, allow_scraping=False)
+    except http.CannotFetch as exc:
+        if not allow_scraping or exc.data.get("type") != EventError.JS_MISSING_SOURCE:
+            raise
+        result = fetch_file(url, project=project, allow_scraping=True)
+        return parse_sourcemap(url, result.body)
+
+    sourcemap_view = parse_sourcemap(url, result.body)
+    sourcemap_view_cache.set(cache_key, sourcemap_view, weight=len(result.body))
+    return sourcemap_view
+
+
+def parse_sourcemap(url, body):
     try:
         return SourceMapView.from_json_bytes(body)
     except Exception as exc:
@@ -778,6 +821,47 @@ def generate_module(src):
     return CLEAN_MODULE_RE.sub("", filename) or UNKNOWN_MODULE
 
 
+_fetch_executor = None
+_fetch_executor_concurrency = None
+_fetch_executor_lock = threading.Lock()
+
+
+def get_fetch_executor(concurrency):
+    """
+    Returns the process-wide thread pool used to fetch source files and source
+    maps concurrently. The pool is recreated when the configured concurrency
+    changes, and is kept alive otherwise so its threads are reused across
+    events. Work should be submitted through ``run_fetch``.
+
+    A replaced pool is not shut down, since other threads may still be
+    submitting to it. Its threads exit once its queue has drained and the
+    last reference to it is gone.
+    """
+    global _fetch_executor, _fetch_executor_concurrency
+
+    with _fetch_executor_lock:
+        if _fetch_executor_concurrency != concurrency:
+            _fetch_executor = ThreadPoolExecutor(
+                max_workers=concurrency, thread_name_prefix="sourcemaps-fetch"
+            )
+            _fetch_executor_concurrency = concurrency
+        return _fetch_executor
+
+
+def run_fetch(hub, function, *args):
+    """
+    Runs a fetch on a pool thread, with its spans reported to ``hub``. Pool
+    threads outlive the request they work for, so the database connections
+    they open are closed around every fetch like Django does around requests.
+    """
+    close_old_connections()
+    try:
+        with hub:
+            return function(*args)
+    finally:
+        close_old_connections()
+
+
 def is_valid_frame(frame):
     return frame is not None and frame.get("lineno") is not None
 
@@ -1119,80 +1203,103 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
         Look for and (if found) cache a source file and its associated source
         map (if any).
         """
+        if not self._reserve_fetch(filename):
+            return
 
-        sourcemaps = self.sourcemaps
-        cache = self.cache
+        try:
+            result = self._fetch_source_file(filename)
+        except http.BadSource as exc:
+            self._add_source_error(filename, exc)
+            return
+
+        sourcemap_url = self._cache_source_file(filename, result)
+        if sourcemap_url is None:
+            return
+
+        try:
+            sourcemap_view = self._fetch_sourcemap(sourcemap_url)
+        except http.BadSource as exc:
+            # we don't perform the same check here as above, because if someone has
+            # uploaded a node_modules file, which has a sourceMappingURL, they
+            # presumably would like it mapped (and would like to know why it's not
+            # working, if that's the case). If they're not looking for it to be
+            # mapped, then they shouldn't be uploading the source file in the
+            # first place.
+            self.cache.add_error(filename, exc.data)
+            return
+
+        self._cache_sourcemap(sourcemap_url, sourcemap_view)
 
+    def _reserve_fetch(self, filename):
+        """
+        Account for a fetch of ``filename`` against ``max_fetches``. Records an
+        error and returns ``False`` if the limit has been exceeded.
+        """
         self.fetch_count += 1
 
         if self.fetch_count > self.max_fetches:
-            cache.add_error(filename, {"type": EventError.JS_TOO_MANY_REMOTE_SOURCES})
-            return
+            self.cache.add_error(filename, {"type": EventError.JS_TOO_MANY_REMOTE_SOURCES})
+            return False
+        return True
 
+    def _fetch_source_file(self, filename):
         # TODO: respect cache-control/max-age headers to some extent
         logger.debug("Attempting to cache source %r", filename)
-        try:
-            # this both looks in the database and tries to scrape the internet
-            with sentry_sdk.start_span(
-                op="JavaScriptStacktraceProcessor.cache_source.fetch_file"
-            ) as span:
-                span.set_data("filename", filename)
-                result = fetch_file(
-                    filename,
-                    project=self.project,
-                    release=self.release,
-                    dist=self.dist,
-                    allow_scraping=self.allow_scraping,
-                )
-        except http.BadSource as exc:
-            # most people don't upload release artifacts for their third-party libraries,
-            # so ignore missing node_modules files
-            if exc.data["type"] == EventError.JS_MISSING_SOURCE and "node_modules" in filename:
-                pass
-            else:
-                cache.add_error(filename, exc.data)
+        # this both looks in the database and tries to scrape the internet
+        with sentry_sdk.start_span(
+            op="JavaScriptStacktraceProcessor.cache_source.fetch_file"
+        ) as span:
+            span.set_data("filename", filename)
+            return fetch_file(
+                filename,
+                project=self.project,
+                release=self.release,
+                dist=self.dist,
+                allow_scraping=self.allow_scraping,
+            )
 
-            # either way, there's no more for us to do here, since we don't have
-            # a valid file to cache
+    def _add_source_error(self, filename, exc):
+        # most people don't upload release artifacts for their third-party libraries,
+        # so ignore missing node_modules files
+        if exc.data["type"] == EventError.JS_MISSING_SOURCE and "node_modules" in filename:
             return
-        cache.add(filename, result.body, result.encoding)
-        cache.alias(result.url, filename)
+        self.cache.add_error(filename, exc.data)
+
+    def _cache_source_file(self, filename, result):
+        """
+        Add a fetched source file to the cache and return the URL of its source
+        map, if it has one that still needs to be fetched.
+        """
+        self.cache.add(filename, result.body, result.encoding)
+        self.cache.alias(result.url, filename)
 
         sourcemap_url = discover_sourcemap(result)
         if not sourcemap_url:
-            return
+            return None
 
         logger.debug(
             "Found sourcemap URL %r for minified script %r", sourcemap_url[:256], result.url
         )
-        sourcemaps.link(filename, sourcemap_url)
-        if sourcemap_url in sourcemaps:
-            return
+        self.sourcemaps.link(filename, sourcemap_url)
+        if sourcemap_url in self.sourcemaps:
+            return None
+        return sourcemap_url
 
-        # pull down sourcemap
-        try:
-            with sentry_sdk.start_span(
-                op="JavaScriptStacktraceProcessor.cache_source.fetch_sourcemap"
-            ) as span:
-                span.set_data("sourcemap_url", sourcemap_url)
-                sourcemap_view = fetch_sourcemap(
-                    sourcemap_url,
-                    project=self.project,
-                    release=self.release,
-                    dist=self.dist,
-                    allow_scraping=self.allow_scraping,
-                )
-        except http.BadSource as exc:
-            # we don't perform the same check here as above, because if someone has
-            # uploaded a node_modules file, which has a sourceMappingURL, they
-            # presumably would like it mapped (and would like to know why it's not
-            # working, if that's the case). If they're not looking for it to be
-            # mapped, then they shouldn't be uploading the source file in the
-            # first place.
-            cache.add_error(filename, exc.data)
-            return
+    def _fetch_sourcemap(self, sourcemap_url):
+        with sentry_sdk.start_span(
+            op="JavaScriptStacktraceProcessor.cache_source.fetch_sourcemap"
+        ) as span:
+            span.set_data("sourcemap_url", sourcemap_url)
+            return fetch_sourcemap(
+                sourcemap_url,
+                project=self.project,
+                release=self.release,
+                dist=self.dist,
+                allow_scraping=self.allow_scraping,
+            )
 
-        sourcemaps.add(sourcemap_url, sourcemap_view)
+    def _cache_sourcemap(self, sourcemap_url, sourcemap_view):
+        self.sourcemaps.add(sourcemap_url, sourcemap_view)
 
         # cache any inlined sources
         for src_id, source_name in sourcemap_view.iter_sources():
@@ -1221,6 +1328,15 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 continue
             pending_file_list.add(f["abs_path"])
 
+        concurrency = options.get("processing.sourcemaps-fetch-concurrency")
+        if concurrency > 1 and len(pending_file_list) > 1:
+            with sentry_sdk.start_span(
+                op="JavaScriptStacktraceProcessor.populate_source_cache.fetch_concurrently"
+            ) as span:
+                span.set_data("files", len(pending_file_list))
+                self._populate_source_cache_concurrently(pending_file_list, concurrency)
+            return
+
         for idx, filename in enumerate(pending_file_list):
             with sentry_sdk.start_span(
                 op="JavaScriptStacktraceProcessor.populate_source_cache.cache_source"
@@ -1228,6 +1344,61 @@ class JavaScriptStacktraceProcessor(StacktraceProcessor):
                 span.set_data("filename", filename)
                 self.cache_source(filename=filename)
 
+    def _populate_source_cache_concurrently(self, filenames, concurrency):
+        """
+        Same as calling ``cache_source`` for every file, except that all
+        minified files are fetched in parallel, followed by all of their
+        source maps. Fetching happens on a shared pool of ``concurrency``
+        threads, while the caches are only ever mutated from this thread.
+        """
+        filenames = [filename for filename in sorted(filenames) if self._reserve_fetch(filename)]
+        executor = get_fetch_executor(concurrency)
+
+        file_futures = [
+            (
+                filename,
+                executor.submit(run_fetch, Hub(Hub.current), self._fetch_source_file, filename),
+            )
+            for filename in filenames
+        ]
+
+        # Source maps are requested as soon as the corresponding file is in, and
+        # are deduplicated so that bundles sharing a map only fetch it once.
+        sourcemap_futures = {}
+        for filename, future in file_futures:
+            try:
+                result = future.result()
+            except http.BadSource as exc:
+                self._add_source_error(filename, exc)
+                continue
+
+            sourcemap_url = self._cache_source_file(filename, result)
+            if sourcemap_url is None:
+                continue
+
+            if sourcemap_url not in sourcemap_futures:
+                sourcemap_futures[sourcemap_url] = (
+                    executor.submit(
+                        run_fetch, Hub(Hub.current), self._fetch_sourcemap, sourcemap_url
+                    ),
+                    [],
+                )
+            sourcemap_futures[sourcemap_url][1].append(filename)
+
+        for sourcemap_url, (future, referencing_files) in sourcemap_futures.items():
+            try:
+                sourcemap_view = future.result()
+            except http.BadSource as exc:
+                # see ``cache_source`` for why errors are recorded for node_modules too
+                for filename in referencing_files:
+                    self.cache.add_error(filename, exc.data)
+                continue
+
+            self._cache_sourcemap(sourcemap_url, sourcemap_view)
+
+        metrics.timing("sourcemaps.concurrent_fetch.files", len(file_futures))
+        metrics.timing("sourcemaps.concurrent_fetch.sourcemaps", len(sourcemap_futures))
+
     def close(self):
         StacktraceProcessor.close(self)
         if self.sourcemaps_touched:
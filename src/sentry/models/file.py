@@ -1,8 +1,10 @@
 import io
+import logging
 import mmap
 import os
 import tempfile
 import time
+from collections import deque
 from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from hashlib import sha1
@@ -38,9 +40,15 @@ UPLOAD_RETRY_TIME = getattr(settings, "SENTRY_UPLOAD_RETRY_TIME", 60)  # 1min
 DEFAULT_BLOB_SIZE = 1024 * 1024  # one mb
 CHUNK_STATE_HEADER = "__state"
 MULTI_BLOB_UPLOAD_CONCURRENCY = 8
+DOWNLOAD_READ_AHEAD = 4  # number of blobs fetched ahead when streaming downloads
+READ_AHEAD_MAX_BYTES = 32 * 1024 * 1024
+READ_AHEAD_CONCURRENCY = 8
 MAX_FILE_SIZE = 2 ** 31  # 2GB is the maximum offset supported by fileblob
 
 
+logger = logging.getLogger(__name__)
+
+
 class nooplogger:
     debug = staticmethod(lambda *a, **kw: None)
     info = staticmethod(lambda *a, **kw: None)
@@ -305,6 +313,9 @@ class FileBlob(Model):
         """
         assert self.path
 
+        if fileblob_cache.enabled and self.size:
+            return fileblob_cache.getfile(self)
+
         storage = get_storage()
         return storage.open(self.path)
 
@@ -331,21 +342,28 @@ class File(Model):
         app_label = "sentry"
         db_table = "sentry_file"
 
-    def _get_chunked_blob(self, mode=None, prefetch=False, prefetch_to=None, delete=True):
+    def _get_chunked_blob(
+        self, mode=None, prefetch=False, prefetch_to=None, delete=True, read_ahead=0
+    ):
         return ChunkedFileBlobIndexWrapper(
             FileBlobIndex.objects.filter(file=self).select_related("blob").order_by("offset"),
             mode=mode,
             prefetch=prefetch,
             prefetch_to=prefetch_to,
             delete=delete,
+            read_ahead=read_ahead,
         )
 
-    def getfile(self, mode=None, prefetch=False):
+    def getfile(self, mode=None, prefetch=False, read_ahead=0):
         """Returns a file object.  By default the file is fetched on
         demand but if prefetch is enabled the file is fully prefetched
         into a tempfile before reading can happen.
+
+        For files that are read sequentially, ``read_ahead`` can be set to
+        fetch up to that many of the following blobs in the background while
+        the current one is read.
         """
-        impl = self._get_chunked_blob(mode, prefetch)
+        impl = self._get_chunked_blob(mode, prefetch, read_ahead=read_ahead)
         return FileObj(impl, self.name)
 
     def save_to(self, path):
@@ -483,12 +501,39 @@ class FileBlobIndex(Model):
         unique_together = (("file", "blob", "offset"),)
 
 
+# Shared by all files read with ``read_ahead``, so that files which are never
+# closed (e.g. when the client of a streaming download disconnects) do not
+# leave threads behind.
+_read_ahead_pool = ThreadPoolExecutor(max_workers=READ_AHEAD_CONCURRENCY)
+
+
+def _fetch_blob(blob):
+    with blob.getfile() as f:
+        return f.read()
+
+
 class ChunkedFileBlobIndexWrapper:
-    def __init__(self, indexes, mode=None, prefetch=False, prefetch_to=None, delete=True):
+    def __init__(
+        self,
+        indexes,
+        mode=None,
+        prefetch=False,
+        prefetch_to=None,
+        delete=True,
+        read_ahead=0,
+        read_ahead_max_bytes=READ_AHEAD_MAX_BYTES,
+    ):
         # eager load from database incase its a queryset
         self._indexes = list(indexes)
         self._curfile = None
         self._curidx = None
+        self._nextpos = 0
+
+        # Blobs that are being fetched in the background, as a queue of
+        # ``(position, future)`` in the order in which they will be read.
+        self._read_ahead = 0 if prefetch else read_ahead
+        self._read_ahead_max_bytes = read_ahead_max_bytes
+        self._pending = deque()
         if prefetch:
             self.prefetched = True
             self._prefetch(prefetch_to, delete)
@@ -516,16 +561,52 @@ class ChunkedFileBlobIndexWrapper:
         assert not self.prefetched, "this makes no sense"
         old_file = self._curfile
         try:
-            try:
-                self._curidx = next(self._idxiter)
-                self._curfile = self._curidx.blob.getfile()
-            except StopIteration:
+            if self._nextpos < len(self._indexes):
+                self._curidx = self._indexes[self._nextpos]
+                self._curfile = self._open_blob(self._nextpos)
+                self._nextpos += 1
+                self._schedule_read_ahead()
+            else:
                 self._curidx = None
                 self._curfile = None
         finally:
             if old_file is not None:
                 old_file.close()
 
+    def _open_blob(self, pos):
+        if self._pending and self._pending[0][0] == pos:
+            _, future = self._pending.popleft()
+            return io.BytesIO(future.result())
+
+        self._cancel_read_ahead()
+        return self._indexes[pos].blob.getfile()
+
+    def _schedule_read_ahead(self):
+        """
+        Starts fetching the blobs following the current one, up to
+        ``read_ahead`` blobs and ``read_ahead_max_bytes`` held in memory.
+        """
+        if not self._read_ahead:
+            return
+
+        pending_bytes = sum(self._indexes[pos].blob.size for pos, _ in self._pending)
+        pos = self._pending[-1][0] + 1 if self._pending else self._nextpos
+        while len(self._pending) < self._read_ahead and pos < len(self._indexes):
+            blob = self._indexes[pos].blob
+            pending_bytes += blob.size
+            if pending_bytes > self._read_ahead_max_bytes:
+                break
+
+            self._pending.append((pos, _read_ahead_pool.submit(_fetch_blob, blob)))
+            pos += 1
+
+    def _cancel_read_ahead(self):
+        # Blobs that are already being fetched cannot be interrupted, their
+        # contents are dropped once the fetch completes.
+        while self._pending:
+            _, future = self._pending.popleft()
+            future.cancel()
+
     @property
     def size(self):
         return sum(i.blob.size for i in self._indexes)
@@ -565,6 +646,7 @@ class ChunkedFileBlobIndexWrapper:
         self._curfile = f
 
     def close(self):
+        self._cancel_read_ahead()
         if self._curfile:
             self._curfile.close()
         self._curfile = None
@@ -587,7 +669,8 @@ class ChunkedFileBlobIndexWrapper:
         for n, idx in enumerate(self._indexes[::-1]):
             if idx.offset <= pos:
                 if idx != self._curidx:
-                    self._idxiter = iter(self._indexes[-(n + 1) :])
+                    self._cancel_read_ahead()
+                    self._nextpos = len(self._indexes) - (n + 1)
                     self._nextidx()
                 break
         else:
@@ -681,3 +764,162 @@ def clear_cached_files(cache_path):
                     os.remove(cached_file)
                 except OSError:
                     pass
+
+
+class MappedBlobFile(FileObj):
+    """A file in the ``FileBlobCache``, read through a read-only memory map."""
+
+    def __init__(self, path):
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        super().__init__(mapped, name=path)
+        self.size = len(mapped)
+
+
+class FileBlobCache:
+    """
+    Local cache of blob contents, shared by all processes on a host that use
+    the same ``fileblob.cache-path``. The cache is disabled if no path is set.
+
+    Entries are stored by checksum and therefore never go stale. The checksum
+    is verified when a blob is fetched into the cache, and the size on every
+    read. ``clear_old_entries`` evicts the least recently read blobs once the
+    cache holds more than ``fileblob.cache-size`` bytes.
+    """
+
+    @property
+    def cache_path(self):
+        from sentry import options
+
+        return options.get("fileblob.cache-path")
+
+    @property
+    def enabled(self):
+        return bool(self.cache_path)
+
+    def _get_path(self, checksum):
+        return os.path.join(self.cache_path, checksum[:2], checksum[2:])
+
+    def getfile(self, blob):
+        try:
+            return self._getfile(blob)
+        except OSError:
+            # The cache is optional, a cache directory that cannot be used
+            # (full disk, missing permissions) must not break blob reads.
+            logger.warning("filestore.blob-cache.error", exc_info=True)
+            metrics.incr("filestore.blob-cache.error", sample_rate=1.0)
+            return get_storage().open(blob.path)
+
+    def _getfile(self, blob):
+        path = self._get_path(blob.checksum)
+
+        try:
+            fileobj = MappedBlobFile(path)
+        except (FileNotFoundError, ValueError):
+            # Empty files cannot be mapped, but blobs in the cache never are.
+            pass
+        else:
+            if fileobj.size == blob.size:
+                metrics.incr("filestore.blob-cache.hit", sample_rate=0.1)
+                self._touch(path)
+                return fileobj
+
+            # A truncated entry, fetch the blob again to replace it.
+            fileobj.close()
+            metrics.incr("filestore.blob-cache.corrupted", sample_rate=1.0)
+
+        metrics.incr("filestore.blob-cache.miss", sample_rate=0.1)
+        if not self._fetch(blob, path):
+            return get_storage().open(blob.path)
+
+        return MappedBlobFile(path)
+
+    def _touch(self, path):
+        # The modification time tracks when an entry was last used.
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def _fetch(self, blob, path):
+        """
+        Downloads a blob into the cache. The file is moved into place only
+        once its checksum is verified, so that concurrent readers never see a
+        partial entry.
+        """
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix="._fetch-", dir=directory)
+
+        try:
+            checksum = sha1(b"")
+            with os.fdopen(fd, "wb") as dst, get_storage().open(blob.path) as src:
+                for chunk in src.chunks():
+                    checksum.update(chunk)
+                    dst.write(chunk)
+
+            if checksum.hexdigest() != blob.checksum:
+                metrics.incr("filestore.blob-cache.checksum-mismatch", sample_rate=1.0)
+                return False
+
+            os.replace(temp_path, path)
+            return True
+        finally:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+
+    def clear_old_entries(self):
+        from sentry import options
+
+        cache_path = self.cache_path
+        if not cache_path:
+            return
+
+        try:
+            folders = list(os.scandir(cache_path))
+        except OSError:
+            return
+
+        entries = []
+        leftovers = []
+        total_size = 0
+        cutoff = time.time() - ONE_DAY
+
+        for folder in folders:
+            try:
+                items = list(os.scandir(folder.path))
+            except OSError:
+                continue
+            for item in items:
+                try:
+                    stat = item.stat()
+                except OSError:
+                    continue
+                if item.name.startswith("._fetch-"):
+                    # Leftovers of fetches that were killed halfway.
+                    if stat.st_mtime < cutoff:
+                        leftovers.append(item.path)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, item.path))
+                    total_size += stat.st_size
+
+        metrics.timing("filestore.blob-cache.size", total_size)
+
+        max_size = options.get("fileblob.cache-size")
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= max_size:
+                break
+            leftovers.append(path)
+            total_size -= size
+
+        for path in leftovers:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+fileblob_cache = FileBlobCache()
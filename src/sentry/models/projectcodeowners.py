@@ -135,10 +135,15 @@ class ProjectCodeOwners(DefaultFieldsModel):
         """
         Merge list of code_owners into a single code_owners object concatenating
         all the rules. We assume schema version is constant.
+
+        The ids and update times of the merged rows are kept as
+        ``merged_versions``, which identifies the revision of the merged schema.
         """
         merged_code_owners = None
+        merged_versions = []
         for code_owners in code_owners_list:
             if code_owners.schema:
+                merged_versions.append((code_owners.id, code_owners.date_updated))
                 if merged_code_owners is None:
                     merged_code_owners = code_owners
                     continue
@@ -147,6 +152,8 @@ class ProjectCodeOwners(DefaultFieldsModel):
                     *code_owners.schema["rules"],
                 ]
 
+        if merged_code_owners is not None:
+            merged_code_owners.merged_versions = tuple(merged_versions)
         return merged_code_owners
 
     def update_schema(self):
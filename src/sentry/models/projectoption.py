@@ -1,4 +1,4 @@
-from typing import TYPE_CHECKING, Any, Mapping, Optional, Sequence
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional, Sequence
 
 from django.db import models
 
@@ -69,6 +69,45 @@ class ProjectOptionManager(OptionManager["Project"]):
         values: Mapping[str, Value] = self._option_cache.get(cache_key, {})
         return values
 
+    def get_all_values_bulk(
+        self, projects: Sequence["Project"]
+    ) -> Mapping[int, Mapping[str, Value]]:
+        """
+        Like ``get_all_values``, but for many projects at once. Options that
+        are not cached yet are loaded with a single query.
+        """
+        values: Dict[int, Mapping[str, Value]] = {}
+        missing = []
+        for project in projects:
+            cache_key = self._make_key(project.id)
+            if cache_key in self._option_cache:
+                values[project.id] = self._option_cache[cache_key]
+            else:
+                missing.append(project.id)
+
+        if missing:
+            cache_keys = {project_id: self._make_key(project_id) for project_id in missing}
+            cached = cache.get_many(list(cache_keys.values()))
+            uncached = []
+            for project_id, cache_key in cache_keys.items():
+                result = cached.get(cache_key)
+                if result is None:
+                    uncached.append(project_id)
+                else:
+                    values[project_id] = self._option_cache[cache_key] = result
+
+            if uncached:
+                loaded: Dict[int, Dict[str, Value]] = {project_id: {} for project_id in uncached}
+                for option in self.filter(project__in=uncached):
+                    loaded[option.project_id][option.key] = option.value
+                for project_id, result in loaded.items():
+                    values[project_id] = self._option_cache[cache_keys[project_id]] = result
+                cache.set_many(
+                    {cache_keys[project_id]: result for project_id, result in loaded.items()}
+                )
+
+        return values
+
     def reload_cache(self, project_id: int, update_reason: str) -> Mapping[str, Value]:
         if update_reason != "projectoption.get_all_values":
             schedule_update_config_cache(
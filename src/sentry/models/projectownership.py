@@ -1,18 +1,26 @@
-from typing import Any, Mapping, Optional, Sequence, Tuple, Union
+from typing import Any, Hashable, Mapping, Optional, Sequence, Tuple, Union
 
 from django.db import models
 from django.db.models.signals import post_delete, post_save
 from django.utils import timezone
 
+from sentry import options
 from sentry.db.models import Model, sane_repr
 from sentry.db.models.fields import FlexibleForeignKey, JSONField
 from sentry.models import ActorTuple
-from sentry.ownership.grammar import Rule, load_schema, resolve_actors
+from sentry.ownership.grammar import CompiledSchema, Rule, compile_schema, resolve_actors
 from sentry.utils import metrics
 from sentry.utils.cache import cache
+from sentry.utils.lru import LRUCache
 
 READ_CACHE_DURATION = 3600
 
+# Compiled schemas by project and schema version, weighted by their number of rules.
+_compiled_schema_cache = LRUCache(
+    lambda: options.get("ownership.compiled-schema-cache-size"),
+    metrics_key="ownership.compiled_schema_cache",
+)
+
 
 class ProjectOwnership(Model):
     __include_in_export__ = True
@@ -39,6 +47,12 @@ class ProjectOwnership(Model):
     def get_cache_key(self, project_id):
         return f"projectownership_project_id:1:{project_id}"
 
+    def save(self, *args, **kwargs):
+        # Compiled schemas are cached by ``last_updated``, so it has to change
+        # whenever the schema may have.
+        self.last_updated = timezone.now()
+        return super().save(*args, **kwargs)
+
     @classmethod
     def get_combined_schema(self, ownership, codeowners):
         if codeowners and codeowners.schema:
@@ -98,9 +112,10 @@ class ProjectOwnership(Model):
             ownership = cls(project_id=project_id)
 
         codeowners = ProjectCodeOwners.get_codeowners_cached(project_id)
+        version = cls._schema_version(ownership, codeowners)
         ownership.schema = cls.get_combined_schema(ownership, codeowners)
 
-        rules = cls._matching_ownership_rules(ownership, project_id, data)
+        rules = cls._matching_ownership_rules(ownership, project_id, data, version)
 
         if not rules:
             return cls.Everyone if ownership.fallthrough else [], None
@@ -152,9 +167,15 @@ class ProjectOwnership(Model):
             if not ownership:
                 ownership = cls(project_id=project_id)
 
-            ownership_rules = cls._matching_ownership_rules(ownership, project_id, data)
+            ownership_rules = cls._matching_ownership_rules(
+                ownership, project_id, data, cls._schema_version(ownership)
+            )
             codeowners_rules = (
-                cls._matching_ownership_rules(codeowners, project_id, data) if codeowners else []
+                cls._matching_ownership_rules(
+                    codeowners, project_id, data, cls._schema_version(codeowners)
+                )
+                if codeowners
+                else []
             )
 
             if not (codeowners_rules or ownership_rules):
@@ -186,15 +207,55 @@ class ProjectOwnership(Model):
 
     @classmethod
     def _matching_ownership_rules(
-        cls, ownership: "ProjectOwnership", project_id: int, data: Mapping[str, Any]
+        cls,
+        ownership: "ProjectOwnership",
+        project_id: int,
+        data: Mapping[str, Any],
+        version: Optional[Hashable] = None,
     ) -> Sequence["Rule"]:
-        rules = []
-        if ownership.schema is not None:
-            for rule in load_schema(ownership.schema):
-                if rule.test(data):
-                    rules.append(rule)
+        if ownership.schema is None:
+            return []
+
+        return cls._compiled_schema(project_id, ownership.schema, version).matching_rules(data)
+
+    @classmethod
+    def _schema_version(cls, *sources: Any) -> Optional[Hashable]:
+        """
+        Identifies the revision of the schemas of ``sources`` (ownership and
+        code owners), or returns ``None`` if one of them has no known revision,
+        e.g. because it was never saved.
+        """
+        version = []
+        for source in sources:
+            if source is None or not source.schema:
+                continue
+            if isinstance(source, ProjectOwnership):
+                source_version = (source.id, source.last_updated) if source.id else None
+            else:
+                source_version = getattr(source, "merged_versions", None)
+            if source_version is None:
+                return None
+            version.append((type(source).__name__, source_version))
+        return tuple(version)
 
-        return rules
+    @classmethod
+    def _compiled_schema(
+        cls, project_id: int, schema: Mapping[str, Any], version: Optional[Hashable]
+    ) -> CompiledSchema:
+        """
+        Returns the compiled form of ``schema``. Compiled schemas are cached by
+        ``version``, which changes whenever one of the rows the schema is made
+        of is saved. Schemas without a version are compiled every time.
+        """
+        if version is None:
+            return compile_schema(schema)
+
+        key = (project_id, version)
+        compiled = _compiled_schema_cache.get(key)
+        if compiled is None:
+            compiled = compile_schema(schema)
+            _compiled_schema_cache.set(key, compiled, weight=max(len(compiled), 1))
+        return compiled
 
 
 # Signals update the cached reads used in post_processing
@@ -57,6 +57,11 @@ register(
     default=1024 * 1024 * 1024,
     flags=FLAG_PRIORITIZE_DISK,
 )
+# Shared on-disk cache of blob contents, disabled unless a path is configured.
+register(
+    "fileblob.cache-path", type=String, default="", flags=FLAG_ALLOW_EMPTY | FLAG_PRIORITIZE_DISK
+)
+register("fileblob.cache-size", type=Int, default=10 * 1024 ** 3, flags=FLAG_PRIORITIZE_DISK)
 
 
 # Mail
@@ -291,6 +296,10 @@ register("workflow.rollout-rate", default=0, flags=FLAG_PRIORITIZE_DISK)
 # in getsentry
 register("incidents-performance.rollout-rate", default=0, flags=FLAG_PRIORITIZE_DISK)
 
+# Answer comparison (percent change) metric alerts from the history of previous
+# subscription updates where possible, instead of querying Snuba for every update
+register("incidents.comparison-history-enabled", default=False, flags=FLAG_PRIORITIZE_DISK)
+
 # Max number of tags to combine in a single query in Discover2 tags facet.
 register("discover2.max_tags_to_combine", default=3, flags=FLAG_PRIORITIZE_DISK)
 
@@ -345,6 +354,19 @@ register("store.background-grouping-sample-rate", default=0.0)
 # True if background grouping should run before secondary and primary grouping
 register("store.background-grouping-before", default=False)
 
+# Number of frame and event match results shared across events by enhancement
+# and fingerprinting rules, in each process. Set to 0 to only cache results per
+# event.
+register("grouping.match-cache-size", default=10000, flags=FLAG_NOSTORE)
+
+# Number of parsed search queries kept in memory by ``parse_search_query``.
+# Read from the config file only, as search queries are parsed in tests that
+# cannot access the database.
+register("search.parse-cache-size", default=1000, flags=FLAG_NOSTORE)
+
+# Number of ownership rules kept compiled in process, across all projects
+register("ownership.compiled-schema-cache-size", default=50000, flags=FLAG_NOSTORE)
+
 # Store release files bundled as zip files
 register("processing.save-release-archives", default=False)  # unused
 
@@ -355,6 +377,19 @@ register("processing.release-archive-min-files", default=10)
 # Try to read release artifacts from zip archives
 register("processing.use-release-archives-sample-rate", default=0.0)  # unused
 
+# Number of threads used to fetch minified files and their source maps in parallel
+# while processing JavaScript events. A value of 1 fetches them one after another.
+register("processing.sourcemaps-fetch-concurrency", default=1)
+
+# Memory budget (in bytes of source map JSON) for the per-process cache of parsed
+# release source maps. Set to 0 to disable the cache.
+register("processing.sourcemap-view-cache-max-bytes", default=0)
+
+# Write RedisBuffer filters and extra values in the compact msgpack encoding
+# instead of pickle. Readers understand both, so this can be enabled once all
+# buffer consumers have been deployed.
+register("buffer.compact-encoding", default=False)
+
 # All Relay options (statically authenticated Relays can be registered here)
 register("relay.static_auth", default={}, flags=FLAG_NOSTORE)
 
@@ -366,9 +401,16 @@ register("eventstream:kafka-headers", default=False)
 register("post-process-forwarder:kafka-headers", default=False)
 # Number of threads to use for post processing
 register("post-process-forwarder:concurrency", default=1)
+# Number of events to post process in one task (at most 1000), 0 dispatches a task per event
+register("post-process-forwarder:batch-size", default=0)
 
 # Subscription queries sampling rate
 register("subscriptions-query.sample-rate", default=0.01)
+# Seconds the subscription consumer keeps subscriptions and alert rules cached in process.
+# Entries are also dropped whenever one of the cached models is saved.
+register("subscriptions-query.metadata-cache-ttl", default=300, flags=FLAG_PRIORITIZE_DISK)
+# Number of subscriptions the subscription consumer keeps cached in process
+register("subscriptions-query.metadata-cache-size", default=10000, flags=FLAG_NOSTORE)
 
 # The ratio of symbolication requests for which metrics will be submitted to redis.
 #
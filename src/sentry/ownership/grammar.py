@@ -1,8 +1,8 @@
 import operator
 import re
-from collections import namedtuple
-from functools import reduce
-from typing import Iterable, List, Mapping, Pattern, Tuple
+from collections import defaultdict, namedtuple
+from functools import lru_cache, reduce
+from typing import Any, Iterable, List, Mapping, Pattern, Sequence, Set, Tuple
 
 from django.db.models import Q
 from parsimonious.exceptions import ParseError  # noqa
@@ -13,7 +13,7 @@ from sentry.models import ActorTuple
 from sentry.utils.glob import glob_match
 from sentry.utils.safe import get_path
 
-__all__ = ("parse_rules", "dump_schema", "load_schema")
+__all__ = ("parse_rules", "dump_schema", "load_schema", "compile_schema")
 
 VERSION = 1
 
@@ -233,6 +233,7 @@ class OwnershipVisitor(NodeVisitor):
         return children or node
 
 
+@lru_cache(maxsize=10000)
 def _path_to_regex(pattern: str) -> Pattern[str]:
     """
     ported from https://github.com/hmarr/codeowners/blob/d0452091447bd2a29ee508eebc5a79874fb5d4ff/match.go#L33
@@ -337,6 +338,137 @@ def _iter_frames(data):
             continue
 
 
+class _PathIndexNode:
+    __slots__ = ("children", "positions")
+
+    def __init__(self):
+        self.children = {}
+        self.positions = []
+
+
+class CodeOwnersIndex:
+    """
+    Finds the CODEOWNERS rules whose pattern matches a path, without testing
+    the path against every pattern.
+
+    The index only narrows down the candidates, every candidate is still
+    confirmed with the regex of its pattern:
+
+    - Anchored patterns (``src/foo/*.py``) can only match paths that start
+      with their leading literal segments. They are kept in a trie of those
+      segments, which is walked along the segments of the path.
+    - Unanchored patterns without wildcards (``foo.py``, ``docs/``) have to
+      match one segment of the path exactly and are looked up by segment.
+    - All other patterns (``*.js``) are candidates for every path.
+    """
+
+    def __init__(self):
+        self._regexes = {}
+        self._root = _PathIndexNode()
+        self._by_segment = defaultdict(list)
+        self._unindexed = []
+
+    def add(self, position: int, pattern: str) -> None:
+        self._regexes[position] = _path_to_regex(pattern)
+
+        if pattern[0] == "\\":
+            self._unindexed.append(position)
+            return
+
+        slash_pos = pattern.find("/")
+        anchored = slash_pos > -1 and slash_pos != len(pattern) - 1
+        pattern = pattern.rstrip("/")
+
+        if not anchored:
+            if "*" in pattern or "?" in pattern:
+                self._unindexed.append(position)
+            else:
+                self._by_segment[pattern].append(position)
+            return
+
+        # Anchored patterns may or may not start with a slash.
+        node = self._root
+        for segment in pattern[1:].split("/") if pattern[0] == "/" else pattern.split("/"):
+            if "*" in segment or "?" in segment:
+                break
+            node = node.children.setdefault(segment, _PathIndexNode())
+        node.positions.append(position)
+
+    def _candidates(self, path: str) -> Iterable[int]:
+        yield from self._unindexed
+
+        segments = path.split("/")
+        for segment in set(segments):
+            yield from self._by_segment.get(segment, ())
+
+        # The leading slash of the path is optional for patterns that start
+        # with one, so the path is looked up both with and without it.
+        yield from self._root.positions
+        yield from self._walk(segments)
+        if path.startswith("/"):
+            yield from self._walk(segments[1:])
+
+    def _walk(self, segments: Sequence[str]) -> Iterable[int]:
+        node = self._root
+        for segment in segments:
+            node = node.children.get(segment)
+            if node is None:
+                break
+            yield from node.positions
+
+    def matching(self, path: str) -> Set[int]:
+        """Returns the positions of all rules that match the path."""
+        return {
+            position for position in self._candidates(path) if self._regexes[position].search(path)
+        }
+
+
+class CompiledSchema:
+    """
+    The rules of an ownership schema, prepared to be tested against many
+    events.
+
+    ``matching_rules`` returns the same rules as testing every rule against
+    the event, in schema order. CODEOWNERS rules are compiled once and all of
+    them are evaluated against the paths of the event's frames in one pass,
+    using a ``CodeOwnersIndex``.
+    """
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = rules
+        self._codeowners = CodeOwnersIndex()
+        self._other = []
+
+        for position, rule in enumerate(rules):
+            if rule.matcher.type == CODEOWNERS:
+                self._codeowners.add(position, rule.matcher.pattern)
+            else:
+                self._other.append(position)
+
+    def __len__(self):
+        return len(self.rules)
+
+    def matching_rules(self, data: Mapping[str, Any]) -> List[Rule]:
+        matched = set()
+
+        # Same as ``Matcher.test_codeowners``, which tests the filename or
+        # otherwise the absolute path of each frame.
+        paths = set()
+        for frame in _iter_frames(data):
+            value = frame.get("filename") or frame.get("abs_path")
+            if value:
+                paths.add(value)
+
+        for path in paths:
+            matched.update(self._codeowners.matching(path))
+
+        for position in self._other:
+            if self.rules[position].test(data):
+                matched.add(position)
+
+        return [self.rules[position] for position in sorted(matched)]
+
+
 def parse_rules(data):
     """Convert a raw text input into a Rule tree"""
     tree = ownership_grammar.parse(data)
@@ -355,6 +487,11 @@ def load_schema(schema):
     return [Rule.load(r) for r in schema["rules"]]
 
 
+def compile_schema(schema):
+    """Convert a JSON schema into a ``CompiledSchema``"""
+    return CompiledSchema(load_schema(schema))
+
+
 def convert_schema_to_rules_text(schema):
     rules = load_schema(schema)
     text = ""
@@ -1,9 +1,8 @@
-import functools
 from time import time
 
 from sentry.constants import DataCategory
 from sentry.quotas.base import NotRateLimited, Quota, QuotaConfig, QuotaScope, RateLimited
-from sentry.utils.compat import map, zip
+from sentry.utils.compat import zip
 from sentry.utils.redis import (
     get_dynamic_cluster_from_options,
     load_script,
@@ -112,36 +111,71 @@ class RedisQuota(Quota):
         return results
 
     def get_usage(self, organization_id, quotas, timestamp=None):
+        return self.get_usage_many([(organization_id, quotas)], timestamp=timestamp)[0]
+
+    def get_usage_many(self, requests, timestamp=None):
+        """
+        Returns the current usage of quotas for many organizations at once.
+
+        ``requests`` is a sequence of ``(organization_id, quotas)`` pairs. The
+        result contains one list per request, holding the usage of each quota
+        in the same order as ``get_usage`` would return it. Quotas that are not
+        tracked have a usage of ``None``.
+
+        Rather than querying organizations one after another, keys are grouped
+        by the node they are stored on and each node is read in a single round
+        trip.
+        """
         if timestamp is None:
             timestamp = time()
 
-        def get_usage_for_quota(client, quota):
-            if not quota.should_track:
-                return (None, None)
-
-            key = self.__get_redis_key(
-                quota, timestamp, organization_id % quota.window, organization_id
-            )
-            refund_key = self.get_refunded_quota_key(key)
+        results = [[None] * len(quotas) for _, quotas in requests]
 
-            return (client.get(key), client.get(refund_key))
+        # (routing key, redis key, refund key, request index, quota index)
+        reads = []
+        for i, (organization_id, quotas) in enumerate(requests):
+            for j, quota in enumerate(quotas):
+                if not quota.should_track:
+                    continue
 
-        def get_value_for_result(result, refund_result):
-            if result is None:
-                return None
+                key = self.__get_redis_key(
+                    quota, timestamp, organization_id % quota.window, organization_id
+                )
+                reads.append((str(organization_id), key, self.get_refunded_quota_key(key), i, j))
 
-            return int(result.value or 0) - int(refund_result.value or 0)
+        if not reads:
+            return results
 
         if self.is_redis_cluster:
-            results = map(functools.partial(get_usage_for_quota, self.cluster), quotas)
+            # The pipeline dispatches every command to the node owning its
+            # slot and sends all commands for one node together.
+            pipe = self.cluster.pipeline(transaction=False)
+            for _, key, refund_key, _, _ in reads:
+                pipe.get(key)
+                pipe.get(refund_key)
+            values = pipe.execute()
+            values_by_read = zip(values[::2], values[1::2])
         else:
-            with self.cluster.fanout() as client:
-                results = map(
-                    functools.partial(get_usage_for_quota, client.target_key(str(organization_id))),
-                    quotas,
-                )
+            router = self.cluster.get_router()
+            reads_by_host = {}
+            for read in reads:
+                reads_by_host.setdefault(router.get_host_for_key(read[0]), []).append(read)
+
+            # Reads are reordered by host so that they line up with the values.
+            reads = []
+            values_by_read = []
+            for host, host_reads in reads_by_host.items():
+                keys = []
+                for _, key, refund_key, _, _ in host_reads:
+                    keys.extend((key, refund_key))
+                values = self.cluster.get_local_client(host).mget(keys)
+                values_by_read.extend(zip(values[::2], values[1::2]))
+                reads.extend(host_reads)
+
+        for (_, _, _, i, j), (value, refund_value) in zip(reads, values_by_read):
+            results[i][j] = int(value or 0) - int(refund_value or 0)
 
-        return [get_value_for_result(*r) for r in results]
+        return results
 
     def get_refunded_quota_key(self, key):
         return f"r:{key}"
@@ -1,10 +1,45 @@
+from time import time
+from typing import NamedTuple, Optional, Sequence
+
 from sentry.utils.services import Service
 
 
+class RateLimitCheck(NamedTuple):
+    key: str
+    limit: int
+    window: Optional[int] = None
+    project: Optional[object] = None
+    #: The algorithm to enforce the limit with, if the backend supports
+    #: several. Defaults to the one configured for the backend.
+    algorithm: Optional[str] = None
+
+
+class RateLimitResult(NamedTuple):
+    #: Whether the check was rejected. Nothing is consumed for rejected checks.
+    is_limited: bool
+    #: How many more requests would be accepted right now.
+    remaining: int
+    #: Unix timestamp at which the full budget is available again.
+    reset_time: float
+
+
 class RateLimiter(Service):
-    __all__ = ("is_limited", "validate")
+    __all__ = ("is_limited", "check_many", "validate")
 
     window = 60
 
     def is_limited(self, key, limit, project=None, window=None):
         return False
+
+    def check_many(self, checks: Sequence[RateLimitCheck]) -> Sequence[RateLimitResult]:
+        """
+        Evaluates several rate limits at once and returns one result per check.
+
+        Budget is only consumed if none of the checks is limited, so a request
+        that is rejected by one limit does not count against the others.
+        """
+        now = time()
+        return [
+            RateLimitResult(False, max(check.limit - 1, 0), now + (check.window or self.window))
+            for check in checks
+        ]
@@ -1,18 +1,42 @@
+from collections import defaultdict
 from time import time
 
 from redis.exceptions import RedisError
 from sentry_sdk import capture_exception
 
 from sentry.exceptions import InvalidConfiguration
-from sentry.ratelimits.base import RateLimiter
+from sentry.ratelimits.base import RateLimitCheck, RateLimiter, RateLimitResult
 from sentry.utils.hashlib import md5_text
-from sentry.utils.redis import get_cluster_from_options
+from sentry.utils.redis import get_cluster_from_options, load_script
+
+check_rate_limits = load_script("ratelimits/check.lua")
+
+#: The supported algorithms and the prefix of their keys. See
+#: ``ratelimits/check.lua`` for how each of them works.
+ALGORITHMS = {
+    "fixed-window": "f",
+    "sliding-window": "s",
+    "token-bucket": "t",
+}
 
 
 class RedisRateLimiter(RateLimiter):
+    """
+    Rate limits stored in Redis, enforced with one of ``ALGORITHMS``.
+
+    ``algorithm`` is used for checks that do not ask for one themselves.
+    A sliding window does not let twice the limit through around window
+    boundaries, which the default fixed window does. A token bucket
+    additionally spreads requests evenly across the window once its burst is
+    used up.
+    """
+
     window = 60
 
-    def __init__(self, **options):
+    def __init__(self, algorithm="fixed-window", **options):
+        if algorithm not in ALGORITHMS:
+            raise InvalidConfiguration(f"Unknown rate limit algorithm: {algorithm!r}")
+        self.algorithm = algorithm
         self.cluster, options = get_cluster_from_options("SENTRY_RATELIMITER_OPTIONS", options)
 
     def validate(self):
@@ -22,25 +46,61 @@ class RedisRateLimiter(RateLimiter):
         except Exception as e:
             raise InvalidConfiguration(str(e))
 
+    def _get_algorithm(self, check):
+        algorithm = check.algorithm or self.algorithm
+        if algorithm not in ALGORITHMS:
+            raise InvalidConfiguration(f"Unknown rate limit algorithm: {algorithm!r}")
+        return algorithm
+
+    def _make_key(self, check, algorithm, now):
+        key_hex = md5_text(check.key).hexdigest()
+        key = f"{key_hex}:{check.project.id}" if check.project else key_hex
+
+        # Fixed windows keep the original layout of one counter per window.
+        if algorithm == "fixed-window":
+            bucket = int(now / (check.window or self.window))
+            return f"rl:{key}:{bucket}"
+        return f"rl:{ALGORITHMS[algorithm]}:{key}"
+
     def is_limited(self, key, limit, project=None, window=None):
-        if window is None:
-            window = self.window
+        return self.check_many([RateLimitCheck(key, limit, window, project)])[0].is_limited
 
-        key_hex = md5_text(key).hexdigest()
-        bucket = int(time() / window)
+    def check_many(self, checks):
+        """
+        Evaluates all checks with a single script call per Redis host.
 
-        if project:
-            key = f"rl:{key_hex}:{project.id}:{bucket}"
-        else:
-            key = f"rl:{key_hex}:{bucket}"
+        Checks stored on the same host are applied atomically, budget is only
+        consumed if none of them is limited.
+        """
+        now = time()
+        router = self.cluster.get_router()
 
-        try:
-            with self.cluster.map() as client:
-                result = client.incr(key)
-                client.expire(key, window)
-            return result.value > limit
-        except RedisError as e:
-            # We don't want rate limited endpoints to fail when ratelimits
-            # can't be updated. We do want to know when that happens.
-            capture_exception(e)
-            return False
+        checks_by_host = defaultdict(list)
+        for index, check in enumerate(checks):
+            algorithm = self._get_algorithm(check)
+            key = self._make_key(check, algorithm, now)
+            checks_by_host[router.get_host_for_key(key)].append((index, key, algorithm, check))
+
+        results = [None] * len(checks)
+        for host, host_checks in checks_by_host.items():
+            keys = []
+            args = [now]
+            for _, key, algorithm, check in host_checks:
+                keys.append(key)
+                args.extend((algorithm, check.limit, check.window or self.window))
+
+            try:
+                values = check_rate_limits(self.cluster.get_local_client(host), keys, args)
+            except RedisError as e:
+                # We don't want rate limited endpoints to fail when ratelimits
+                # can't be updated. We do want to know when that happens.
+                capture_exception(e)
+                values = [
+                    (False, max(check.limit - 1, 0), (check.window or self.window) * 1000)
+                    for _, _, _, check in host_checks
+                ]
+
+            for (index, _, _, _), (rejected, remaining, reset) in zip(host_checks, values):
+                results[index] = RateLimitResult(bool(rejected), remaining, now + reset / 1000.0)
+
+        return results
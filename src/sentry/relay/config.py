@@ -1,6 +1,6 @@
 import uuid
 from datetime import datetime
-from typing import List
+from typing import Any, List, Mapping, Optional, Sequence
 
 from pytz import utc
 from sentry_sdk import Hub
@@ -16,7 +16,7 @@ from sentry.ingest.inbound_filters import (
     get_filter_key,
 )
 from sentry.interfaces.security import DEFAULT_DISALLOWED_SOURCES
-from sentry.models import Project, ProjectKeyStatus
+from sentry.models import Organization, Project, ProjectKey, ProjectKeyStatus, ProjectOption
 from sentry.relay.utils import to_camel_case_name
 from sentry.utils.http import get_origins
 from sentry.utils.sdk import configure_scope
@@ -27,7 +27,48 @@ EXPOSABLE_FEATURES = [
 ]
 
 
-def get_exposed_features(project: Project) -> List[str]:
+#: Feature flags checked while building project configs. They are checked in
+#: batch by ``get_project_configs``.
+ORGANIZATION_CONFIG_FEATURES = [
+    "organizations:filters-and-sampling",
+    "organizations:performance-ops-breakdown",
+] + [f for f in EXPOSABLE_FEATURES if f.startswith("organizations:")]
+PROJECT_CONFIG_FEATURES = [
+    "projects:custom-inbound-filters",
+    "projects:performance-suspect-spans-ingestion",
+] + [f for f in EXPOSABLE_FEATURES if f.startswith("projects:")]
+
+
+class FeatureSnapshot:
+    """
+    Feature flags of a set of projects and their organizations, checked in
+    batch up front. Can be used in place of ``sentry.features`` when building
+    configs; flags that were not checked up front are looked up on demand.
+    """
+
+    def __init__(self, projects: Sequence[Project]) -> None:
+        self.__flags = {}
+
+        projects_by_organization = {}
+        for project in projects:
+            projects_by_organization.setdefault(project.organization, []).append(project)
+
+        for organization, organization_projects in projects_by_organization.items():
+            for name in ORGANIZATION_CONFIG_FEATURES:
+                self.__flags[(name, organization)] = features.has(name, organization)
+            for name in PROJECT_CONFIG_FEATURES:
+                batch = features.has_for_batch(name, organization, organization_projects)
+                for project, flag in batch.items():
+                    self.__flags[(name, project)] = flag
+
+    def has(self, name: str, obj: Any) -> bool:
+        key = (name, obj)
+        if key not in self.__flags:
+            self.__flags[key] = features.has(name, obj)
+        return self.__flags[key]
+
+
+def get_exposed_features(project: Project, features: Any = features) -> List[str]:
 
     active_features = []
     for feature in EXPOSABLE_FEATURES:
@@ -70,7 +111,7 @@ def get_public_key_configs(project, full_config, project_keys=None):
     return public_keys
 
 
-def get_filter_settings(project):
+def get_filter_settings(project, features=features):
     filter_settings = {}
 
     for flt in get_all_filter_specs():
@@ -105,6 +146,64 @@ def get_quotas(project, keys=None):
     return [quota.to_json() for quota in quotas.get_quotas(project, keys=keys)]
 
 
+def get_project_configs(
+    projects: Sequence[Project],
+    full_config: bool = True,
+    project_keys: Optional[Mapping[int, Sequence[ProjectKey]]] = None,
+) -> Mapping[int, "ProjectConfig"]:
+    """
+    Constructs the ProjectConfigs of many projects at once, e.g. of all
+    projects of an organization.
+
+    Instead of loading them again for every project, the options of all
+    projects are fetched with one query, every organization is loaded once
+    and feature flags are checked in batch.
+
+    :param project_keys: Pre-fetched project keys by project ID, see
+        ``get_project_config``.
+
+    :return: a dict mapping project IDs to ProjectConfig objects
+    """
+    organizations = {}
+    for project in projects:
+        organization = organizations.get(project.organization_id)
+        if organization is None:
+            organization = organizations[
+                project.organization_id
+            ] = Organization.objects.get_from_cache(id=project.organization_id)
+        project.organization = organization
+
+    ProjectOption.objects.get_all_values_bulk(projects)
+    feature_snapshot = FeatureSnapshot(projects)
+
+    return {
+        project.id: _get_project_config(
+            project,
+            full_config=full_config,
+            project_keys=(project_keys or {}).get(project.id, []),
+            features=feature_snapshot,
+        )
+        for project in projects
+    }
+
+
+def restrict_project_config_to_key(project, project_config, project_key):
+    """
+    Returns the full ProjectConfig restricted to a single key, which is the
+    same as ``get_project_config(project, project_keys=[project_key])``.
+
+    Only the key and its quotas are looked up, everything else is taken over
+    from ``project_config``, the full config of the project.
+    """
+    data = project_config.to_dict()
+    if data.get("disabled"):
+        return ProjectConfig(project, **data)
+
+    data["publicKeys"] = get_public_key_configs(project, True, project_keys=[project_key])
+    data["config"] = dict(data["config"], quotas=get_quotas(project, keys=[project_key]))
+    return ProjectConfig(project, **data)
+
+
 def get_project_config(project, full_config=True, project_keys=None):
     """
     Constructs the ProjectConfig information.
@@ -122,6 +221,10 @@ def get_project_config(project, full_config=True, project_keys=None):
 
     :return: a ProjectConfig object for the given project
     """
+    return _get_project_config(project, full_config, project_keys, features)
+
+
+def _get_project_config(project, full_config, project_keys, features):
     with configure_scope() as scope:
         scope.set_tag("project", project.id)
 
@@ -148,7 +251,7 @@ def get_project_config(project, full_config=True, project_keys=None):
                 ],
                 "piiConfig": get_pii_config(project),
                 "datascrubbingSettings": get_datascrubbing_settings(project),
-                "features": get_exposed_features(project),
+                "features": get_exposed_features(project, features),
             },
             "organizationId": project.organization_id,
             "projectId": project.id,  # XXX: Unused by Relay, required by Python store
@@ -168,10 +271,10 @@ def get_project_config(project, full_config=True, project_keys=None):
 
     if features.has("organizations:performance-ops-breakdown", project.organization):
         cfg["config"]["breakdownsV2"] = project.get_option("sentry:breakdowns")
-    if features.has("projects:performance-suspect-spans-ingestion", project=project):
+    if features.has("projects:performance-suspect-spans-ingestion", project):
         cfg["config"]["spanAttributes"] = project.get_option("sentry:span_attributes")
     with Hub.current.start_span(op="get_filter_settings"):
-        cfg["config"]["filterSettings"] = get_filter_settings(project)
+        cfg["config"]["filterSettings"] = get_filter_settings(project, features)
     with Hub.current.start_span(op="get_grouping_config_dict_for_project"):
         cfg["config"]["groupingConfig"] = get_grouping_config_dict_for_project(project)
     with Hub.current.start_span(op="get_event_retention"):
@@ -24,29 +24,37 @@ class RedisProjectConfigCache(ProjectConfigCache):
         else:
             return self.cluster.get_local_client_for_key(routing_key)
 
-    def set_many(self, configs):
-        for project_id, config in configs.items():
-            # XXX(markus): Figure out how to do pipelining here. We may have
-            # multiple routing keys (-> multiple clients).
-            #
-            # We cannot route by org, because Relay does not know the org when
-            # fetching.
+    def __execute_many(self, commands):
+        """
+        Execute a sequence of ``(command, key, *args)`` tuples with one
+        pipeline per node.
 
-            key = self.__get_redis_key(project_id)
-            client = self.__get_redis_client(key)
-            client.setex(key, REDIS_CACHE_TIMEOUT, json.dumps(config))
+        We cannot route by org, because Relay does not know the org when
+        fetching, so the keys are spread over all nodes.
+        """
+        if self.is_redis_cluster:
+            # The cluster client splits the pipeline up by node.
+            with self.cluster.pipeline(transaction=False) as pipeline:
+                for command, *args in commands:
+                    getattr(pipeline, command)(*args)
+                pipeline.execute()
+        else:
+            with self.cluster.map() as client:
+                for command, *args in commands:
+                    getattr(client, command)(*args)
+
+    def set_many(self, configs):
+        self.__execute_many(
+            [
+                ("setex", self.__get_redis_key(project_id), REDIS_CACHE_TIMEOUT, json.dumps(config))
+                for project_id, config in configs.items()
+            ]
+        )
 
     def delete_many(self, project_ids):
-        for project_id in project_ids:
-            # XXX(markus): Figure out how to do pipelining here. We may have
-            # multiple routing keys (-> multiple clients).
-            #
-            # We cannot route by org, because Relay does not know the org when
-            # fetching.
-
-            key = self.__get_redis_key(project_id)
-            client = self.__get_redis_client(key)
-            client.delete(key)
+        self.__execute_many(
+            [("delete", self.__get_redis_key(project_id)) for project_id in project_ids]
+        )
 
     def get(self, project_id):
         key = self.__get_redis_key(project_id)
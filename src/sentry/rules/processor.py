@@ -1,14 +1,17 @@
 import logging
-from collections import namedtuple
+import operator
+from collections import defaultdict, namedtuple
 from datetime import timedelta
+from functools import reduce
 from random import randrange
-from typing import Mapping, Sequence, Set
+from typing import List, Mapping, MutableMapping, Optional, Sequence, Set, Tuple
 
 from django.core.cache import cache
+from django.db.models import Q
 from django.utils import timezone
 
 from sentry import analytics
-from sentry.models import GroupRuleStatus, Rule
+from sentry.models import Group, GroupRuleStatus, Rule
 from sentry.rules import EventState, rules
 from sentry.utils.hashlib import hash_values
 from sentry.utils.safe import safe_execute
@@ -16,11 +19,150 @@ from sentry.utils.safe import safe_execute
 RuleFuture = namedtuple("RuleFuture", ["rule", "kwargs"])
 SLOW_CONDITION_MATCHES = ["event_frequency"]
 
+logger = logging.getLogger("sentry.rules")
+
+
+def _build_rule_status_cache_key(group_id: int, rule_id: int) -> str:
+    return "grouprulestatus:1:%s" % hash_values([group_id, rule_id])
+
+
+def bulk_get_rule_status(
+    group_rules: Sequence[Tuple[Group, Sequence[Rule]]]
+) -> Mapping[Tuple[int, int], GroupRuleStatus]:
+    """
+    Returns the ``GroupRuleStatus`` of every rule for its group, keyed by
+    ``(group_id, rule_id)``, creating the ones that don't exist yet.
+
+    Statuses are read from the cache first, and the statuses of all groups
+    that are not cached are fetched and created with the same queries.
+    """
+    groups = {group.id: group for group, _ in group_rules}
+    keys = {
+        _build_rule_status_cache_key(group.id, rule.id): (group.id, rule.id)
+        for group, rules in group_rules
+        for rule in rules
+    }
+    cache_results: Mapping[str, GroupRuleStatus] = cache.get_many(list(keys))
+    rule_statuses: MutableMapping[Tuple[int, int], GroupRuleStatus] = {}
+    missing: MutableMapping[int, Set[int]] = defaultdict(set)
+    for key, (group_id, rule_id) in keys.items():
+        rule_status = cache_results.get(key)
+        if not rule_status:
+            missing[group_id].add(rule_id)
+        else:
+            rule_statuses[(group_id, rule_id)] = rule_status
+
+    if not missing:
+        return rule_statuses
+
+    to_cache: List[GroupRuleStatus] = []
+
+    def fetch_missing() -> None:
+        statuses = GroupRuleStatus.objects.filter(
+            reduce(
+                operator.or_,
+                (
+                    Q(group_id=group_id, rule_id__in=rule_ids)
+                    for group_id, rule_ids in missing.items()
+                ),
+            )
+        )
+        for status in statuses:
+            rule_statuses[(status.group_id, status.rule_id)] = status
+            missing[status.group_id].discard(status.rule_id)
+            if not missing[status.group_id]:
+                del missing[status.group_id]
+            to_cache.append(status)
+
+    # If not cached, attempt to fetch status from the database
+    fetch_missing()
+
+    # We might need to create some statuses if they don't already exist
+    if missing:
+        # We use `ignore_conflicts=True` here to avoid race conditions where the statuses
+        # might be created between when we queried above and attempt to create the rows now.
+        GroupRuleStatus.objects.bulk_create(
+            [
+                GroupRuleStatus(
+                    rule_id=rule_id, group=groups[group_id], project_id=groups[group_id].project_id
+                )
+                for group_id, rule_ids in missing.items()
+                for rule_id in rule_ids
+            ],
+            ignore_conflicts=True,
+        )
+        # Using `ignore_conflicts=True` prevents the pk from being set on the model
+        # instances. Re-query the database to fetch the rows, they should all exist at this
+        # point.
+        fetch_missing()
+
+        if missing:
+            # Shouldn't happen, but log just in case
+            for group_id, rule_ids in missing.items():
+                logger.error(
+                    "Failed to fetch some GroupRuleStatuses in RuleProcessor",
+                    extra={"missing_rule_ids": rule_ids, "group_id": group_id},
+                )
+
+    if to_cache:
+        cache.set_many(
+            {_build_rule_status_cache_key(item.group_id, item.rule_id): item for item in to_cache}
+        )
+
+    return rule_statuses
+
+
+class RuleSnapshot:
+    """
+    The rules and rule statuses of a batch of events, fetched up front and
+    shared by the ``RuleProcessor`` of every event in the batch.
+    """
+
+    def __init__(
+        self,
+        rules: Mapping[int, Sequence[Rule]],
+        rule_statuses: Mapping[Tuple[int, int], GroupRuleStatus],
+    ):
+        self.rules = rules
+        self.rule_statuses = rule_statuses
+
+    @classmethod
+    def for_groups(cls, groups: Sequence[Group]) -> "RuleSnapshot":
+        rules = {
+            project_id: Rule.get_for_project(project_id)
+            for project_id in {group.project_id for group in groups}
+        }
+        rule_statuses = bulk_get_rule_status([(group, rules[group.project_id]) for group in groups])
+        return cls(rules, rule_statuses)
+
+    def get_rules(self, project_id: int) -> Optional[Sequence[Rule]]:
+        return self.rules.get(project_id)
+
+    def get_rule_statuses(
+        self, group_id: int, rules: Sequence[Rule]
+    ) -> Optional[Mapping[int, GroupRuleStatus]]:
+        """
+        Returns the statuses of ``rules`` for the group, or ``None`` if any of
+        them is not part of the snapshot.
+        """
+        try:
+            return {rule.id: self.rule_statuses[(group_id, rule.id)] for rule in rules}
+        except KeyError:
+            return None
 
-class RuleProcessor:
-    logger = logging.getLogger("sentry.rules")
 
-    def __init__(self, event, is_new, is_regression, is_new_group_environment, has_reappeared):
+class RuleProcessor:
+    logger = logger
+
+    def __init__(
+        self,
+        event,
+        is_new,
+        is_regression,
+        is_new_group_environment,
+        has_reappeared,
+        snapshot: Optional[RuleSnapshot] = None,
+    ):
         self.event = event
         self.group = event.group
         self.project = event.project
@@ -29,6 +171,7 @@ class RuleProcessor:
         self.is_regression = is_regression
         self.is_new_group_environment = is_new_group_environment
         self.has_reappeared = has_reappeared
+        self.snapshot = snapshot
 
         self.grouped_futures = {}
 
@@ -38,68 +181,20 @@ class RuleProcessor:
 
         :return: a list of `Rule`s
         """
+        if self.snapshot is not None:
+            rules = self.snapshot.get_rules(self.project.id)
+            if rules is not None:
+                return rules
         return Rule.get_for_project(self.project.id)
 
-    def _build_rule_status_cache_key(self, rule_id: int) -> str:
-        return "grouprulestatus:1:%s" % hash_values([self.group.id, rule_id])
-
     def bulk_get_rule_status(self, rules: Sequence[Rule]) -> Mapping[int, GroupRuleStatus]:
-        keys = [self._build_rule_status_cache_key(rule.id) for rule in rules]
-        cache_results: Mapping[str, GroupRuleStatus] = cache.get_many(keys)
-        missing_rule_ids: Set[int] = set()
-        rule_statuses: Mapping[int, GroupRuleStatus] = {}
-        for key, rule in zip(keys, rules):
-            rule_status = cache_results.get(key)
-            if not rule_status:
-                missing_rule_ids.add(rule.id)
-            else:
-                rule_statuses[rule.id] = rule_status
-
-        if missing_rule_ids:
-            # If not cached, attempt to fetch status from the database
-            statuses = GroupRuleStatus.objects.filter(
-                group=self.group, rule_id__in=missing_rule_ids
-            )
-            to_cache: Sequence[GroupRuleStatus] = list()
-            for status in statuses:
-                rule_statuses[status.rule_id] = status
-                missing_rule_ids.remove(status.rule_id)
-                to_cache.append(status)
-
-            # We might need to create some statuses if they don't already exist
-            if missing_rule_ids:
-                # We use `ignore_conflicts=True` here to avoid race conditions where the statuses
-                # might be created between when we queried above and attempt to create the rows now.
-                GroupRuleStatus.objects.bulk_create(
-                    [
-                        GroupRuleStatus(rule_id=rule_id, group=self.group, project=self.project)
-                        for rule_id in missing_rule_ids
-                    ],
-                    ignore_conflicts=True,
-                )
-                # Using `ignore_conflicts=True` prevents the pk from being set on the model
-                # instances. Re-query the database to fetch the rows, they should all exist at this
-                # point.
-                statuses = GroupRuleStatus.objects.filter(
-                    group=self.group, rule_id__in=missing_rule_ids
-                )
-                for status in statuses:
-                    rule_statuses[status.rule_id] = status
-                    missing_rule_ids.remove(status.rule_id)
-                    to_cache.append(status)
-
-                if missing_rule_ids:
-                    # Shouldn't happen, but log just in case
-                    self.logger.error(
-                        "Failed to fetch some GroupRuleStatuses in RuleProcessor",
-                        extra={"missing_rule_ids": missing_rule_ids, "group_id": self.group.id},
-                    )
-            if to_cache:
-                cache.set_many(
-                    {self._build_rule_status_cache_key(item.rule_id): item for item in to_cache}
-                )
+        if self.snapshot is not None:
+            rule_statuses = self.snapshot.get_rule_statuses(self.group.id, rules)
+            if rule_statuses is not None:
+                return rule_statuses
 
-        return rule_statuses
+        statuses = bulk_get_rule_status([(self.group, rules)])
+        return {rule_id: status for (_, rule_id), status in statuses.items()}
 
     def condition_matches(self, condition, state, rule):
         condition_cls = rules.get(condition["id"])
@@ -201,6 +296,9 @@ class RuleProcessor:
         if not updated:
             return
 
+        # The status may be shared with later events of the same group.
+        status.last_active = now
+
         if randrange(10) == 0:
             analytics.record(
                 "issue_alert.fired",
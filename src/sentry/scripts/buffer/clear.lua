@@ -0,0 +1,45 @@
+-- Remove buffered increments that have been applied to the database. Values
+-- provided as ``KEYS`` are pairs of a buffer hash and the pending set it is
+-- queued in. ``ARGV`` holds, for every hash, the number of fields that were
+-- read from it followed by those fields and their values.
+--
+-- For example, to clear ``foo`` (queued in ``b:p``) after applying an
+-- increment of 2 read from it:
+--
+--   KEYS = {"foo", "b:p"}
+--   ARGV = {3, "m", "sentry.models.Group", "f", "{...}", "i+times_seen", 2}
+--
+-- The applied amounts are subtracted from the counters of the hash. The hash
+-- is only deleted and removed from its pending set if nothing was written to
+-- it since it was read, otherwise it is kept with the remaining increments
+-- and the latest values of the other fields.
+assert(#KEYS % 2 == 0, "there must be an even number of keys")
+
+local offset = 1
+for i = 1, #KEYS, 2 do
+    local key = KEYS[i]
+    local count = tonumber(ARGV[offset])
+    local exists = redis.call('EXISTS', key) == 1
+    local changed = false
+
+    for j = offset + 1, offset + count * 2, 2 do
+        local field = ARGV[j]
+        local value = ARGV[j + 1]
+        if not exists then
+            break
+        elseif string.sub(field, 1, 2) == 'i+' then
+            if redis.call('HINCRBY', key, field, -tonumber(value)) ~= 0 then
+                changed = true
+            end
+        elseif redis.call('HGET', key, field) ~= value then
+            changed = true
+        end
+    end
+
+    if not exists or (not changed and redis.call('HLEN', key) == count) then
+        redis.call('DEL', key)
+        redis.call('ZREM', KEYS[i + 1], key)
+    end
+
+    offset = offset + count * 2 + 1
+end
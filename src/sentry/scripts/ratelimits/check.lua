@@ -0,0 +1,135 @@
+-- Check a collection of rate limits and consume one unit of budget from each
+-- of them if none is exceeded. Every value in ``KEYS`` holds the state of one
+-- limit. ``ARGV`` starts with the current Unix timestamp (in seconds, may be
+-- fractional), followed by the algorithm, limit and window (in seconds) of
+-- every key.
+--
+-- The supported algorithms are:
+--
+--   ``fixed-window``:   Counts requests in consecutive windows. Allows bursts
+--                       of up to twice the limit around window boundaries.
+--                       Every window has its own key, holding a plain
+--                       counter.
+--   ``sliding-window``: Weighs the count of the previous window by how much it
+--                       still overlaps with a window ending now.
+--   ``token-bucket``:   A bucket of ``limit`` tokens refilled at a rate of
+--                       ``limit`` per window (implemented as GCRA, storing the
+--                       time at which the bucket is full again).
+--
+-- For example, to check a limit of 10 requests per minute for ``foo`` with a
+-- sliding window and 100 requests per hour for ``bar`` with a fixed window:
+--
+--   KEYS = {"foo", "bar:454046"}
+--   ARGV = {1634567890.123, "sliding-window", 10, 60, "fixed-window", 100, 3600}
+--
+-- The result contains one ``{rejected, remaining, reset}`` triple per key,
+-- where ``rejected`` is 1 if the limit is exceeded, ``remaining`` is the
+-- number of requests that are still accepted after this one and ``reset`` is
+-- the number of milliseconds until the full budget is available again.
+assert(#ARGV == #KEYS * 3 + 1, "incorrect number of keys and arguments provided")
+
+local now = tonumber(ARGV[1])
+
+-- Every check returns the budget used before this request and a function
+-- that consumes one unit. Both that function and the check itself also return
+-- the number of seconds until the full budget is available again.
+
+local function check_fixed_window(key, limit, window)
+    local count = tonumber(redis.call('GET', key)) or 0
+    local window_end = (math.floor(now / window) + 1) * window - now
+    local function consume()
+        redis.call('INCR', key)
+        redis.call('EXPIRE', key, window)
+        return window_end
+    end
+
+    return count, count > 0 and window_end or 0, consume
+end
+
+local function check_sliding_window(key, limit, window)
+    local bucket = math.floor(now / window)
+    local state = redis.call('HMGET', key, 'b', 'c', 'p')
+    local stored_bucket = tonumber(state[1])
+    local count, previous = 0, 0
+    if stored_bucket == bucket then
+        count, previous = tonumber(state[2]), tonumber(state[3])
+    elseif stored_bucket == bucket - 1 then
+        previous = tonumber(state[2])
+    end
+
+    -- Requests of the current window keep counting until the end of the
+    -- next one, those of the previous window until the end of this one.
+    local window_end = (bucket + 1) * window - now
+    local function consume()
+        redis.call('HMSET', key, 'b', bucket, 'c', count + 1, 'p', previous)
+        redis.call('PEXPIRE', key, math.ceil((window_end + window) * 1000))
+        return window_end + window
+    end
+
+    local reset = 0
+    if count > 0 then
+        reset = window_end + window
+    elseif previous > 0 then
+        reset = window_end
+    end
+
+    local overlap = 1 - (now - bucket * window) / window
+    return previous * overlap + count, reset, consume
+end
+
+local function check_token_bucket(key, limit, window)
+    local interval = window / limit
+    local full_at = math.max(tonumber(redis.call('HGET', key, 't')) or now, now)
+
+    local function consume()
+        full_at = full_at + interval
+        redis.call('HSET', key, 't', string.format('%.3f', full_at))
+        redis.call('PEXPIRE', key, math.ceil((full_at - now) * 1000))
+        return full_at - now
+    end
+
+    return (full_at - now) / interval, full_at - now, consume
+end
+
+local checks = {
+    ['fixed-window'] = check_fixed_window,
+    ['sliding-window'] = check_sliding_window,
+    ['token-bucket'] = check_token_bucket,
+}
+
+local states = {}
+local failed = false
+for i = 1, #KEYS do
+    local check = assert(checks[ARGV[i * 3 - 1]], "unknown algorithm")
+    local limit = tonumber(ARGV[i * 3])
+    local window = tonumber(ARGV[i * 3 + 1])
+
+    -- A limit of zero rejects everything and is never consumed.
+    local used, reset, consume = 0, window, nil
+    if limit > 0 then
+        used, reset, consume = check(KEYS[i], limit, window)
+    end
+
+    local rejected = used + 1 > limit
+    failed = failed or rejected
+    states[i] = {limit = limit, used = used, reset = reset, consume = consume, rejected = rejected}
+end
+
+local results = {}
+for i = 1, #KEYS do
+    local state = states[i]
+    local remaining = state.limit - state.used
+    local reset = state.reset
+    if not failed then
+        remaining = remaining - 1
+        reset = state.consume()
+    end
+
+    results[i] = {
+        state.rejected and 1 or 0,
+        math.max(math.floor(remaining), 0),
+        math.ceil(reset * 1000),
+    }
+end
+
+return results
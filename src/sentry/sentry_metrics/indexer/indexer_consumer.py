@@ -1,5 +1,5 @@
 import logging
-from typing import Any, Dict, MutableMapping, Optional, Sequence
+from typing import Any, Dict, MutableMapping, Optional, Sequence, Set
 
 from confluent_kafka import Producer
 from django.conf import settings
@@ -36,27 +36,35 @@ class MetricsIndexerWorker(AbstractBatchWorker):  # type: ignore
 
     def process_message(self, message: Any) -> MutableMapping[str, Any]:
         parsed_message: MutableMapping[str, Any] = json.loads(message.value(), use_rapid_json=True)
+        return parsed_message
 
-        metric_name = parsed_message["name"]
-        tags = parsed_message["tags"]
-
-        strings = {
-            metric_name,
-            *tags.keys(),
-            *tags.values(),
-        }
+    def translate_batch(self, batch: Sequence[MutableMapping[str, Any]]) -> None:
+        """
+        Replace the metric names and tags of every message in the batch with
+        their indexed integer IDs. The strings of the whole batch are resolved
+        with a single ``bulk_record`` call, rather than one call per message.
+        """
+        strings: Set[str] = set()
+        for message in batch:
+            strings.add(message["name"])
+            strings.update(message["tags"].keys())
+            strings.update(message["tags"].values())
 
+        metrics.timing("metrics_consumer.bulk_record.strings", len(strings))
         with metrics.timer("metrics_consumer.bulk_record"):
             mapping = indexer.bulk_record(list(strings))  # type: ignore
 
-        new_tags = {mapping[k]: mapping[v] for k, v in tags.items()}
-
-        parsed_message["tags"] = new_tags
-        parsed_message["metric_id"] = mapping[metric_name]
-        parsed_message["retention_days"] = 90
-        return parsed_message
+        for message in batch:
+            message["tags"] = {mapping[k]: mapping[v] for k, v in message["tags"].items()}
+            message["metric_id"] = mapping[message["name"]]
+            message["retention_days"] = 90
 
     def flush_batch(self, batch: Sequence[MutableMapping[str, Any]]) -> None:
+        if not batch:
+            return
+
+        self.translate_batch(batch)
+
         # produce the translated message to snuba-metrics topic
         for message in batch:
             self.__producer.produce(
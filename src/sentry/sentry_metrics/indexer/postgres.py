@@ -1,17 +1,125 @@
-from typing import Any, List, Mapping, MutableMapping, Optional, Sequence, Set
+import time
+from typing import Any, List, Mapping, MutableMapping, NamedTuple, Optional, Sequence, Set, Tuple
 
 from sentry.sentry_metrics.indexer.models import MetricsKeyIndexer
+from sentry.utils import metrics
+from sentry.utils.lru import LRUCache
 from sentry.utils.services import Service
 
 
+class _Missing(NamedTuple):
+    expires_at: float
+
+
+class LocalIndexerCache:
+    """
+    In-process tier in front of the shared cache used by ``get_from_cache``.
+
+    The set of indexed strings is small and an ID never changes once it has
+    been assigned, so hot strings and IDs can be kept in process for as long
+    as there is room for them. Lookups for strings or IDs that do not exist
+    are remembered for ``negative_ttl`` seconds only, since they may be
+    recorded by another process at any time.
+
+    A ``max_size`` of 0 disables the cache, along with its metrics.
+    """
+
+    def __init__(self, max_size: int, negative_ttl: int) -> None:
+        self.__enabled = max_size > 0
+        self.__ids = LRUCache(max_size)
+        self.__strings = LRUCache(max_size)
+        self.__negative_ttl = negative_ttl
+
+    def __lookup(self, cache: LRUCache, key: Any, direction: str) -> Tuple[bool, Any]:
+        if not self.__enabled:
+            return False, None
+
+        value = cache.get(key)
+        if value is None:
+            metrics.incr("sentry_metrics.indexer.local_cache.miss", tags={"direction": direction})
+            return False, None
+
+        if isinstance(value, _Missing):
+            if value.expires_at < time.time():
+                cache.delete(key)
+                metrics.incr(
+                    "sentry_metrics.indexer.local_cache.miss", tags={"direction": direction}
+                )
+                return False, None
+            metrics.incr(
+                "sentry_metrics.indexer.local_cache.negative_hit", tags={"direction": direction}
+            )
+            return True, None
+
+        metrics.incr("sentry_metrics.indexer.local_cache.hit", tags={"direction": direction})
+        return True, value
+
+    def get_id(self, string: str) -> Tuple[bool, Optional[int]]:
+        """
+        Returns ``(found, id)``. ``found`` is ``True`` with an ``id`` of
+        ``None`` if the string is known not to be indexed.
+        """
+        return self.__lookup(self.__ids, string, "forward")
+
+    def get_string(self, id: int) -> Tuple[bool, Optional[str]]:
+        return self.__lookup(self.__strings, id, "reverse")
+
+    def get_ids(self, strings: Sequence[str]) -> Mapping[str, int]:
+        """
+        Returns the IDs of all ``strings`` that are cached, ignoring negative
+        entries.
+        """
+        if not self.__enabled:
+            return {}
+
+        results = {
+            string: id
+            for string, id in self.__ids.get_many(strings).items()
+            if not isinstance(id, _Missing)
+        }
+        metrics.incr(
+            "sentry_metrics.indexer.local_cache.hit",
+            amount=len(results),
+            tags={"direction": "forward"},
+        )
+        metrics.incr(
+            "sentry_metrics.indexer.local_cache.miss",
+            amount=len(set(strings)) - len(results),
+            tags={"direction": "forward"},
+        )
+        return results
+
+    def set_ids(self, mapping: Mapping[str, int]) -> None:
+        if not self.__enabled:
+            return
+        for string, id in mapping.items():
+            self.__ids.set(string, id)
+            self.__strings.set(id, string)
+
+    def set_missing_id(self, string: str) -> None:
+        if self.__enabled and self.__negative_ttl > 0:
+            self.__ids.set(string, _Missing(time.time() + self.__negative_ttl))
+
+    def set_missing_string(self, id: int) -> None:
+        if self.__enabled and self.__negative_ttl > 0:
+            self.__strings.set(id, _Missing(time.time() + self.__negative_ttl))
+
+
 class PGStringIndexer(Service):  # type: ignore
     """
     Provides integer IDs for metric names, tag keys and tag values
     and the corresponding reverse lookup.
+
+    Up to ``local_cache_size`` strings are additionally cached in process (see
+    ``LocalIndexerCache``). The local cache is disabled unless a size is given,
+    which ``SENTRY_METRICS_INDEXER_OPTIONS`` does by default.
     """
 
     __all__ = ("record", "resolve", "reverse_resolve", "bulk_record")
 
+    def __init__(self, local_cache_size: int = 0, local_cache_negative_ttl: int = 60) -> None:
+        self.__local_cache = LocalIndexerCache(local_cache_size, local_cache_negative_ttl)
+
     def _bulk_record(self, unmapped_strings: Set[str]) -> Any:
         records = [MetricsKeyIndexer(string=string) for string in unmapped_strings]
         # We use `ignore_conflicts=True` here to avoid race conditions where metric indexer
@@ -26,18 +134,25 @@ class PGStringIndexer(Service):  # type: ignore
         return MetricsKeyIndexer.objects.get_many_from_cache(list(unmapped_strings), key="string")
 
     def bulk_record(self, strings: List[str]) -> Mapping[str, int]:
+        mapped_result: MutableMapping[str, int] = dict(self.__local_cache.get_ids(strings))
+
+        uncached = list(set(strings).difference(mapped_result.keys()))
+        if not uncached:
+            return mapped_result
 
         cache_results: Sequence[Any] = MetricsKeyIndexer.objects.get_many_from_cache(
-            strings, key="string"
+            uncached, key="string"
         )
 
-        mapped_result: MutableMapping[str, int] = {r.string: r.id for r in cache_results}
+        new_result: MutableMapping[str, int] = {r.string: r.id for r in cache_results}
 
-        unmapped = set(strings).difference(mapped_result.keys())
-        new_mapped = self._bulk_record(unmapped)
+        unmapped = set(uncached).difference(new_result.keys())
+        if unmapped:
+            for new in self._bulk_record(unmapped):
+                new_result[new.string] = new.id
 
-        for new in new_mapped:
-            mapped_result[new.string] = new.id
+        self.__local_cache.set_ids(new_result)
+        mapped_result.update(new_result)
 
         return mapped_result
 
@@ -51,11 +166,17 @@ class PGStringIndexer(Service):  # type: ignore
 
         Returns None if the entry cannot be found.
         """
+        found, cached_id = self.__local_cache.get_id(string)
+        if found:
+            return cached_id
+
         try:
             id: int = MetricsKeyIndexer.objects.get_from_cache(string=string).id
         except MetricsKeyIndexer.DoesNotExist:
+            self.__local_cache.set_missing_id(string)
             return None
 
+        self.__local_cache.set_ids({string: id})
         return id
 
     def reverse_resolve(self, id: int) -> Optional[str]:
@@ -63,9 +184,15 @@ class PGStringIndexer(Service):  # type: ignore
 
         Returns None if the entry cannot be found.
         """
+        found, cached_string = self.__local_cache.get_string(id)
+        if found:
+            return cached_string
+
         try:
             string: str = MetricsKeyIndexer.objects.get_from_cache(pk=id).string
         except MetricsKeyIndexer.DoesNotExist:
+            self.__local_cache.set_missing_string(id)
             return None
 
+        self.__local_cache.set_ids({string: id})
         return string
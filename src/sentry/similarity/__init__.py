@@ -16,7 +16,7 @@ from sentry.similarity.features import (
     get_application_chunks,
 )
 from sentry.similarity.featuresv2 import GroupingBasedFeatureSet
-from sentry.similarity.signatures import MinHashSignatureBuilder
+from sentry.similarity.signatures import MinHashSignatureBuilder, SlicedMinHashSignatureBuilder
 from sentry.utils import redis
 from sentry.utils.compat import map
 from sentry.utils.datastructures import BidirectionalMapping
@@ -59,7 +59,17 @@ def get_frame_attributes(frame):
     return attributes
 
 
-def _make_index_backend(cluster, namespace="sim:1"):
+signature_builders = {1: MinHashSignatureBuilder, 2: SlicedMinHashSignatureBuilder}
+
+
+def _make_index_backend(cluster, namespace="sim:1", signature_version=None):
+    if signature_version is None:
+        signature_version = getattr(settings, "SENTRY_SIMILARITY_SIGNATURE_VERSION", 1)
+
+    if signature_version != 1:
+        # Signatures of different versions never match, keep them apart.
+        namespace = f"{namespace}:s{signature_version}"
+
     if isinstance(cluster, str):
         cluster_id = cluster
 
@@ -72,7 +82,13 @@ def _make_index_backend(cluster, namespace="sim:1"):
 
     return MetricsWrapper(
         RedisScriptMinHashIndexBackend(
-            cluster, namespace, MinHashSignatureBuilder(16, 0xFFFF), 8, 60 * 60 * 24 * 30, 3, 5000
+            cluster,
+            namespace,
+            signature_builders[signature_version](16, 0xFFFF),
+            8,
+            60 * 60 * 24 * 30,
+            3,
+            5000,
         ),
         scope_tag_name=None,
     )
@@ -1,6 +1,6 @@
-import mmh3
+import struct
 
-from sentry.utils.compat import map
+import mmh3
 
 
 class MinHashSignatureBuilder:
@@ -9,9 +9,36 @@ class MinHashSignatureBuilder:
         self.rows = rows
 
     def __call__(self, features):
-        return map(
-            lambda column: min(
-                map(lambda feature: mmh3.hash(feature, column) % self.rows, features)
-            ),
-            range(self.columns),
-        )
+        features = list(features)
+        rows = self.rows
+        hash = mmh3.hash
+        return [
+            min([hash(feature, column) % rows for feature in features])
+            for column in range(self.columns)
+        ]
+
+
+class SlicedMinHashSignatureBuilder:
+    """
+    Builds MinHash signatures from one 128-bit MurmurHash3 digest of each
+    feature per eight columns, instead of one 32-bit hash per column. Every
+    column takes its value from a 16-bit slice of those digests.
+
+    The signatures differ from the ones built by ``MinHashSignatureBuilder``,
+    so they must not be stored alongside them.
+    """
+
+    def __init__(self, columns, rows):
+        assert 0 < rows <= 0x10000, "column values are limited to 16 bits"
+        self.columns = columns
+        self.rows = rows
+        self.seeds = range((columns + 7) // 8)
+        self.unpack = struct.Struct(f"<{len(self.seeds) * 8}H").unpack
+
+    def __call__(self, features):
+        rows = self.rows
+        seeds = self.seeds
+        unpack = self.unpack
+        hash = mmh3.hash_bytes
+        values = [unpack(b"".join([hash(feature, seed) for seed in seeds])) for feature in features]
+        return [value % rows for value in map(min, zip(*values))][: self.columns]
@@ -34,13 +34,14 @@ from sentry.utils.snuba import (
     SnubaQueryParams,
     SnubaTSResult,
     bulk_raw_query,
-    bulk_snql_query,
     get_array_column_alias,
     get_array_column_field,
     get_measurement_name,
     get_span_op_breakdown_name,
     is_measurement,
     is_span_op_breakdown,
+    iter_bulk_raw_query,
+    iter_bulk_snql_query,
     naiveify_datetime,
     raw_query,
     raw_snql_query,
@@ -532,16 +533,19 @@ def timeseries_query(
                 )
                 query_list.append(comparison_builder)
 
-            query_results = bulk_snql_query(
+            query_results = iter_bulk_snql_query(
                 [query.get_snql_query() for query in query_list], referrer
             )
 
         with sentry_sdk.start_span(
             op="discover.discover", description="timeseries.transform_results"
         ) as span:
-            results = []
-            for snql_query, result in zip(query_list, query_results):
-                results.append(
+            # Results are transformed as soon as they come in, while the
+            # comparison query may still be running.
+            results = [None] * len(query_list)
+            for index, result in query_results:
+                snql_query = query_list[index]
+                results[index] = (
                     zerofill(
                         result["data"],
                         snql_query.params["start"],
@@ -601,20 +605,21 @@ def timeseries_query(
             comp_query_params.start -= comparison_delta
             comp_query_params.end -= comparison_delta
             query_params_list.append(comp_query_params)
-        query_results = bulk_raw_query(query_params_list, referrer=referrer)
+        query_results = iter_bulk_raw_query(query_params_list, referrer=referrer)
 
     with sentry_sdk.start_span(
         op="discover.discover", description="timeseries.transform_results"
     ) as span:
-        results = []
-        for query_params, query_results in zip(query_params_list, query_results):
-            span.set_data("result_count", len(query_results.get("data", [])))
-            results.append(
-                zerofill(
-                    query_results["data"], query_params.start, query_params.end, rollup, "time"
-                )
+        # Results are transformed as soon as they come in, while the comparison
+        # query may still be running.
+        results = [None] * len(query_params_list)
+        for index, result in query_results:
+            query_params = query_params_list[index]
+            span.set_data("result_count", len(result.get("data", [])))
+            results[index] = (
+                zerofill(result["data"], query_params.start, query_params.end, rollup, "time")
                 if zerofill_results
-                else query_results["data"]
+                else result["data"]
             )
 
     if len(results) == 2:
@@ -2,11 +2,13 @@ from datetime import timedelta
 from enum import Enum
 
 from django.db import models
+from django.db.models.signals import post_delete, post_save
 from django.utils import timezone
 
 from sentry.db.models import FlexibleForeignKey, Model
 from sentry.db.models.base import DefaultFieldsModel
 from sentry.db.models.manager import BaseManager
+from sentry.snuba.subscription_cache import invalidate_subscription_metadata
 
 
 class QueryAggregations(Enum):
@@ -92,3 +94,9 @@ class QuerySubscription(DefaultFieldsModel):
     class Meta:
         app_label = "sentry"
         db_table = "sentry_querysubscription"
+
+
+post_save.connect(invalidate_subscription_metadata, sender=SnubaQuery)
+post_delete.connect(invalidate_subscription_metadata, sender=SnubaQuery)
+post_save.connect(invalidate_subscription_metadata, sender=QuerySubscription)
+post_delete.connect(invalidate_subscription_metadata, sender=QuerySubscription)
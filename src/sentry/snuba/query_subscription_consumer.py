@@ -1,7 +1,10 @@
 import logging
+import threading
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from random import random
-from typing import Any, Callable, Dict, Iterable, List, Optional, cast
+from typing import Any, Callable, Deque, Dict, Iterable, List, Optional, Sequence, Set, Tuple, cast
 
 import jsonschema
 import pytz
@@ -10,10 +13,12 @@ from confluent_kafka import OFFSET_INVALID, Consumer, KafkaException, Message, T
 from confluent_kafka.admin import AdminClient
 from dateutil.parser import parse as parse_date
 from django.conf import settings
+from django.db import close_old_connections
 
 from sentry import options
 from sentry.snuba.json_schemas import SUBSCRIPTION_PAYLOAD_VERSIONS, SUBSCRIPTION_WRAPPER_SCHEMA
 from sentry.snuba.models import QueryDatasets, QuerySubscription
+from sentry.snuba.subscription_cache import SubscriptionMetadataCache
 from sentry.snuba.tasks import _delete_from_snuba
 from sentry.utils import json, kafka_config, metrics
 from sentry.utils.batching_kafka_consumer import wait_for_topics
@@ -22,7 +27,10 @@ logger = logging.getLogger(__name__)
 
 TQuerySubscriptionCallable = Callable[[Dict[str, Any], QuerySubscription], None]
 
+TQuerySubscriptionPrefetchCallable = Callable[[Sequence[QuerySubscription]], None]
+
 subscriber_registry: Dict[str, TQuerySubscriptionCallable] = {}
+subscriber_prefetch_registry: Dict[str, TQuerySubscriptionPrefetchCallable] = {}
 
 
 def register_subscriber(
@@ -37,6 +45,24 @@ def register_subscriber(
     return inner
 
 
+def register_subscriber_prefetch(
+    subscriber_key: str,
+) -> Callable[[TQuerySubscriptionPrefetchCallable], TQuerySubscriptionPrefetchCallable]:
+    """
+    Registers a function that is called with the active subscriptions of `subscriber_key`
+    in each batch of messages before any of them is processed, so that the subscriber can
+    load what it needs for all of them at once.
+    """
+
+    def inner(func: TQuerySubscriptionPrefetchCallable) -> TQuerySubscriptionPrefetchCallable:
+        if subscriber_key in subscriber_prefetch_registry:
+            raise Exception("Prefetch handler already registered for %s" % subscriber_key)
+        subscriber_prefetch_registry[subscriber_key] = func
+        return func
+
+    return inner
+
+
 class InvalidMessageError(Exception):
     pass
 
@@ -45,11 +71,129 @@ class InvalidSchemaError(InvalidMessageError):
     pass
 
 
+class PartitionWorkerPool:
+    """
+    Processes messages in a thread pool, concurrently across partitions but one at a time
+    and in order within each partition.
+
+    At most one task per partition is running at any time, working through the messages
+    queued for its partition. Any extra arguments given to `submit` are passed on to
+    `process`. `on_done` is called with each message once it has been processed. If
+    processing a message raises, its partition stops making progress and the exception
+    is re-raised by `raise_for_error`.
+    """
+
+    def __init__(
+        self,
+        process: Callable[..., None],
+        on_done: Callable[[Message], None],
+        max_workers: int,
+        max_pending: int,
+    ):
+        self.__process = process
+        self.__on_done = on_done
+        self.__max_pending = max_pending
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.__condition = threading.Condition()
+        self.__queues: Dict[int, Deque[Tuple[Message, Tuple[Any, ...]]]] = {}
+        self.__running: Set[int] = set()
+        self.__pending = 0
+        self.__error: Optional[Exception] = None
+
+    @property
+    def pending(self) -> int:
+        return self.__pending
+
+    def pending_by_partition(self) -> Dict[int, int]:
+        with self.__condition:
+            return {partition: len(queue) for partition, queue in self.__queues.items()}
+
+    def submit(self, message: Message, *args: Any) -> None:
+        """
+        Queues a message for processing, waiting for room first if `max_pending` messages
+        are already pending.
+        """
+        partition = message.partition()
+        with self.__condition:
+            while self.__pending >= self.__max_pending and self.__error is None:
+                self.__condition.wait()
+            self.raise_for_error()
+            self.__queues.setdefault(partition, deque()).append((message, args))
+            self.__pending += 1
+            if partition in self.__running:
+                return
+            self.__running.add(partition)
+
+        self.__executor.submit(self.__run_partition, partition)
+
+    def __run_partition(self, partition: int) -> None:
+        while True:
+            with self.__condition:
+                queue = self.__queues[partition]
+                if not queue or self.__error is not None:
+                    self.__running.discard(partition)
+                    self.__condition.notify_all()
+                    return
+                message, args = queue[0]
+
+            try:
+                self.__process(message, *args)
+                self.__on_done(message)
+            except Exception as e:
+                with self.__condition:
+                    if self.__error is None:
+                        self.__error = e
+                    self.__running.discard(partition)
+                    self.__condition.notify_all()
+                return
+
+            with self.__condition:
+                queue.popleft()
+                self.__pending -= 1
+                if not queue:
+                    del self.__queues[partition]
+                    self.__running.discard(partition)
+                    self.__condition.notify_all()
+                    return
+                self.__condition.notify_all()
+
+    def raise_for_error(self) -> None:
+        if self.__error is not None:
+            raise self.__error
+
+    def wait(self, partitions: Optional[Iterable[int]] = None) -> None:
+        """
+        Waits until all messages of `partitions` (or all partitions) are processed, and
+        raises if processing any message failed.
+        """
+        with self.__condition:
+            waiting_for = None if partitions is None else set(partitions)
+            while self.__error is None:
+                running = self.__running if waiting_for is None else self.__running & waiting_for
+                if not running:
+                    break
+                self.__condition.wait()
+        self.raise_for_error()
+
+    def shutdown(self) -> None:
+        self.__executor.shutdown(wait=True)
+
+
 class QuerySubscriptionConsumer:
     """
     A Kafka consumer that processes query subscription update messages. Each message has
     a related subscription id and the latest values related to the subscribed query.
     These values are passed along to a callback associated with the subscription.
+
+    With a `concurrency` above 1 the partitions assigned to the consumer are processed
+    concurrently (see `PartitionWorkerPool`). Snuba partitions results by subscription,
+    so the updates of each subscription are still processed in order. Offsets are only
+    committed up to the last message processed in each partition.
+
+    Messages are consumed in batches. The subscriptions of each batch are loaded at once
+    into a cache local to the consumer (see `SubscriptionMetadataCache`) before the batch
+    is processed, and subscribers registered with `register_subscriber_prefetch` are given
+    the chance to do the same.
     """
 
     topic_to_dataset: Dict[str, QueryDatasets] = {
@@ -66,8 +210,18 @@ class QuerySubscriptionConsumer:
         commit_batch_timeout_ms: int = 5000,
         initial_offset_reset: str = "earliest",
         force_offset_reset: Optional[str] = None,
+        concurrency: int = 1,
     ):
         self.group_id = group_id
+        self.concurrency = concurrency
+        self.__pool: Optional[PartitionWorkerPool] = None
+        self.__subscription_cache: SubscriptionMetadataCache[QuerySubscription]
+        self.__subscription_cache = SubscriptionMetadataCache(
+            "snuba_query_subscriber.subscription_cache",
+            models=["sentry.QuerySubscription", "sentry.SnubaQuery"],
+            ttl=lambda: options.get("subscriptions-query.metadata-cache-ttl"),
+            max_size=lambda: options.get("subscriptions-query.metadata-cache-size"),
+        )
         if not topic:
             # TODO(typing): Need a way to get the actual value of settings to avoid this
             topic = cast(str, settings.KAFKA_EVENTS_SUBSCRIPTIONS_RESULTS)
@@ -146,6 +300,9 @@ class QuerySubscriptionConsumer:
 
         def on_revoke(consumer: Consumer, partitions: List[TopicPartition]) -> None:
             partition_numbers = [partition.partition for partition in partitions]
+            if self.__pool is not None:
+                # Finish the messages we already have before giving the partitions up.
+                self.__pool.wait(partition_numbers)
             self.commit_offsets(partition_numbers)
             for partition_number in partition_numbers:
                 self.offsets.pop(partition_number, None)
@@ -168,41 +325,173 @@ class QuerySubscriptionConsumer:
 
         self.consumer.subscribe([self.topic], on_assign=on_assign, on_revoke=on_revoke)
 
+        if self.concurrency > 1:
+            self.__pool = PartitionWorkerPool(
+                self.process_pooled_message,
+                self.mark_completed,
+                max_workers=self.concurrency,
+                max_pending=self.commit_batch_size * self.concurrency,
+            )
+
         i = 0
         while not self.__shutdown_requested:
-            message = self.consumer.poll(0.1)
-            if message is None:
+            if self.__pool is not None:
+                self.__pool.raise_for_error()
+
+            messages = self.consumer.consume(self.commit_batch_size, 0.1)
+            if not messages:
                 continue
 
-            error = message.error()
-            if error is not None:
-                raise KafkaException(error)
+            payloads = self.prefetch_subscriptions(messages)
 
-            i = i + 1
+            for message, contents in zip(messages, payloads):
+                if self.__shutdown_requested:
+                    # The rest of the batch is consumed again after the last committed offset.
+                    break
 
-            with sentry_sdk.start_transaction(
-                op="handle_message",
-                name="query_subscription_consumer_process_message",
-                sampled=random() <= options.get("subscriptions-query.sample-rate"),
-            ), metrics.timer("snuba_query_subscriber.handle_message"):
-                self.handle_message(message)
+                error = message.error()
+                if error is not None:
+                    raise KafkaException(error)
 
-            # Track latest completed message here, for use in `shutdown` handler.
-            self.offsets[message.partition()] = message.offset() + 1
+                i = i + 1
 
-            batch_by_size: bool = i % self.commit_batch_size == 0
-            batch_by_time: bool = (
-                self.__batch_deadline is not None and time.time() > self.__batch_deadline
-            )
+                if self.__pool is not None:
+                    self.__pool.submit(message, contents)
+                else:
+                    self.process_message(message, contents)
+                    self.mark_completed(message)
 
-            if batch_by_time or batch_by_size:
-                logger.debug("Committing offsets")
-                self.commit_offsets()
+                batch_by_size: bool = i % self.commit_batch_size == 0
+                batch_by_time: bool = (
+                    self.__batch_deadline is not None and time.time() > self.__batch_deadline
+                )
+
+                if batch_by_time or batch_by_size:
+                    logger.debug("Committing offsets")
+                    self.commit_offsets()
+
+        if self.__pool is not None:
+            self.__pool.wait()
+            self.__pool.shutdown()
+            self.__pool = None
 
         logger.debug("Committing offsets and closing consumer")
         self.commit_offsets()
         self.consumer.close()
 
+    def prefetch_subscriptions(self, messages: Sequence[Message]) -> List[Optional[Dict[str, Any]]]:
+        """
+        Parses a batch of messages, loads the subscriptions of the batch that are not
+        cached yet with a single query, and passes the active subscriptions of the batch
+        on to the prefetch functions of their subscribers.
+
+        Returns the parsed payload of each message, to be passed on to `handle_message`.
+        Messages that can't be parsed have no payload, and are left to `handle_message`
+        to report.
+        """
+        self.__subscription_cache.refresh_version()
+
+        payloads: List[Optional[Dict[str, Any]]] = []
+        for message in messages:
+            contents = None
+            if message.error() is None:
+                try:
+                    with metrics.timer("snuba_query_subscriber.parse_message_value"):
+                        contents = self.parse_message_value(message.value())
+                except (InvalidMessageError, ValueError):
+                    pass
+            payloads.append(contents)
+
+        subscription_ids = {contents["subscription_id"] for contents in payloads if contents}
+        if not subscription_ids:
+            return payloads
+
+        with metrics.timer("snuba_query_subscriber.prefetch_subscriptions"):
+            missing = self.__subscription_cache.missing(subscription_ids)
+            if missing:
+                self.__subscription_cache.set_many(
+                    {
+                        subscription.subscription_id: subscription
+                        for subscription in QuerySubscription.objects.filter(
+                            subscription_id__in=missing
+                        ).select_related("snuba_query")
+                    }
+                )
+
+            subscriptions_by_type: Dict[str, List[QuerySubscription]] = {}
+            for subscription in self.__subscription_cache.get_many(subscription_ids).values():
+                if subscription.status == QuerySubscription.Status.ACTIVE.value:
+                    subscriptions_by_type.setdefault(subscription.type, []).append(subscription)
+
+            for subscription_type, subscriptions in subscriptions_by_type.items():
+                prefetch = subscriber_prefetch_registry.get(subscription_type)
+                if prefetch is None:
+                    continue
+                try:
+                    prefetch(subscriptions)
+                except Exception:
+                    # Subscribers fall back to loading what they need per update.
+                    logger.exception(
+                        "query-subscription-consumer.prefetch_failed",
+                        extra={"subscription_type": subscription_type},
+                    )
+
+        return payloads
+
+    def get_subscription(self, subscription_id: str) -> QuerySubscription:
+        subscription = self.__subscription_cache.get(subscription_id)
+        if subscription is None:
+            subscription = QuerySubscription.objects.get_from_cache(subscription_id=subscription_id)
+        return subscription
+
+    def process_message(self, message: Message, contents: Optional[Dict[str, Any]] = None) -> None:
+        with sentry_sdk.start_transaction(
+            op="handle_message",
+            name="query_subscription_consumer_process_message",
+            sampled=random() <= options.get("subscriptions-query.sample-rate"),
+        ), metrics.timer("snuba_query_subscriber.handle_message"):
+            self.handle_message(message, contents)
+
+    def process_pooled_message(
+        self, message: Message, contents: Optional[Dict[str, Any]] = None
+    ) -> None:
+        # Pool threads don't go through the consumer loop, so clean up their database
+        # connections around every message.
+        close_old_connections()
+        try:
+            self.process_message(message, contents)
+        finally:
+            close_old_connections()
+
+    def mark_completed(self, message: Message) -> None:
+        # Track latest completed message here, for use in `shutdown` handler.
+        self.offsets[message.partition()] = message.offset() + 1
+
+    def record_pool_metrics(self) -> None:
+        if self.__pool is None:
+            return
+
+        metrics.gauge("snuba_query_subscriber.in_flight", self.__pool.pending)
+        for partition, pending in self.__pool.pending_by_partition().items():
+            metrics.gauge(
+                "snuba_query_subscriber.partition_queued",
+                pending,
+                tags={"partition": str(partition)},
+            )
+
+    def record_lag_metrics(self, committed: Sequence[TopicPartition]) -> None:
+        for partition in committed:
+            # The cached watermarks come with the fetched messages, this doesn't query
+            # the brokers.
+            watermarks = self.consumer.get_watermark_offsets(partition, cached=True)
+            if watermarks is None or watermarks[1] < 0:
+                continue
+            metrics.gauge(
+                "snuba_query_subscriber.partition_lag",
+                max(watermarks[1] - partition.offset, 0),
+                tags={"partition": str(partition.partition)},
+            )
+
     def _reset_batch(self) -> None:
         self.__batch_deadline = None
 
@@ -224,18 +513,21 @@ class QuerySubscriptionConsumer:
                 to_commit.append(TopicPartition(self.topic, partition, offset))
 
             self.consumer.commit(offsets=to_commit)
+            self.record_lag_metrics(to_commit)
 
+        self.record_pool_metrics()
         self._reset_batch()
 
     def shutdown(self) -> None:
         self.__shutdown_requested = True
 
-    def handle_message(self, message: Message) -> None:
+    def handle_message(self, message: Message, contents: Optional[Dict[str, Any]] = None) -> None:
         """
         Parses the value from Kafka, and if valid passes the payload to the callback defined by the
         subscription. If the subscription has been removed, or no longer has a valid callback then
         just log metrics/errors and continue.
         :param message:
+        :param contents: The payload of the message, if it was already parsed
         :return:
         """
         # set a commit time deadline only after the first message for this batch is seen
@@ -244,8 +536,9 @@ class QuerySubscriptionConsumer:
 
         with sentry_sdk.push_scope() as scope:
             try:
-                with metrics.timer("snuba_query_subscriber.parse_message_value"):
-                    contents = self.parse_message_value(message.value())
+                if contents is None:
+                    with metrics.timer("snuba_query_subscriber.parse_message_value"):
+                        contents = self.parse_message_value(message.value())
             except InvalidMessageError:
                 # If the message is in an invalid format, just log the error
                 # and continue
@@ -262,9 +555,7 @@ class QuerySubscriptionConsumer:
 
             try:
                 with metrics.timer("snuba_query_subscriber.fetch_subscription"):
-                    subscription: QuerySubscription = QuerySubscription.objects.get_from_cache(
-                        subscription_id=contents["subscription_id"]
-                    )
+                    subscription = self.get_subscription(contents["subscription_id"])
                     if subscription.status != QuerySubscription.Status.ACTIVE.value:
                         metrics.incr("snuba_query_subscriber.subscription_inactive")
                         return
@@ -0,0 +1,138 @@
+import time
+import weakref
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Hashable,
+    Iterable,
+    Mapping,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    TypeVar,
+    Union,
+)
+from uuid import uuid4
+
+from django.core.cache import cache
+
+from sentry.utils import metrics
+from sentry.utils.lru import LRUCache
+
+__all__ = ["SubscriptionMetadataCache", "invalidate_subscription_metadata"]
+
+V = TypeVar("V")
+
+_local_caches: "weakref.WeakSet[SubscriptionMetadataCache[Any]]" = weakref.WeakSet()
+
+
+def get_version_cache_key(model: str) -> str:
+    return f"query-subscription-metadata:version:{model}"
+
+
+def invalidate_subscription_metadata(sender: Any, **kwargs: Any) -> None:
+    """
+    Signal handler for the models cached by `SubscriptionMetadataCache`. Drops the
+    entries of the caches in this process that depend on the saved model, and bumps
+    the shared version of that model, so that consumers in other processes drop theirs
+    before their next batch.
+    """
+    model = sender._meta.label
+    cache.set(get_version_cache_key(model), uuid4().hex, None)
+    for local_cache in list(_local_caches):
+        if model in local_cache.models:
+            local_cache.clear()
+
+
+class SubscriptionMetadataCache(Generic[V]):
+    """
+    Consumer-local cache of the models needed to process subscription updates.
+
+    Entries are loaded in bulk for each batch of updates through `set_many` and are
+    used for at most `ttl` seconds. `models` are the labels of the models the entries
+    are built from. Model signals only fire in the process that saved the model, so
+    `invalidate_subscription_metadata` also bumps a version per model in the shared
+    cache, which `refresh_version` compares once per batch, dropping all entries when
+    the version of one of `models` has changed.
+
+    Hits and misses are counted as `<metrics_key>.hit` and `<metrics_key>.miss`, and
+    the age of the entries that are hit is recorded as `<metrics_key>.staleness`.
+    """
+
+    def __init__(
+        self,
+        metrics_key: str,
+        models: Sequence[str],
+        ttl: Union[float, Callable[[], float]],
+        max_size: Union[int, Callable[[], int]],
+    ) -> None:
+        self.__metrics_key = metrics_key
+        self.models = frozenset(models)
+        self.__ttl = ttl
+        self.__entries: "LRUCache[Any]" = LRUCache(max_size)
+        self.__version_cache_keys = [get_version_cache_key(model) for model in sorted(models)]
+        self.__version: Optional[Tuple[Optional[str], ...]] = None
+        _local_caches.add(self)
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    @property
+    def ttl(self) -> float:
+        if callable(self.__ttl):
+            return self.__ttl()
+        return self.__ttl
+
+    def refresh_version(self) -> None:
+        versions = cache.get_many(self.__version_cache_keys)
+        version = tuple(versions.get(key) for key in self.__version_cache_keys)
+        if version != self.__version:
+            if self.__entries:
+                metrics.incr(f"{self.__metrics_key}.invalidated")
+            self.clear()
+            self.__version = version
+
+    def __get_fresh(self, keys: Iterable[Hashable]) -> Mapping[Hashable, Tuple[float, V]]:
+        expires_before = time.time() - self.ttl
+        results = {}
+        for key, (loaded_at, value) in self.__entries.get_many(keys).items():
+            if loaded_at < expires_before:
+                self.__entries.delete(key)
+            else:
+                results[key] = (loaded_at, value)
+        return results
+
+    def missing(self, keys: Iterable[Hashable]) -> Set[Hashable]:
+        """
+        Returns the keys that have no entry, or an expired one, without counting them
+        as misses.
+        """
+        keys = set(keys)
+        return keys.difference(self.__get_fresh(keys))
+
+    def get_many(self, keys: Iterable[Hashable]) -> Mapping[Hashable, V]:
+        keys = set(keys)
+        now = time.time()
+        results = {}
+        for key, (loaded_at, value) in self.__get_fresh(keys).items():
+            metrics.timing(f"{self.__metrics_key}.staleness", now - loaded_at)
+            results[key] = value
+
+        if results:
+            metrics.incr(f"{self.__metrics_key}.hit", amount=len(results))
+        if len(keys) > len(results):
+            metrics.incr(f"{self.__metrics_key}.miss", amount=len(keys) - len(results))
+        return results
+
+    def get(self, key: Hashable) -> Optional[V]:
+        return self.get_many([key]).get(key)
+
+    def set_many(self, mapping: Mapping[Hashable, V]) -> None:
+        now = time.time()
+        for key, value in mapping.items():
+            self.__entries.set(key, (now, value))
+
+    def clear(self) -> None:
+        self.__entries.clear()
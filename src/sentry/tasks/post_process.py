@@ -1,6 +1,8 @@
 import logging
+import time
 
 import sentry_sdk
+from celery.exceptions import SoftTimeLimitExceeded
 
 from sentry import analytics, features
 from sentry.app import locks
@@ -224,6 +226,157 @@ def post_process_group(
     """
     Fires post processing hooks for a group.
     """
+    _post_process_group(
+        is_new, is_regression, is_new_group_environment, cache_key, group_id=group_id, **kwargs
+    )
+
+
+# The largest number of events post processed by one task.
+MAX_BATCH_SIZE = 1000
+
+# Events of a batch that are not post processed within this many seconds are
+# handed on to a new task, well before the soft time limit.
+BATCH_TIME_BUDGET = 300
+
+
+@instrumented_task(
+    name="sentry.tasks.post_process.post_process_group_batch",
+    time_limit=600,
+    soft_time_limit=590,
+)
+def post_process_group_batch(events, **kwargs):
+    """
+    Fires post processing hooks for a batch of events.
+
+    ``events`` is a list of the keyword arguments of ``post_process_group``.
+    Event payloads, projects, organizations, groups and alert rule statuses
+    are fetched once for the whole batch (see ``PostProcessSnapshot``). If that
+    fails, every event is looked up on its own instead.
+    """
+    from sentry.utils import snuba
+
+    started = time.time()
+    try:
+        with snuba.options_override({"consistent": True}):
+            snapshot = PostProcessSnapshot.prefetch(events)
+    except SoftTimeLimitExceeded:
+        raise
+    except Exception:
+        # Post process the events one by one rather than dropping the batch.
+        logger.exception("post_process.batch.prefetch_failed")
+        metrics.incr("tasks.post_process.batch_prefetch_failed")
+        snapshot = None
+
+    metrics.timing("tasks.post_process.batch_size", len(events))
+    for index, task_kwargs in enumerate(events):
+        if time.time() - started > BATCH_TIME_BUDGET:
+            metrics.incr("tasks.post_process.batch_deferred", amount=len(events) - index)
+            post_process_group_batch.delay(events=events[index:])
+            return
+
+        try:
+            _post_process_group(snapshot=snapshot, **task_kwargs)
+        except SoftTimeLimitExceeded:
+            raise
+        except Exception:
+            # One failing event should not hold up the rest of the batch.
+            logger.exception(
+                "post_process.batch.failed", extra={"cache_key": task_kwargs.get("cache_key")}
+            )
+
+
+class PostProcessSnapshot:
+    """
+    The models needed to post process a batch of events, fetched together.
+
+    Lookups fall back to the regular cached reads for anything that is not
+    part of the snapshot.
+    """
+
+    def __init__(self, event_data, projects, groups, rules):
+        self.event_data = event_data
+        self.projects = projects
+        self.groups = groups
+        self.rules = rules
+
+    @classmethod
+    def prefetch(cls, events):
+        from sentry.eventstore.processing import event_processing_store
+        from sentry.models import Group, Organization, Project
+        from sentry.rules.processor import RuleSnapshot
+
+        event_data = event_processing_store.get_many([e["cache_key"] for e in events])
+
+        projects = {
+            project.id: project
+            for project in Project.objects.get_many_from_cache(
+                list({data["project"] for data in event_data.values()})
+            )
+        }
+        organizations = {
+            organization.id: organization
+            for organization in Organization.objects.get_many_from_cache(
+                list({project.organization_id for project in projects.values()})
+            )
+        }
+        for project in projects.values():
+            if project.organization_id in organizations:
+                project.set_cached_field_value(
+                    "organization", organizations[project.organization_id]
+                )
+
+        group_ids = {
+            e["group_id"] for e in events if e.get("group_id") and e["cache_key"] in event_data
+        }
+        groups = {group.id: group for group in Group.objects.get_many_from_cache(list(group_ids))}
+
+        # Rules are only applied to unresolved groups, and there is no need
+        # to create rule statuses for the others.
+        rules = RuleSnapshot.for_groups(
+            [group for group in groups.values() if group.is_unresolved()]
+        )
+
+        return cls(event_data, projects, groups, rules)
+
+    def get_event_data(self, cache_key):
+        from sentry.eventstore.processing import event_processing_store
+
+        # Each payload is handed out once, a repeated cache key reads the
+        # processing store, from which processed events have been deleted.
+        data = self.event_data.pop(cache_key, None)
+        if data is None:
+            data = event_processing_store.get(cache_key)
+        return data
+
+    def get_project(self, project_id):
+        from sentry.models import Organization, Project
+
+        project = self.projects.get(project_id)
+        if project is None or not project.is_field_cached("organization"):
+            project = Project.objects.get_from_cache(id=project_id)
+            project.set_cached_field_value(
+                "organization", Organization.objects.get_from_cache(id=project.organization_id)
+            )
+        return project
+
+    def get_group(self, group_id):
+        from sentry.models.group import get_group_with_redirect
+
+        group = self.groups.get(group_id)
+        if group is None:
+            group, _ = get_group_with_redirect(group_id)
+        return group
+
+
+def _post_process_group(
+    is_new,
+    is_regression,
+    is_new_group_environment,
+    cache_key,
+    group_id=None,
+    snapshot=None,
+    **kwargs,
+):
     from sentry.eventstore.models import Event
     from sentry.eventstore.processing import event_processing_store
     from sentry.reprocessing2 import is_reprocessed_event
@@ -233,7 +386,10 @@ def post_process_group(
         # We use the data being present/missing in the processing store
         # to ensure that we don't duplicate work should the forwarding consumers
         # need to rewind history.
-        data = event_processing_store.get(cache_key)
+        if snapshot is not None:
+            data = snapshot.get_event_data(cache_key)
+        else:
+            data = event_processing_store.get(cache_key)
         if not data:
             logger.info(
                 "post_process.skipped",
@@ -256,10 +412,14 @@ def post_process_group(
 
         # Re-bind Project and Org since we're reading the Event object
         # from cache which may contain stale parent models.
-        event.project = Project.objects.get_from_cache(id=event.project_id)
-        event.project.set_cached_field_value(
-            "organization", Organization.objects.get_from_cache(id=event.project.organization_id)
-        )
+        if snapshot is not None:
+            event.project = snapshot.get_project(event.project_id)
+        else:
+            event.project = Project.objects.get_from_cache(id=event.project_id)
+            event.project.set_cached_field_value(
+                "organization",
+                Organization.objects.get_from_cache(id=event.project.organization_id),
+            )
 
         # Simplified post processing for transaction events.
         # This should eventually be completely removed and transactions
@@ -290,7 +450,10 @@ def post_process_group(
 
         # Re-bind Group since we're reading the Event object
         # from cache, which may contain a stale group and project
-        event.group, _ = get_group_with_redirect(event.group_id)
+        if snapshot is not None:
+            event.group = snapshot.get_group(event.group_id)
+        else:
+            event.group, _ = get_group_with_redirect(event.group_id)
         event.group_id = event.group.id
 
         event.group.project = event.project
@@ -332,9 +495,19 @@ def post_process_group(
                 except Exception:
                     logger.exception("Failed to handle owner assignments")
 
-            rp = RuleProcessor(
-                event, is_new, is_regression, is_new_group_environment, has_reappeared
-            )
+            if snapshot is not None:
+                rp = RuleProcessor(
+                    event,
+                    is_new,
+                    is_regression,
+                    is_new_group_environment,
+                    has_reappeared,
+                    snapshot=snapshot.rules,
+                )
+            else:
+                rp = RuleProcessor(
+                    event, is_new, is_regression, is_new_group_environment, has_reappeared
+                )
             has_alert = False
             with sentry_sdk.start_span(op="tasks.post_process_group.rule_processor_callbacks"):
                 # TODO(dcramer): ideally this would fanout, but serializing giant
@@ -28,7 +28,7 @@ def update_config_cache(generate, organization_id=None, project_id=None, update_
 
     from sentry.models import Project, ProjectKey, ProjectKeyStatus
     from sentry.relay import projectconfig_cache
-    from sentry.relay.config import get_project_config
+    from sentry.relay.config import get_project_configs, restrict_project_config_to_key
 
     if project_id:
         set_current_event_project(project_id)
@@ -54,7 +54,7 @@ def update_config_cache(generate, organization_id=None, project_id=None, update_
     elif organization_id:
         # XXX(markus): I feel like we should be able to cache this but I don't
         # want to add another method to src/sentry/db/models/manager.py
-        projects = Project.objects.filter(organization_id=organization_id)
+        projects = list(Project.objects.filter(organization_id=organization_id))
 
     project_keys = {}
     for key in ProjectKey.objects.filter(project_id__in=[project.id for project in projects]):
@@ -62,21 +62,18 @@ def update_config_cache(generate, organization_id=None, project_id=None, update_
 
     if generate:
         config_cache = {}
+        project_configs = get_project_configs(projects, project_keys=project_keys)
         for project in projects:
-            project_config = get_project_config(
-                project, project_keys=project_keys.get(project.id, []), full_config=True
-            )
+            project_config = project_configs[project.id]
             config_cache[project.id] = project_config.to_dict()
 
             for key in project_keys.get(project.id) or ():
-                # XXX(markus): This is currently the cleanest way to get only
-                # state for a single projectkey (considering quotas and
-                # everything)
                 if key.status != ProjectKeyStatus.ACTIVE:
                     continue
 
-                project_config = get_project_config(project, project_keys=[key], full_config=True)
-                config_cache[key.public_key] = project_config.to_dict()
+                config_cache[key.public_key] = restrict_project_config_to_key(
+                    project, project_config, key
+                ).to_dict()
 
         projectconfig_cache.set_many(config_cache)
     else:
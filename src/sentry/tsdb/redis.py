@@ -1,17 +1,23 @@
+import atexit
 import itertools
 import logging
 import operator
+import os
 import random
+import threading
+import time
 import uuid
 from collections import defaultdict, namedtuple
 from functools import reduce
 from hashlib import md5
 
+from django.core.cache import cache
 from django.utils import timezone
 from django.utils.encoding import force_bytes
 from pkg_resources import resource_string
 
 from sentry.tsdb.base import BaseTSDB
+from sentry.utils import metrics
 from sentry.utils.compat import crc32, map, zip
 from sentry.utils.dates import to_datetime, to_timestamp
 from sentry.utils.redis import SentryScript, check_cluster_versions, get_cluster_from_options
@@ -50,6 +56,140 @@ class SuppressionWrapper:
         return True
 
 
+class WriteBuffer:
+    """\
+    Combines counter increments and distinct counter records made by a
+    process in memory, and writes them to Redis in one batch per cluster.
+
+    Buffered writes are flushed once ``max_operations`` writes have been
+    buffered, or at the latest ``flush_interval`` seconds after the oldest
+    buffered write (by a background thread if there are no further writes.)
+    Writes that are still buffered when the process is killed are lost, so
+    the data loss on a crash is bounded by these two limits.
+    """
+
+    def __init__(self, tsdb, flush_interval, max_operations):
+        assert flush_interval > 0
+        assert max_operations > 0
+        self.tsdb = tsdb
+        self.flush_interval = flush_interval
+        self.max_operations = max_operations
+        self.__lock = threading.Lock()
+        self.__flusher_pid = None
+        self.__wakeup = threading.Event()
+        self.__reset()
+        atexit.register(self.flush, reason="exit")
+
+    def __reset(self):
+        # (cluster, durable) -> (hash_key, hash_field) -> count
+        self.__counters = defaultdict(lambda: defaultdict(int))
+        # (cluster, durable) -> hash_key -> max expiry
+        self.__counter_expiries = defaultdict(dict)
+        # (cluster, durable) -> (routing_key, key) -> values
+        self.__distinct = defaultdict(lambda: defaultdict(set))
+        # (cluster, durable) -> key -> max expiry
+        self.__distinct_expiries = defaultdict(dict)
+        self.__operations = 0
+        self.__oldest = None
+
+    def __len__(self):
+        return self.__operations
+
+    def __ensure_flusher(self):
+        # The thread has to be (re)started after the process was forked, e.g.
+        # for every worker process of a prefork pool.
+        if self.__flusher_pid == os.getpid():
+            return
+        self.__flusher_pid = os.getpid()
+        threading.Thread(target=self.__run_flusher, name="tsdb-write-buffer", daemon=True).start()
+
+    def __run_flusher(self):
+        while True:
+            with self.__lock:
+                oldest = self.__oldest
+
+            # Sleep until the oldest buffered write is due, or until there is
+            # a write at all, rather than for a fixed interval that could
+            # start just before the write.
+            if oldest is None:
+                self.__wakeup.wait()
+                self.__wakeup.clear()
+                continue
+
+            delay = oldest + self.flush_interval - time.time()
+            if delay > 0:
+                time.sleep(delay)
+                continue
+
+            try:
+                self.flush(reason="interval", max_age=self.flush_interval)
+            except Exception:
+                logger.exception("Failed to flush TSDB write buffer")
+
+    def __added(self, operations):
+        self.__operations += operations
+        if self.__oldest is None:
+            self.__oldest = time.time()
+            self.__wakeup.set()
+        return self.__operations >= self.max_operations
+
+    def add_counters(self, cluster, durable, operations, expiries):
+        self.__ensure_flusher()
+        with self.__lock:
+            counters = self.__counters[(cluster, durable)]
+            for counter, count in operations.items():
+                counters[counter] += count
+            counter_expiries = self.__counter_expiries[(cluster, durable)]
+            for hash_key, expiry in expiries.items():
+                if counter_expiries.get(hash_key, 0.0) < expiry:
+                    counter_expiries[hash_key] = expiry
+            full = self.__added(len(operations))
+
+        if full:
+            self.flush(reason="size")
+
+    def add_distinct(self, cluster, durable, records, expiries):
+        self.__ensure_flusher()
+        with self.__lock:
+            distinct = self.__distinct[(cluster, durable)]
+            for record, values in records.items():
+                distinct[record].update(values)
+            distinct_expiries = self.__distinct_expiries[(cluster, durable)]
+            for key, expiry in expiries.items():
+                if distinct_expiries.get(key, 0.0) < expiry:
+                    distinct_expiries[key] = expiry
+            full = self.__added(len(records))
+
+        if full:
+            self.flush(reason="size")
+
+    def flush(self, reason="manual", max_age=None):
+        """
+        Writes all buffered operations. With ``max_age``, nothing is written
+        unless the oldest buffered operation is at least that old.
+        """
+        with self.__lock:
+            if not self.__operations:
+                return
+            if max_age is not None and time.time() - self.__oldest < max_age:
+                return
+            operations = self.__operations
+            counters, counter_expiries = self.__counters, self.__counter_expiries
+            distinct, distinct_expiries = self.__distinct, self.__distinct_expiries
+            self.__reset()
+
+        metrics.timing("tsdb.write_buffer.flush.operations", operations, tags={"reason": reason})
+        with metrics.timer("tsdb.write_buffer.flush", tags={"reason": reason}):
+            for (cluster, durable), cluster_counters in counters.items():
+                self.tsdb.write_counters(
+                    cluster, durable, cluster_counters, counter_expiries[(cluster, durable)]
+                )
+            for (cluster, durable), records in distinct.items():
+                self.tsdb.write_distinct(
+                    cluster, durable, records, distinct_expiries[(cluster, durable)]
+                )
+
+
 class RedisTSDB(BaseTSDB):
     """
     A time series storage backend for Redis.
@@ -103,6 +243,16 @@ class RedisTSDB(BaseTSDB):
     frequency table can be displayed as percentages of the whole data set.
     (Additional documentation and the bulk of the logic for implementing the
     frequency table API can be found in the ``cmsketch.lua`` script.)
+
+    Counter increments and distinct counter records can be combined in memory
+    and written in batches by setting ``write_buffer_interval_ms`` (see
+    ``WriteBuffer``.) Writes are flushed after that many milliseconds, or
+    once ``write_buffer_max_operations`` writes have been buffered.
+
+    Counts of buckets that have already ended are cached for
+    ``closed_bucket_cache_ttl`` seconds when ``get_range`` or ``get_sums`` is
+    called with ``use_cache``, in one cache entry per series. Late writes to
+    those buckets only become visible to cached reads after that.
     """
 
     DEFAULT_SKETCH_PARAMETERS = SketchParameters(3, 128, 50)
@@ -112,8 +262,17 @@ class RedisTSDB(BaseTSDB):
         self.prefix = prefix
         self.vnodes = vnodes
         self.enable_frequency_sketches = options.pop("enable_frequency_sketches", False)
+        write_buffer_interval_ms = options.pop("write_buffer_interval_ms", 0)
+        write_buffer_max_operations = options.pop("write_buffer_max_operations", 1000)
+        self.closed_bucket_cache_ttl = options.pop("closed_bucket_cache_ttl", 60)
         super().__init__(**options)
 
+        self.write_buffer = None
+        if write_buffer_interval_ms > 0:
+            self.write_buffer = WriteBuffer(
+                self, write_buffer_interval_ms / 1000.0, write_buffer_max_operations
+            )
+
     def validate(self):
         logger.debug("Validating Redis version...")
         version = Version((2, 8, 18)) if self.enable_frequency_sketches else Version((2, 8, 9))
@@ -222,43 +381,56 @@ class RedisTSDB(BaseTSDB):
             default_timestamp = timezone.now()
 
         for (cluster, durable), environment_ids in self.get_cluster_groups({None, environment_id}):
-            manager = cluster.map()
-            if not durable:
-                manager = SuppressionWrapper(manager)
-
-            with manager as client:
-                # (hash_key, hash_field) -> count
-                key_operations = defaultdict(lambda: 0)
-                # (hash_key) -> "max expiration encountered"
-                key_expiries = defaultdict(lambda: 0.0)
+            # (hash_key, hash_field) -> count
+            key_operations = defaultdict(lambda: 0)
+            # (hash_key) -> "max expiration encountered"
+            key_expiries = defaultdict(lambda: 0.0)
+
+            for rollup, max_values in self.rollups.items():
+                for item in items:
+                    if len(item) == 2:
+                        model, key = item
+                        options = {}
+                    else:
+                        model, key, options = item
+
+                    count = options.get("count", default_count)
+                    timestamp = options.get("timestamp", default_timestamp)
+
+                    expiry = self.calculate_expiry(rollup, max_values, timestamp)
+
+                    for environment_id in environment_ids:
+                        hash_key, hash_field = self.make_counter_key(
+                            model, rollup, timestamp, key, environment_id
+                        )
 
-                for rollup, max_values in self.rollups.items():
-                    for item in items:
-                        if len(item) == 2:
-                            model, key = item
-                            options = {}
-                        else:
-                            model, key, options = item
+                        if key_expiries[hash_key] < expiry:
+                            key_expiries[hash_key] = expiry
 
-                        count = options.get("count", default_count)
-                        timestamp = options.get("timestamp", default_timestamp)
+                        key_operations[(hash_key, hash_field)] += count
 
-                        expiry = self.calculate_expiry(rollup, max_values, timestamp)
+            if self.write_buffer is not None:
+                self.write_buffer.add_counters(cluster, durable, key_operations, key_expiries)
+            else:
+                self.write_counters(cluster, durable, key_operations, key_expiries)
 
-                        for environment_id in environment_ids:
-                            hash_key, hash_field = self.make_counter_key(
-                                model, rollup, timestamp, key, environment_id
-                            )
-
-                            if key_expiries[hash_key] < expiry:
-                                key_expiries[hash_key] = expiry
+    def write_counters(self, cluster, durable, key_operations, key_expiries):
+        """
+        Applies counter increments, given as a mapping of ``(hash_key,
+        hash_field)`` to count, and expiries, given as a mapping of
+        ``hash_key`` to timestamp.
+        """
+        key_expiries = dict(key_expiries)
 
-                            key_operations[(hash_key, hash_field)] += count
+        manager = cluster.map()
+        if not durable:
+            manager = SuppressionWrapper(manager)
 
-                for (hash_key, hash_field), count in key_operations.items():
-                    client.hincrby(hash_key, hash_field, count)
-                    if key_expiries.get(hash_key):
-                        client.expireat(hash_key, key_expiries.pop(hash_key))
+        with manager as client:
+            for (hash_key, hash_field), count in key_operations.items():
+                client.hincrby(hash_key, hash_field, count)
+                if key_expiries.get(hash_key):
+                    client.expireat(hash_key, key_expiries.pop(hash_key))
 
     def get_range(
         self, model, keys, start, end, rollup=None, environment_ids=None, use_cache=False
@@ -280,22 +452,91 @@ class RedisTSDB(BaseTSDB):
 
         rollup, series = self.get_optimal_rollup_series(start, end, rollup)
         series = map(to_datetime, series)
+        keys = list(keys)
+
+        # Every point of every requested series, as (key, epoch, hash key,
+        # hash field). Values are collected in ``values`` by position.
+        points = []
+        for key in keys:
+            for timestamp in series:
+                hash_key, hash_field = self.make_counter_key(
+                    model, rollup, timestamp, key, environment_id
+                )
+                points.append((key, to_timestamp(timestamp), hash_key, hash_field))
+        values = [None] * len(points)
+
+        # Buckets that have ended are not going to change much anymore, so the
+        # counts of those buckets are cached for a short while, with one cache
+        # entry per series.
+        cache_keys = {}
+        closed = []
+        if use_cache and self.closed_bucket_cache_ttl > 0:
+            now = time.time()
+            closed = [
+                i
+                for i, (_, epoch, _, _) in enumerate(points[: len(series)])
+                if epoch + rollup <= now
+            ]
+
+        if closed:
+            for index in range(len(keys)):
+                first = index * len(series)
+                hash_field = points[first][3]
+                cache_keys[index] = "tsdb:c:{}:{}:{}:{}:{}".format(
+                    model.value,
+                    rollup,
+                    points[first + closed[0]][1],
+                    len(closed),
+                    md5(force_bytes(hash_field)).hexdigest(),
+                )
+
+            cached = cache.get_many(list(cache_keys.values()))
+            for index, cache_key in cache_keys.items():
+                counts = cached.get(cache_key)
+                if counts is not None:
+                    first = index * len(series)
+                    for i, count in zip(closed, counts):
+                        values[first + i] = count
+            metrics.incr("tsdb.closed_bucket_cache.hit", amount=len(cached))
+            metrics.incr("tsdb.closed_bucket_cache.miss", amount=len(cache_keys) - len(cached))
+            cache_keys = {
+                index: cache_key
+                for index, cache_key in cache_keys.items()
+                if cache_key not in cached
+            }
+
+        # Read all fields of the same hash with a single HMGET.
+        positions_by_hash_key = defaultdict(list)
+        for i, (_, _, hash_key, _) in enumerate(points):
+            if values[i] is None:
+                positions_by_hash_key[hash_key].append(i)
 
-        results = []
         cluster, _ = self.get_cluster(environment_id)
         with cluster.map() as client:
-            for key in keys:
-                for timestamp in series:
-                    hash_key, hash_field = self.make_counter_key(
-                        model, rollup, timestamp, key, environment_id
-                    )
-                    results.append(
-                        (to_timestamp(timestamp), key, client.hget(hash_key, hash_field))
-                    )
+            promises = [
+                (
+                    positions,
+                    client.hmget(hash_key, [points[i][3] for i in positions]),
+                )
+                for hash_key, positions in positions_by_hash_key.items()
+            ]
+
+        for positions, promise in promises:
+            for i, count in zip(positions, promise.value):
+                values[i] = int(count or 0)
+
+        if cache_keys:
+            cache.set_many(
+                {
+                    cache_key: [values[index * len(series) + i] for i in closed]
+                    for index, cache_key in cache_keys.items()
+                },
+                self.closed_bucket_cache_ttl,
+            )
 
         results_by_key = defaultdict(dict)
-        for epoch, key, count in results:
-            results_by_key[key][epoch] = int(count.value or 0)
+        for (key, epoch, _, _), count in zip(points, values):
+            results_by_key[key][epoch] = count
 
         for key, points in results_by_key.items():
             results_by_key[key] = sorted(points.items())
@@ -392,18 +633,39 @@ class RedisTSDB(BaseTSDB):
         ts = int(to_timestamp(timestamp))  # ``timestamp`` is not actually a timestamp :(
 
         for (cluster, durable), environment_ids in self.get_cluster_groups({None, environment_id}):
-            manager = cluster.fanout()
-            if not durable:
-                manager = SuppressionWrapper(manager)
+            # (routing key, key) -> values
+            records = {}
+            # key -> expiry
+            expiries = {}
 
-            with manager as client:
-                for model, key, values in items:
-                    c = client.target_key(key)
-                    for rollup, max_values in self.rollups.items():
-                        for environment_id in environment_ids:
-                            k = self.make_key(model, rollup, ts, key, environment_id)
-                            c.pfadd(k, *values)
-                            c.expireat(k, self.calculate_expiry(rollup, max_values, timestamp))
+            for model, key, values in items:
+                for rollup, max_values in self.rollups.items():
+                    for environment_id in environment_ids:
+                        k = self.make_key(model, rollup, ts, key, environment_id)
+                        records.setdefault((key, k), []).extend(values)
+                        expiries[k] = self.calculate_expiry(rollup, max_values, timestamp)
+
+            if self.write_buffer is not None:
+                self.write_buffer.add_distinct(cluster, durable, records, expiries)
+            else:
+                self.write_distinct(cluster, durable, records, expiries)
+
+    def write_distinct(self, cluster, durable, records, expiries):
+        """
+        Adds values to distinct counters, given as a mapping of ``(routing
+        key, key)`` to values, and applies expiries, given as a mapping of
+        ``key`` to timestamp. All distinct counters sharing a routing key are
+        stored on the same host.
+        """
+        manager = cluster.fanout()
+        if not durable:
+            manager = SuppressionWrapper(manager)
+
+        with manager as client:
+            for (routing_key, key), values in records.items():
+                c = client.target_key(routing_key)
+                c.pfadd(key, *values)
+                c.expireat(key, expiries[key])
 
     def get_distinct_counts_series(
         self, model, keys, start, end=None, rollup=None, environment_id=None
@@ -47,6 +47,20 @@ class KVStorage(ABC, Generic[K, V]):
         """
         raise NotImplementedError
 
+    def set_many(self, items: Sequence[Tuple[K, V, Optional[timedelta]]]) -> None:
+        """
+        Set multiple values in the store. ``items`` is a sequence of ``(key,
+        value, ttl)`` triples, where ``ttl`` may be ``None`` for items that
+        should not expire.
+
+        This operation is not guaranteed to be atomic and may result in only
+        a subset of keys being written if an error occurs.
+        """
+        # This implementation can/should be overridden by concrete subclasses
+        # to improve performance using batched operations where possible.
+        for key, value, ttl in items:
+            self.set(key, value, ttl)
+
     @abstractmethod
     def delete(self, key: K) -> None:
         """
@@ -31,12 +31,28 @@ class CacheKVStorage(KVStorage[Any, Any]):
     def get(self, key: Any) -> Optional[Any]:
         return self.backend.get(key)
 
+    def get_many(self, keys: Sequence[Any]) -> Iterator[Tuple[Any, Any]]:
+        for key, value in zip(keys, self.backend.get_many(keys)):
+            if value is not None:
+                yield key, value
+
     def set(self, key: Any, value: Any, ttl: Optional[timedelta] = None) -> None:
         self.backend.set(key, value, timeout=int(ttl.total_seconds()) if ttl is not None else None)
 
+    def set_many(self, items: Sequence[Tuple[Any, Any, Optional[timedelta]]]) -> None:
+        self.backend.set_many(
+            [
+                (key, value, int(ttl.total_seconds()) if ttl is not None else None)
+                for key, value, ttl in items
+            ]
+        )
+
     def delete(self, key: Any) -> None:
         self.backend.delete(key)
 
+    def delete_many(self, keys: Sequence[Any]) -> None:
+        self.backend.delete_many(keys)
+
     def bootstrap(self) -> None:
         # Nothing to do in this method: the backend is expected to either not
         # require any explicit setup action (memcached, Redis) or that setup is
@@ -91,6 +107,11 @@ class CacheKeyWrapper(KVStorage[str, V]):
             ttl,
         )
 
+    def set_many(self, items: Sequence[Tuple[str, V, Optional[timedelta]]]) -> None:
+        return self.storage.set_many(
+            [(wrap_key(self.prefix, self.version, key), value, ttl) for key, value, ttl in items]
+        )
+
     def delete(self, key: str) -> None:
         self.storage.delete(wrap_key(self.prefix, self.version, key))
 
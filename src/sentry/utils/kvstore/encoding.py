@@ -34,6 +34,11 @@ class KVStorageCodecWrapper(KVStorage[K, TDecoded]):
     def set(self, key: K, value: TDecoded, ttl: Optional[timedelta] = None) -> None:
         return self.store.set(key, self.value_codec.encode(value), ttl)
 
+    def set_many(self, items: Sequence[Tuple[K, TDecoded, Optional[timedelta]]]) -> None:
+        return self.store.set_many(
+            [(key, self.value_codec.encode(value), ttl) for key, value, ttl in items]
+        )
+
     def delete(self, key: K) -> None:
         return self.store.delete(key)
 
@@ -1,5 +1,5 @@
 from datetime import timedelta
-from typing import Optional
+from typing import Iterator, Optional, Sequence, Tuple
 
 from redis import Redis
 
@@ -10,6 +10,10 @@ class RedisKVStorage(KVStorage[str, bytes]):
     """
     This class provides a key/value store backed by Redis (either a single node
     or cluster.)
+
+    Multiple key operations are sent as a single non-transactional pipeline
+    (which the cluster client splits by node), so they require one round trip
+    per node rather than one per key.
     """
 
     def __init__(self, client: "Redis[bytes]") -> None:
@@ -18,12 +22,43 @@ class RedisKVStorage(KVStorage[str, bytes]):
     def get(self, key: str) -> Optional[bytes]:
         return self.client.get(key.encode("utf8"))
 
+    def get_many(self, keys: Sequence[str]) -> Iterator[Tuple[str, bytes]]:
+        if not keys:
+            return
+
+        with self.client.pipeline(transaction=False) as pipeline:
+            for key in keys:
+                pipeline.get(key.encode("utf8"))
+            values = pipeline.execute()
+
+        for key, value in zip(keys, values):
+            if value is not None:
+                yield key, value
+
     def set(self, key: str, value: bytes, ttl: Optional[timedelta] = None) -> None:
         self.client.set(key.encode("utf8"), value, ex=ttl)
 
+    def set_many(self, items: Sequence[Tuple[str, bytes, Optional[timedelta]]]) -> None:
+        if not items:
+            return
+
+        with self.client.pipeline(transaction=False) as pipeline:
+            for key, value, ttl in items:
+                pipeline.set(key.encode("utf8"), value, ex=ttl)
+            pipeline.execute()
+
     def delete(self, key: str) -> None:
         self.client.delete(key.encode("utf8"))
 
+    def delete_many(self, keys: Sequence[str]) -> None:
+        if not keys:
+            return
+
+        with self.client.pipeline(transaction=False) as pipeline:
+            for key in keys:
+                pipeline.delete(key.encode("utf8"))
+            pipeline.execute()
+
     def bootstrap(self) -> None:
         pass  # nothing to do
 
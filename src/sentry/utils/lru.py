@@ -0,0 +1,144 @@
+import threading
+from collections import OrderedDict
+from typing import (
+    Any,
+    Callable,
+    Generic,
+    Hashable,
+    Iterable,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Tuple,
+    TypeVar,
+    Union,
+)
+
+from sentry.utils import metrics
+
+__all__ = ["LRUCache"]
+
+V = TypeVar("V")
+
+__unset__ = object()
+
+
+class LRUCache(Generic[V]):
+    """
+    A thread safe, process local cache that evicts the least recently used
+    entries once the combined weight of its entries exceeds ``max_weight``.
+
+    By default every entry weighs 1, which turns ``max_weight`` into a limit on
+    the number of entries. Pass ``weight`` to ``set`` to budget by something
+    else, e.g. an estimate of the memory an entry holds on to.
+
+    If ``metrics_key`` is given, hits, misses and evictions are counted as
+    ``<metrics_key>.hit``, ``<metrics_key>.miss`` and ``<metrics_key>.evict``.
+    ``max_weight`` may also be a callable, in which case it is evaluated on
+    every write so that the limit can be tuned at runtime through an option.
+    """
+
+    def __init__(
+        self,
+        max_weight: Union[int, Callable[[], int]],
+        metrics_key: Optional[str] = None,
+        metrics_sample_rate: float = 1.0,
+    ) -> None:
+        self.__max_weight = max_weight
+        self.__metrics_key = metrics_key
+        self.__metrics_sample_rate = metrics_sample_rate
+        self.__data: "OrderedDict[Hashable, Tuple[V, int]]" = OrderedDict()
+        self.__weight = 0
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        # Does not count as a use of the entry.
+        return key in self.__data
+
+    @property
+    def weight(self) -> int:
+        return self.__weight
+
+    @property
+    def max_weight(self) -> int:
+        if callable(self.__max_weight):
+            return self.__max_weight()
+        return self.__max_weight
+
+    def __record(self, outcome: str, amount: int = 1) -> None:
+        if self.__metrics_key is not None and amount:
+            metrics.incr(
+                f"{self.__metrics_key}.{outcome}",
+                amount=amount,
+                sample_rate=self.__metrics_sample_rate,
+            )
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self.__lock:
+            item = self.__data.get(key, __unset__)
+            if item is not __unset__:
+                self.__data.move_to_end(key)
+
+        if item is __unset__:
+            self.__record("miss")
+            return default
+
+        self.__record("hit")
+        return item[0]
+
+    def get_many(self, keys: Iterable[Hashable]) -> Mapping[Hashable, V]:
+        """
+        Look up several keys at once, returning a mapping of the keys that
+        were found. Metrics are recorded once for the whole lookup.
+        """
+        results: MutableMapping[Hashable, V] = {}
+        misses = 0
+
+        with self.__lock:
+            for key in keys:
+                item = self.__data.get(key, __unset__)
+                if item is __unset__:
+                    misses += 1
+                else:
+                    self.__data.move_to_end(key)
+                    results[key] = item[0]
+
+        self.__record("hit", len(results))
+        self.__record("miss", misses)
+        return results
+
+    def set(self, key: Hashable, value: V, weight: int = 1) -> None:
+        max_weight = self.max_weight
+        evicted = 0
+
+        with self.__lock:
+            previous = self.__data.pop(key, __unset__)
+            if previous is not __unset__:
+                self.__weight -= previous[1]
+
+            # Entries that would not fit even into an empty cache are not
+            # stored at all, rather than flushing everything else.
+            if weight <= max_weight:
+                self.__data[key] = (value, weight)
+                self.__weight += weight
+
+            while self.__weight > max_weight:
+                _, (_, evicted_weight) = self.__data.popitem(last=False)
+                self.__weight -= evicted_weight
+                evicted += 1
+
+        self.__record("evict", evicted)
+
+    def delete(self, key: Hashable) -> None:
+        with self.__lock:
+            previous = self.__data.pop(key, __unset__)
+            if previous is not __unset__:
+                self.__weight -= previous[1]
+
+    def clear(self) -> None:
+        with self.__lock:
+            self.__data.clear()
+            self.__weight = 0
@@ -92,6 +92,9 @@ def pytest_configure(config):
     settings.SENTRY_TSDB = "sentry.tsdb.inmemory.InMemoryTSDB"
     settings.SENTRY_TSDB_OPTIONS = {}
 
+    # The in-process indexer cache would outlive the database state of a test
+    settings.SENTRY_METRICS_INDEXER_OPTIONS = {}
+
     settings.SENTRY_NEWSLETTER = "sentry.newsletter.dummy.DummyNewsletter"
     settings.SENTRY_NEWSLETTER_OPTIONS = {}
 
@@ -1,5 +1,6 @@
 from sentry import features
 from sentry.app import ratelimiter
+from sentry.ratelimits.base import RateLimitCheck
 from sentry.utils.hashlib import md5_text
 
 DEFAULT_CONFIG = {
@@ -23,24 +24,26 @@ def for_organization_member_invite(organization, email, user=None, auth=None, co
     if not features.has("organizations:invite-members-rate-limits", organization, actor=user):
         return False
 
-    limits = (
-        ratelimiter.is_limited(
-            "members:invite-by-user:{}".format(
-                md5_text(user.id if user and user.is_authenticated else str(auth)).hexdigest()
-            ),
-            **config["members:invite-by-user"],
-        )
-        if (user or auth)
-        else None,
-        ratelimiter.is_limited(
+    checks = [
+        RateLimitCheck(
             f"members:invite-by-org:{md5_text(organization.id).hexdigest()}",
             **config["members:invite-by-org"],
         ),
-        ratelimiter.is_limited(
+        RateLimitCheck(
             "members:org-invite-to-email:{}-{}".format(
                 organization.id, md5_text(email.lower()).hexdigest()
             ),
             **config["members:org-invite-to-email"],
         ),
-    )
-    return any(limits)
+    ]
+    if user or auth:
+        checks.append(
+            RateLimitCheck(
+                "members:invite-by-user:{}".format(
+                    md5_text(user.id if user and user.is_authenticated else str(auth)).hexdigest()
+                ),
+                **config["members:invite-by-user"],
+            )
+        )
+
+    return any(result.is_limited for result in ratelimiter.check_many(checks))
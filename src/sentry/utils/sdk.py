@@ -84,6 +84,7 @@ SAMPLED_TASKS = {
     "sentry.tasks.app_store_connect.refresh_all_builds": settings.SENTRY_APPCONNECT_APM_SAMPLING,
     "sentry.tasks.process_suspect_commits": settings.SENTRY_SUSPECT_COMMITS_APM_SAMPLING,
     "sentry.tasks.post_process.post_process_group": settings.SENTRY_POST_PROCESS_GROUP_APM_SAMPLING,
+    "sentry.tasks.post_process.post_process_group_batch": settings.SENTRY_POST_PROCESS_GROUP_APM_SAMPLING,
 }
 
 
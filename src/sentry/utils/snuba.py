@@ -5,13 +5,25 @@ import random
 import re
 import time
 from collections import OrderedDict, namedtuple
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, as_completed
 from contextlib import contextmanager
 from copy import deepcopy
 from datetime import datetime, timedelta
 from hashlib import sha1
 from operator import itemgetter
-from typing import Any, Callable, List, Mapping, MutableMapping, Optional, Sequence, Tuple, Union
+from typing import (
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 from urllib.parse import urlparse
 
 import pytz
@@ -226,6 +238,13 @@ class QueryConnectionFailed(QueryExecutionError):
     """
 
 
+class QueryDeadlineExceeded(SnubaError):
+    """
+    Exception raised when a query of a bulk request did not complete before
+    its deadline.
+    """
+
+
 clickhouse_error_codes_map = {
     10: QueryMissingColumn,
     43: QueryIllegalTypeOfArgument,
@@ -680,13 +699,43 @@ def bulk_snql_query(
     queries: List[Query],
     referrer: Optional[str] = None,
     use_cache: bool = False,
-) -> Mapping[str, Any]:
+    timeout: Optional[float] = None,
+    allow_partial: bool = False,
+) -> ResultSet:
     # XXX (evanh): This function does none of the extra processing that the
     # other functions do here. It does not add any automatic conditions, format
     # results, nothing. Use at your own risk.
     metrics.incr("snql.sdk.api", tags={"referrer": referrer or "unknown"})
     params: SnubaQuery = [(query, lambda x: x, lambda x: x) for query in queries]
-    return _apply_cache_and_build_results(params, referrer=referrer, use_cache=use_cache)
+    return _apply_cache_and_build_results(
+        params,
+        referrer=referrer,
+        use_cache=use_cache,
+        timeout=timeout,
+        allow_partial=allow_partial,
+    )
+
+
+def iter_bulk_snql_query(
+    queries: List[Query],
+    referrer: Optional[str] = None,
+    use_cache: bool = False,
+    timeout: Optional[float] = None,
+    allow_partial: bool = False,
+) -> Iterator[Tuple[int, Mapping[str, Any]]]:
+    """
+    Like ``bulk_snql_query``, but yields ``(index, result)`` pairs as soon as
+    each query completes instead of waiting for all of them.
+    """
+    metrics.incr("snql.sdk.api", tags={"referrer": referrer or "unknown"})
+    params: SnubaQuery = [(query, lambda x: x, lambda x: x) for query in queries]
+    return _apply_cache_and_iter_results(
+        params,
+        referrer=referrer,
+        use_cache=use_cache,
+        timeout=timeout,
+        allow_partial=allow_partial,
+    )
 
 
 def get_cache_key(query: SnubaQuery) -> str:
@@ -703,20 +752,65 @@ def bulk_raw_query(
     snuba_param_list: Sequence[SnubaQueryParams],
     referrer: Optional[str] = None,
     use_cache: Optional[bool] = False,
+    timeout: Optional[float] = None,
+    allow_partial: bool = False,
 ) -> ResultSet:
+    """
+    Runs several queries in parallel and returns their results in order.
+
+    Every query has to complete within ``timeout`` seconds, if given. With
+    ``allow_partial``, queries that fail or run out of time have ``None`` as
+    their result instead of failing the whole request.
+    """
     params = map(_prepare_query_params, snuba_param_list)
-    return _apply_cache_and_build_results(params, referrer=referrer, use_cache=use_cache)
+    return _apply_cache_and_build_results(
+        params,
+        referrer=referrer,
+        use_cache=use_cache,
+        timeout=timeout,
+        allow_partial=allow_partial,
+    )
 
 
-def _apply_cache_and_build_results(
-    snuba_param_list: Sequence[SnubaQueryBody],
+def iter_bulk_raw_query(
+    snuba_param_list: Sequence[SnubaQueryParams],
     referrer: Optional[str] = None,
     use_cache: Optional[bool] = False,
-) -> ResultSet:
+    timeout: Optional[float] = None,
+    allow_partial: bool = False,
+) -> Iterator[Tuple[int, Mapping[str, Any]]]:
+    """
+    Like ``bulk_raw_query``, but yields ``(index, result)`` pairs as soon as
+    each query completes. The queries are started right away, before the
+    first result is requested. With ``allow_partial``, queries that fail are
+    not yielded at all.
+    """
+    params = map(_prepare_query_params, snuba_param_list)
+    return _apply_cache_and_iter_results(
+        params,
+        referrer=referrer,
+        use_cache=use_cache,
+        timeout=timeout,
+        allow_partial=allow_partial,
+    )
+
+
+def _make_headers(referrer: Optional[str]) -> Mapping[str, str]:
     headers = {}
     if referrer:
         headers["referer"] = referrer
+    return headers
 
+
+def _get_cached_results(
+    snuba_param_list: Sequence[SnubaQueryBody],
+    referrer: Optional[str] = None,
+    use_cache: Optional[bool] = False,
+) -> Tuple[List[Tuple[int, Mapping[str, Any]]], List[Tuple[int, SnubaQueryBody, Optional[str]]]]:
+    """
+    Returns the cached results along with the queries that still have to be
+    run, both tagged with the original position of the query.
+    """
     # Store the original position of the query so that we can maintain the order
     query_param_list = list(enumerate(snuba_param_list))
 
@@ -738,28 +832,103 @@ def _apply_cache_and_build_results(
     else:
         to_query = [(query_pos, query_params, None) for query_pos, query_params in query_param_list]
 
+    return results, to_query
+
+
+def _cache_result(cache_key: Optional[str], result: Optional[Mapping[str, Any]]) -> None:
+    if cache_key and result is not None:
+        cache.set(cache_key, json.dumps(result), settings.SENTRY_SNUBA_CACHE_TTL_SECONDS)
+
+
+def _apply_cache_and_build_results(
+    snuba_param_list: Sequence[SnubaQueryBody],
+    referrer: Optional[str] = None,
+    use_cache: Optional[bool] = False,
+    timeout: Optional[float] = None,
+    allow_partial: bool = False,
+) -> ResultSet:
+    results, to_query = _get_cached_results(snuba_param_list, referrer, use_cache)
+
     if to_query:
-        query_results = _bulk_snuba_query(map(itemgetter(1), to_query), headers)
+        query_results = _bulk_snuba_query(
+            map(itemgetter(1), to_query),
+            _make_headers(referrer),
+            timeout=timeout,
+            allow_partial=allow_partial,
+        )
         for result, (query_pos, _, cache_key) in zip(query_results, to_query):
-            if cache_key:
-                cache.set(cache_key, json.dumps(result), settings.SENTRY_SNUBA_CACHE_TTL_SECONDS)
+            _cache_result(cache_key, result)
             results.append((query_pos, result))
 
     # Sort so that we get the results back in the original param list order
-    results.sort()
+    results.sort(key=itemgetter(0))
     # Drop the sort order val
     return map(itemgetter(1), results)
 
 
+def _apply_cache_and_iter_results(
+    snuba_param_list: Sequence[SnubaQueryBody],
+    referrer: Optional[str] = None,
+    use_cache: Optional[bool] = False,
+    timeout: Optional[float] = None,
+    allow_partial: bool = False,
+) -> Iterator[Tuple[int, Mapping[str, Any]]]:
+    results, to_query = _get_cached_results(snuba_param_list, referrer, use_cache)
+    if not to_query:
+        return iter(results)
+
+    query_results = _bulk_snuba_query_iter(
+        [query_params for _, query_params, _ in to_query],
+        _make_headers(referrer),
+        timeout=timeout,
+        allow_partial=allow_partial,
+    )
+
+    def iter_results():
+        yield from results
+        for index, result in query_results:
+            query_pos, _, cache_key = to_query[index]
+            _cache_result(cache_key, result)
+            yield query_pos, result
+
+    return iter_results()
+
+
 def _bulk_snuba_query(
     snuba_param_list: Sequence[SnubaQueryBody],
     headers: Mapping[str, str],
+    timeout: Optional[float] = None,
+    allow_partial: bool = False,
 ) -> ResultSet:
+    results: List[Optional[Mapping[str, Any]]] = [None] * len(snuba_param_list)
+    for index, result in _bulk_snuba_query_iter(
+        snuba_param_list, headers, timeout=timeout, allow_partial=allow_partial
+    ):
+        results[index] = result
+    return results
+
+
+def _bulk_snuba_query_iter(
+    snuba_param_list: Sequence[SnubaQueryBody],
+    headers: Mapping[str, str],
+    timeout: Optional[float] = None,
+    allow_partial: bool = False,
+) -> Iterator[Tuple[int, Mapping[str, Any]]]:
+    """
+    Starts the queries in parallel and returns an iterator of ``(index,
+    result)`` pairs in the order in which the queries complete.
+
+    If a query fails, the queries that have not been started yet are
+    cancelled and the error is raised, unless ``allow_partial`` is set, in
+    which case the failed query is skipped.
+    """
+    query_referrer = headers.get("referer", "<unknown>")
+    deadline = time.time() + timeout if timeout is not None else None
+
     with sentry_sdk.start_span(
         op="start_snuba_query",
         description=f"running {len(snuba_param_list)} snuba queries",
     ) as span:
-        query_referrer = headers.get("referer", "<unknown>")
         # We set both span + sdk level, this is cause 1 txn/error might query snuba more than once
         # but we still want to know a general sense of how referrers impact performance
         span.set_tag("query.referrer", query_referrer)
@@ -778,74 +947,169 @@ def _bulk_snuba_query(
         span.set_tag("snuba.query.type", query_type)
 
         if len(snuba_param_list) > 1:
-            query_results = list(
-                _query_thread_pool.map(
+            futures = {
+                _query_thread_pool.submit(
+                    _query_before_deadline,
                     query_fn,
-                    [(params, Hub(Hub.current), headers) for params in snuba_param_list],
-                )
-            )
+                    (params, Hub(Hub.current), headers),
+                    deadline,
+                ): index
+                for index, params in enumerate(snuba_param_list)
+            }
+            completed = _completed_before_deadline(futures, deadline)
         else:
             # No need to submit to the thread pool if we're just performing a single query
-            query_results = [query_fn((snuba_param_list[0], Hub(Hub.current), headers))]
+            futures = {}
+            completed = [
+                (
+                    0,
+                    functools.partial(
+                        _query_before_deadline,
+                        query_fn,
+                        (snuba_param_list[0], Hub(Hub.current), headers),
+                        deadline,
+                    ),
+                )
+            ]
 
-    results = []
-    for response, _, reverse in query_results:
-        try:
-            body = json.loads(response.data)
-            if SNUBA_INFO:
-                if "sql" in body:
-                    logger.info(
-                        "{}.sql: {}".format(headers.get("referer", "<unknown>"), body["sql"])
-                    )
-                if "error" in body:
-                    logger.info(
-                        "{}.err: {}".format(headers.get("referer", "<unknown>"), body["error"])
-                    )
-        except ValueError:
-            if response.status != 200:
-                logger.error("snuba.query.invalid-json")
-                raise SnubaError("Failed to parse snuba error response")
-            raise UnexpectedResponseError(f"Could not decode JSON response: {response.data}")
+    return _iter_bulk_results(completed, futures, headers, allow_partial)
 
-        if response.status != 200:
-            if body.get("error"):
-                error = body["error"]
-                if response.status == 429:
-                    raise RateLimitExceeded(error["message"])
-                elif error["type"] == "schema":
-                    raise SchemaValidationError(error["message"])
-                elif error["type"] == "clickhouse":
-                    raise clickhouse_error_codes_map.get(error["code"], QueryExecutionError)(
-                        error["message"]
-                    )
-                else:
-                    raise SnubaError(error["message"])
+
+def _iter_bulk_results(
+    completed: Iterable[Tuple[int, Callable[[], "RawResult"]]],
+    futures: Iterable[Any],
+    headers: Mapping[str, str],
+    allow_partial: bool,
+) -> Iterator[Tuple[int, Mapping[str, Any]]]:
+    query_referrer = headers.get("referer", "<unknown>")
+    try:
+        # Parse every result as soon as its query completes, rather than
+        # once all of them are done.
+        for index, get_result in completed:
+            try:
+                response, _, reverse = get_result()
+                result = _parse_snuba_response(response, reverse, headers)
+            except SnubaError as error:
+                if not allow_partial:
+                    raise
+                metrics.incr(
+                    "snuba.bulk_query.partial",
+                    tags={"referrer": query_referrer, "error": type(error).__name__},
+                )
+                logger.warning(
+                    "snuba.bulk_query.partial",
+                    extra={"referrer": query_referrer, "error": str(error)},
+                )
+                continue
+
+            yield index, result
+    finally:
+        # Don't run queries whose results nobody is waiting for anymore.
+        for future in futures:
+            future.cancel()
+
+
+def _completed_before_deadline(
+    futures: Mapping[Any, int], deadline: Optional[float]
+) -> Iterator[Tuple[int, Callable[[], "RawResult"]]]:
+    """
+    Yields ``(index, get_result)`` pairs in the order in which the futures
+    complete. Once the deadline has passed, the queries that are still running
+    are yielded as well, with a ``get_result`` that raises
+    ``QueryDeadlineExceeded``.
+    """
+    pending = dict(futures)
+    timeout = max(deadline - time.time(), 0) if deadline is not None else None
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            yield pending.pop(future), future.result
+    except TimeoutError:
+        for future, index in pending.items():
+            if future.done():
+                yield index, future.result
             else:
-                raise SnubaError(f"HTTP {response.status}")
+                yield index, _raise_deadline_exceeded
 
-        # Forward and reverse translation maps from model ids to snuba keys, per column
-        body["data"] = [reverse(d) for d in body["data"]]
-        results.append(body)
 
-    return results
+def _raise_deadline_exceeded() -> "RawResult":
+    raise QueryDeadlineExceeded("Query did not complete before its deadline")
+
+
+def _query_before_deadline(
+    query_fn: Callable[..., "RawResult"],
+    params: Tuple[SnubaQueryBody, Hub, Mapping[str, str]],
+    deadline: Optional[float],
+) -> "RawResult":
+    if deadline is None:
+        return query_fn(params)
+
+    # Queries may have been waiting for a free thread, so the time that is
+    # left for them to run is only known once they start.
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise QueryDeadlineExceeded("Query was not started before its deadline")
+    return query_fn(params, timeout=remaining)
+
+
+def _parse_snuba_response(
+    response: urllib3.response.HTTPResponse,
+    reverse: Translator,
+    headers: Mapping[str, str],
+) -> Mapping[str, Any]:
+    try:
+        body = json.loads(response.data)
+        if SNUBA_INFO:
+            if "sql" in body:
+                logger.info("{}.sql: {}".format(headers.get("referer", "<unknown>"), body["sql"]))
+            if "error" in body:
+                logger.info("{}.err: {}".format(headers.get("referer", "<unknown>"), body["error"]))
+    except ValueError:
+        if response.status != 200:
+            logger.error("snuba.query.invalid-json")
+            raise SnubaError("Failed to parse snuba error response")
+        raise UnexpectedResponseError(f"Could not decode JSON response: {response.data}")
+
+    if response.status != 200:
+        if body.get("error"):
+            error = body["error"]
+            if response.status == 429:
+                raise RateLimitExceeded(error["message"])
+            elif error["type"] == "schema":
+                raise SchemaValidationError(error["message"])
+            elif error["type"] == "clickhouse":
+                raise clickhouse_error_codes_map.get(error["code"], QueryExecutionError)(
+                    error["message"]
+                )
+            else:
+                raise SnubaError(error["message"])
+        else:
+            raise SnubaError(f"HTTP {response.status}")
+
+    # Forward and reverse translation maps from model ids to snuba keys, per column
+    body["data"] = [reverse(d) for d in body["data"]]
+    return body
 
 
 RawResult = Tuple[urllib3.response.HTTPResponse, Callable[[Any], Any], Callable[[Any], Any]]
 
 
-def _snql_query(params: Tuple[SnubaQuery, Hub, Mapping[str, str]]) -> RawResult:
+def _snql_query(
+    params: Tuple[SnubaQuery, Hub, Mapping[str, str]], timeout: Optional[float] = None
+) -> RawResult:
     # Eventually we can get rid of this wrapper, but for now it's cleaner to unwrap
     # the params here than in the calling function.
     query_data, thread_hub, headers = params
     query, forward, reverse = query_data
     assert isinstance(query, Query)
     try:
-        return _raw_snql_query(query, thread_hub, headers), forward, reverse
+        return _raw_snql_query(query, thread_hub, headers, timeout), forward, reverse
     except urllib3.exceptions.HTTPError as err:
         raise SnubaError(err)
 
 
-def _legacy_snql_query(params: Tuple[SnubaQuery, Hub, Mapping[str, str]]) -> RawResult:
+def _legacy_snql_query(
+    params: Tuple[SnubaQuery, Hub, Mapping[str, str]], timeout: Optional[float] = None
+) -> RawResult:
     # Convert the JSON query to SnQL and run it
     query_data, thread_hub, headers = params
     query_params, forward, reverse = query_data
@@ -853,7 +1117,7 @@ def _legacy_snql_query(params: Tuple[SnubaQuery, Hub, Mapping[str, str]]) -> Raw
     try:
         snql_entity = query_params["dataset"]
         query = json_to_snql(query_params, snql_entity)
-        result = _raw_snql_query(query, Hub(thread_hub), headers)
+        result = _raw_snql_query(query, Hub(thread_hub), headers, timeout)
     except urllib3.exceptions.HTTPError as err:
         raise SnubaError(err)
 
@@ -861,7 +1125,7 @@ def _legacy_snql_query(params: Tuple[SnubaQuery, Hub, Mapping[str, str]]) -> Raw
 
 
 def _raw_snql_query(
-    query: Query, thread_hub: Hub, headers: Mapping[str, str]
+    query: Query, thread_hub: Hub, headers: Mapping[str, str], timeout: Optional[float] = None
 ) -> urllib3.response.HTTPResponse:
     with timer("snql_query"):
         referrer = headers.get("referer", "<unknown>")
@@ -905,7 +1169,17 @@ def _raw_snql_query(
         with thread_hub.start_span(op="snuba_snql", description=f"query {referrer}") as span:
             span.set_tag("referrer", referrer)
             span.set_data("snql", str(query))
-            return _snuba_pool.urlopen("POST", f"/{query.dataset}/snql", body=body, headers=headers)
+            if timeout is None:
+                return _snuba_pool.urlopen(
+                    "POST", f"/{query.dataset}/snql", body=body, headers=headers
+                )
+
+            try:
+                return _snuba_pool.urlopen(
+                    "POST", f"/{query.dataset}/snql", body=body, headers=headers, timeout=timeout
+                )
+            except urllib3.exceptions.ReadTimeoutError as err:
+                raise QueryDeadlineExceeded(err)
 
 
 def query(
@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from sentry.api.event_search import _parse_cache, parse_search_query
+from sentry.constants import MODULE_ROOT
+from sentry.exceptions import InvalidSearchQuery
+from sentry.testutils.skips import requires_benchmark
+from sentry.utils import json
+
+FIXTURES_PATH = os.path.join(MODULE_ROOT, os.pardir, os.pardir, "tests/fixtures/search-syntax")
+
+
+def load_queries():
+    # The search syntax fixtures shared with the frontend, limited to queries
+    # that parse successfully.
+    queries = []
+    for file in sorted(os.listdir(FIXTURES_PATH)):
+        with open(os.path.join(FIXTURES_PATH, file)) as f:
+            for case in json.load(f):
+                if not case.get("raisesError"):
+                    queries.append(case["query"])
+
+    valid = []
+    for query in queries:
+        try:
+            parse_search_query(query)
+        except InvalidSearchQuery:
+            continue
+        valid.append(query)
+    return valid
+
+
+@pytest.fixture(scope="module")
+def queries():
+    return load_queries()
+
+
+def parse_all(queries):
+    for query in queries:
+        parse_search_query(query)
+
+
+@requires_benchmark
+def test_benchmark_parse_search_query_uncached(queries, benchmark):
+    benchmark.extra_info["queries"] = len(queries)
+    benchmark.pedantic(parse_all, args=(queries,), setup=_parse_cache.clear, rounds=20)
+
+
+@requires_benchmark
+def test_benchmark_parse_search_query_cached(queries, benchmark):
+    benchmark.extra_info["queries"] = len(queries)
+    parse_all(queries)
+    benchmark(parse_all, queries)
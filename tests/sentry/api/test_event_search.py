@@ -1,6 +1,7 @@
 import datetime
 import os
 from datetime import timedelta
+from unittest import mock
 
 import pytest
 from django.test import SimpleTestCase
@@ -13,6 +14,8 @@ from sentry.api.event_search import (
     SearchFilter,
     SearchKey,
     SearchValue,
+    _parse_cache,
+    event_search_grammar,
     parse_search_query,
 )
 from sentry.constants import MODULE_ROOT
@@ -203,6 +206,11 @@ class ParseSearchQueryBackendTest(SimpleTestCase):
     ParseSearchQueryTest.
     """
 
+    def setUp(self):
+        super().setUp()
+        # Parse trees are cached across tests, by query.
+        _parse_cache.clear()
+
     def test_key_remapping(self):
         config = SearchConfig(key_mappings={"target_value": ["someValue", "legacy-value"]})
 
@@ -220,6 +228,29 @@ class ParseSearchQueryBackendTest(SimpleTestCase):
             ),
         ]
 
+    def test_parse_cache(self):
+        query = "someValue:123 first_seen:-1d"
+        config = SearchConfig(key_mappings={"target_value": ["someValue"]})
+
+        with mock.patch(
+            "sentry.api.event_search.event_search_grammar.parse",
+            wraps=event_search_grammar.parse,
+        ) as parse:
+            now = timezone.now()
+            with freeze_time(now):
+                first = parse_search_query(query, config=config)
+                assert first[1].value.raw_value == now - timedelta(days=1)
+
+            # The parse tree is reused, but filters are built for the new
+            # config and the current time.
+            with freeze_time(now + timedelta(hours=1)):
+                second = parse_search_query(query)
+                assert second[0].key.name == "someValue"
+                assert second[1].value.raw_value == now + timedelta(hours=1) - timedelta(days=1)
+
+        assert first[0].key.name == "target_value"
+        assert parse.call_count == 1
+
     def test_rel_time_filter(self):
         now = timezone.now()
         with freeze_time(now):
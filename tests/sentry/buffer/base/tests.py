@@ -73,3 +73,11 @@ class BufferTest(TestCase):
         self.buf.process(Group, columns, filters, {"last_seen": the_date}, signal_only=True)
         group.refresh_from_db()
         assert group.times_seen == prev_times_seen
+
+    def test_process_batch(self):
+        groups = [Group.objects.create(project=Project(id=1)) for _ in range(2)]
+        columns = {"times_seen": 2}
+        filters_list = [{"id": group.id} for group in groups] + [{"id": 0}]
+        assert self.buf.process_batch(Group, columns, filters_list) == [{"id": 0}]
+        for group in groups:
+            assert Group.objects.get(id=group.id).times_seen == group.times_seen + 2
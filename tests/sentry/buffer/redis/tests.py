@@ -2,12 +2,14 @@ import pickle
 from datetime import datetime
 from unittest import mock
 
+import pytest
 from django.utils import timezone
 from django.utils.encoding import force_text
 
-from sentry.buffer.redis import RedisBuffer
+from sentry.buffer.redis import COMPACT_ENCODING_V1, RedisBuffer
 from sentry.models import Group, Project
 from sentry.testutils import TestCase
+from sentry.testutils.helpers.options import override_options
 
 
 class RedisBufferTest(TestCase):
@@ -183,6 +185,121 @@ class RedisBufferTest(TestCase):
         self.buf.process("foo")
         process.assert_called_once_with(mock.Mock, {"times_seen": 1}, {"pk": 1}, {}, True)
 
+    @mock.patch("sentry.buffer.base.Buffer.process")
+    def test_process_batch_continues_after_failure(self, process):
+        client = self.buf.cluster.get_routing_client()
+        keys = []
+        for i in range(3):
+            key = f"b:k:{i}"
+            keys.append(key)
+            client.hmset(
+                key,
+                {"f": f'{{"pk": ["i","{i}"]}}', "i+times_seen": "1", "m": "unittest.mock.Mock"},
+            )
+            client.zadd("b:p", {key: 1})
+        process.side_effect = [None, ValueError("boom"), None]
+
+        with pytest.raises(ValueError):
+            self.buf.process(batch_keys=keys + keys[:1])
+
+        # keys after the failing one are still applied, and each key only once
+        assert process.call_args_list == [
+            mock.call(mock.Mock, {"times_seen": 1}, {"pk": i}, {}, None) for i in range(3)
+        ]
+        # the failing key is kept and queued again
+        assert client.zrange("b:p", 0, -1) == [b"b:k:1"]
+        assert client.hget("b:k:1", "i+times_seen") == b"1"
+        assert not client.exists("b:k:0")
+        assert not client.exists("b:k:2")
+        assert not any(client.exists(f"l:{key}") for key in keys)
+
+    @mock.patch("sentry.buffer.base.Buffer.process")
+    def test_process_keeps_concurrent_increments(self, process):
+        client = self.buf.cluster.get_routing_client()
+        client.hmset(
+            "foo",
+            {
+                "f": '{"pk": ["i","1"]}',
+                "i+times_seen": "2",
+                "e+last_seen": '["i","1"]',
+                "m": "unittest.mock.Mock",
+            },
+        )
+        client.zadd("b:p", {"foo": 1})
+
+        def incr(*args):
+            # another increment comes in while this one is applied
+            client.hincrby("foo", "i+times_seen", 3)
+            client.hset("foo", "e+last_seen", '["i","2"]')
+            client.zadd("b:p", {"foo": 2})
+
+        process.side_effect = incr
+        self.buf.process("foo")
+        process.assert_called_once_with(
+            mock.Mock, {"times_seen": 2}, {"pk": 1}, {"last_seen": 1}, None
+        )
+        assert client.hget("foo", "i+times_seen") == b"3"
+        assert client.hget("foo", "e+last_seen") == b'["i","2"]'
+        assert client.zrange("b:p", 0, -1) == [b"foo"]
+
+        process.reset_mock(side_effect=True)
+        self.buf.process("foo")
+        process.assert_called_once_with(
+            mock.Mock, {"times_seen": 3}, {"pk": 1}, {"last_seen": 2}, None
+        )
+        assert not client.exists("foo")
+        assert client.zrange("b:p", 0, -1) == []
+
+    @mock.patch("sentry.buffer.base.Buffer.process")
+    def test_process_batches_counter_updates(self, process):
+        project = self.create_project()
+        groups = [self.create_group(project=project, times_seen=1) for _ in range(2)]
+        client = self.buf.cluster.get_routing_client()
+        keys = []
+        for i, group_id in enumerate([groups[0].id, groups[1].id, 0]):
+            key = f"b:k:{i}"
+            keys.append(key)
+            client.hmset(
+                key,
+                {
+                    "f": f'{{"id": ["i","{group_id}"]}}',
+                    "i+times_seen": "2",
+                    "m": "sentry.models.Group",
+                },
+            )
+            client.zadd("b:p", {key: 1})
+
+        self.buf.process(batch_keys=keys + keys[:1])
+
+        for group in groups:
+            group.refresh_from_db()
+            assert group.times_seen == 3
+        # only the row that does not exist yet goes through ``process``
+        process.assert_called_once_with(Group, {"times_seen": 2}, {"id": 0}, {}, None)
+        assert client.zrange("b:p", 0, -1) == []
+        assert not any(client.exists(key) for key in keys)
+
+    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
+    @mock.patch("sentry.buffer.base.Buffer.process")
+    def test_incr_compact_encoding(self, process):
+        now = datetime(2017, 5, 3, 6, 6, 6, tzinfo=timezone.utc)
+        project = Project(id=1)
+        client = self.buf.cluster.get_routing_client()
+        columns = {"times_seen": 1}
+        filters = {"pk": 1, "datetime": now}
+        extra = {"foo": "bar", "datetime": now, "data": {"type": "error"}, "project": project}
+        with override_options({"buffer.compact-encoding": True}):
+            self.buf.incr(Group, columns, filters, extra=extra)
+
+        result = {force_text(k): v for k, v in client.hgetall("foo").items()}
+        assert result["f"].startswith(COMPACT_ENCODING_V1)
+        assert result["e+foo"].startswith(COMPACT_ENCODING_V1)
+        # values msgpack can not represent are still pickled
+        assert pickle.loads(result["e+project"]) == project
+
+        self.buf.process("foo")
+        process.assert_called_once_with(Group, columns, filters, extra, None)
+
 
 #    @mock.patch("sentry.buffer.redis.RedisBuffer._make_key", mock.Mock(return_value="foo"))
 #    def test_incr_uses_signal_only(self):
@@ -0,0 +1,85 @@
+from datetime import datetime
+
+import pytest
+from django.utils import timezone
+from django.utils.encoding import force_text
+
+from sentry.buffer.redis import RedisBuffer
+from sentry.models import Group, GroupRelease, ReleaseProject
+from sentry.testutils.helpers.options import override_options
+from sentry.testutils.skips import requires_benchmark
+
+NOW = datetime(2021, 10, 1, 12, 30, 45, 123456, tzinfo=timezone.utc)
+
+# Representative buffer writes made by the event pipeline.
+WRITES = {
+    "group": (
+        Group,
+        {"times_seen": 1},
+        {"id": 2871543},
+        {
+            "last_seen": NOW,
+            "message": "ZeroDivisionError division by zero sentry.tasks.store in process",
+            "data": {
+                "last_received": 1633091445.123456,
+                "type": "error",
+                "culprit": "sentry.tasks.store in process",
+                "title": "ZeroDivisionError: division by zero",
+                "location": None,
+                "metadata": {
+                    "type": "ZeroDivisionError",
+                    "value": "division by zero",
+                    "filename": "sentry/tasks/store.py",
+                    "function": "process",
+                    "display_title_with_tree_label": False,
+                },
+            },
+        },
+    ),
+    "release-project": (
+        ReleaseProject,
+        {"new_groups": 1},
+        {"release_id": 1762214, "project_id": 1},
+        None,
+    ),
+    "group-release": (GroupRelease, {}, {"id": 93812231}, {"last_seen": NOW}),
+}
+
+
+@pytest.fixture(params=[False, True], ids=["pickle", "compact"])
+def buffer(request):
+    with override_options({"buffer.compact-encoding": request.param}):
+        yield RedisBuffer()
+
+
+def write(buffer, name):
+    model, columns, filters, extra = WRITES[name]
+    buffer.incr(model, columns, filters, extra)
+    key = buffer._make_key(model, filters)
+    client = buffer.cluster.get_local_client_for_key(key)
+    return client, key
+
+
+@requires_benchmark
+@pytest.mark.parametrize("name", list(WRITES))
+def test_benchmark_decode(buffer, name, benchmark):
+    client, key = write(buffer, name)
+    values = {force_text(k): v for k, v in client.hgetall(key).items()}
+    benchmark.extra_info["redis_bytes"] = client.execute_command("MEMORY", "USAGE", key)
+    benchmark.extra_info["payload_bytes"] = sum(len(v) for v in values.values())
+    client.delete(key)
+
+    benchmark(lambda: buffer._load_incr(dict(values)))
+
+
+@requires_benchmark
+@pytest.mark.parametrize("name", list(WRITES))
+def test_benchmark_encode(buffer, name, benchmark):
+    _, _, filters, extra = WRITES[name]
+
+    def encode():
+        buffer._encode(filters)
+        for value in (extra or {}).values():
+            buffer._encode(value)
+
+    benchmark(encode)
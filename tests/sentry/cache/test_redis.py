@@ -19,3 +19,17 @@ class RedisCacheTest(TestCase):
 
         with self.assertRaises(ValueTooLarge):
             self.backend.set("foo", "x" * (RedisCache.max_size + 1), 0)
+
+    def test_multiple_keys(self):
+        self.backend.set_many([("foo", {"foo": "bar"}, 50), ("bar", [1, 2], None)])
+
+        assert self.backend.get_many(["foo", "missing", "bar"]) == [{"foo": "bar"}, None, [1, 2]]
+        assert self.backend.get("foo") == {"foo": "bar"}
+
+        self.backend.delete_many(["foo", "missing"])
+        assert self.backend.get_many(["foo", "bar"]) == [None, [1, 2]]
+
+        assert self.backend.get_many([]) == []
+
+        with self.assertRaises(ValueTooLarge):
+            self.backend.set_many([("foo", "x" * (RedisCache.max_size + 1), 0)])
@@ -1,3 +1,4 @@
+from hashlib import sha1
 from unittest.mock import patch
 
 from django.db import IntegrityError
@@ -84,8 +85,12 @@ class AssembleDownloadTest(TestCase, SnubaTestCase):
         assert file.headers == {"Content-Type": "text/csv"}
         assert file.size is not None
         assert file.checksum is not None
+        contents = file.getfile().read()
+        assert file.size == len(contents)
+        assert file.checksum == sha1(contents).hexdigest()
+        assert file.blobs.count() > 1
         # Convert raw csv to list of line-strings
-        header, raw1, raw2 = file.getfile().read().strip().split(b"\r\n")
+        header, raw1, raw2 = contents.strip().split(b"\r\n")
         assert header == b"value,times_seen,last_seen,first_seen"
 
         raw1, raw2 = sorted([raw1, raw2])
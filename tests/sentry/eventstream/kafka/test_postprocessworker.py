@@ -1,9 +1,10 @@
-from unittest.mock import MagicMock, Mock, patch
+from unittest.mock import MagicMock, Mock, call, patch
 
 import pytest
 
 from sentry import options
 from sentry.eventstream.kafka.postprocessworker import (
+    _BATCH_SIZE_OPTION,
     _CONCURRENCY_OPTION,
     ErrorsPostProcessForwarderWorker,
     PostProcessForwarderWorker,
@@ -160,6 +161,62 @@ def test_post_process_forwarder_concurrency(kafka_message_payload):
     forwarder.shutdown()
 
 
+@pytest.mark.django_db
+@patch("sentry.eventstream.kafka.postprocessworker.post_process_group_batch.delay")
+@patch("sentry.eventstream.kafka.postprocessworker.dispatch_post_process_group_task")
+def test_post_process_forwarder_batch(
+    dispatch_post_process_group_task,
+    post_process_group_batch,
+    kafka_message_payload,
+    kafka_message_without_transaction_header,
+):
+    """
+    Tests that events are dispatched in batches when the batch size option is set.
+    """
+    options.set(_BATCH_SIZE_OPTION, 2)
+    forwarder = PostProcessForwarderWorker(concurrency=1)
+
+    skipped_payload = [
+        *kafka_message_payload[:3],
+        {**kafka_message_payload[3], "skip_consume": True},
+    ]
+    skipped_message = Mock()
+    skipped_message.headers = MagicMock(return_value=[])
+    skipped_message.value = MagicMock(return_value=json.dumps(skipped_payload))
+    skipped_message.partition = MagicMock("1")
+
+    futures = [
+        forwarder.process_message(kafka_message_without_transaction_header),
+        forwarder.process_message(skipped_message),
+        forwarder.process_message(kafka_message_without_transaction_header),
+        forwarder.process_message(kafka_message_without_transaction_header),
+    ]
+    forwarder.flush_batch(futures)
+
+    dispatch_post_process_group_task.assert_not_called()
+    event = {
+        "is_new": False,
+        "is_regression": None,
+        "is_new_group_environment": False,
+        "primary_hash": "311ee66a5b8e697929804ceb1c456ffe",
+        "cache_key": "e:fe0ee9a2bc3b415497bad68aaf70dc7f:1",
+        "group_id": 43,
+    }
+    assert post_process_group_batch.call_args_list == [
+        call(events=[event]),
+        call(events=[event, event]),
+    ]
+
+    # Switching back to one task per event takes effect after the flush.
+    options.set(_BATCH_SIZE_OPTION, 0)
+    forwarder.flush_batch(None)
+    forwarder.flush_batch([forwarder.process_message(kafka_message_without_transaction_header)])
+    dispatch_post_process_group_task.assert_called_once()
+    assert post_process_group_batch.call_count == 2
+
+    forwarder.shutdown()
+
+
 @pytest.mark.django_db
 @patch("sentry.eventstream.kafka.postprocessworker.dispatch_post_process_group_task")
 def test_errors_post_process_forwarder_missing_headers(
@@ -1,22 +1,19 @@
+from copy import deepcopy
+
 import pytest
 
 from sentry.grouping.api import get_default_grouping_config_dict
+from sentry.grouping.component import GroupingComponent
+from sentry.grouping.enhancer import ENHANCEMENT_BASES
 from sentry.grouping.strategies.configurations import CONFIGURATIONS
+from sentry.testutils.skips import requires_benchmark
+from sentry.utils.safe import get_path
 from tests.sentry.grouping import grouping_input as grouping_inputs
 
 CONFIGS = {key: get_default_grouping_config_dict(key) for key in sorted(CONFIGURATIONS.keys())}
 
 
-def benchmark_available():
-    try:
-        import pytest_benchmark  # NOQA
-    except ModuleNotFoundError:
-        return False
-    else:
-        return True
-
-
-@pytest.mark.skipif(not benchmark_available(), reason="requires pytest-benchmark")
+@requires_benchmark
 @pytest.mark.parametrize(
     "config_name", sorted(CONFIGURATIONS.keys()), ids=lambda x: x.replace("-", "_")
 )
@@ -37,3 +34,41 @@ def run_configuration(grouping_input, config):
     event.project = None
 
     event.get_hashes()
+
+
+def _get_stacktraces(grouping_input):
+    data = grouping_input.data
+    stacktraces = [
+        exception.get("stacktrace")
+        for exception in get_path(data, "exception", "values", filter=True, default=())
+    ]
+    stacktraces.append(data.get("stacktrace"))
+    for thread in get_path(data, "threads", "values", filter=True, default=()):
+        stacktraces.append(thread.get("stacktrace"))
+    return [
+        (get_path(stacktrace, "frames", filter=True), data.get("platform"))
+        for stacktrace in stacktraces
+        if get_path(stacktrace, "frames", filter=True)
+    ]
+
+
+STACKTRACES = [
+    stacktrace
+    for grouping_input in grouping_inputs
+    for stacktrace in _get_stacktraces(grouping_input)
+]
+
+
+@requires_benchmark
+@pytest.mark.parametrize("base", sorted(ENHANCEMENT_BASES), ids=lambda x: x.replace("-", "_"))
+def test_benchmark_enhancements(base, benchmark):
+    enhancements = ENHANCEMENT_BASES[base]
+
+    def run():
+        for frames, platform in STACKTRACES:
+            frames = deepcopy(frames)
+            enhancements.apply_modifications_to_frame(frames, platform, None)
+            components = [GroupingComponent(id="frame") for _ in frames]
+            enhancements.update_frame_components_contributions(components, frames, platform, None)
+
+    benchmark(run)
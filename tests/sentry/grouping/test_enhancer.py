@@ -1,7 +1,16 @@
+from unittest import mock
+
 import pytest
 
 from sentry.grouping.component import GroupingComponent
-from sentry.grouping.enhancer import Enhancements, InvalidEnhancerConfig, create_match_frame
+from sentry.grouping.enhancer import (
+    ENHANCEMENT_BASES,
+    Enhancements,
+    FrameIndex,
+    InvalidEnhancerConfig,
+    create_match_frame,
+)
+from sentry.grouping.utils import MatchCache
 
 
 def dump_obj(obj):
@@ -67,7 +76,7 @@ def test_callee_recursion():
 def _get_matching_frame_actions(rule, frames, platform, exception_data=None, cache=None):
     """Convenience function for rule tests"""
     if cache is None:
-        cache = {}
+        cache = MatchCache()
 
     match_frames = [create_match_frame(frame, platform) for frame in frames]
 
@@ -333,6 +342,22 @@ def test_mechanism_matching():
     )
 
 
+def test_exception_matches_not_shared():
+    rule = Enhancements.from_config_string("error.value:*failed* -app").rules[0]
+
+    with mock.patch("sentry.grouping.utils._shared_match_cache") as shared_cache:
+        shared_cache.get.return_value = None
+        for index in range(3):
+            assert _get_matching_frame_actions(
+                rule,
+                [{"function": "foo"}, {"function": "bar"}],
+                "python",
+                {"value": f"request {index} failed"},
+            )
+
+    assert not shared_cache.set.called
+
+
 def test_range_matching():
     enhancement = Enhancements.from_config_string(
         """
@@ -418,3 +443,72 @@ def test_sentinel_and_prefix(action, type):
     actions[0][1].update_frame_components_contributions([component], frames, 0)
     expected = True if action == "+" else False
     assert getattr(component, f"is_{type}_frame") is expected
+
+
+def test_rule_dispatch():
+    rules = Enhancements.from_config_string(
+        """
+        family:native function:std::*                   -app
+        family:native,javascript function:panic         -group
+        family:all module:core                          -app
+        !family:native module:foo                       -app
+        [ function:foo ] | function:bar                 -app
+        function:foo function:bar                       -app
+    """
+    ).rules
+
+    assert [rule.dispatch for rule in rules] == [
+        {"family": {b"native"}},
+        {"family": {b"native", b"javascript"}, "function": {b"panic"}},
+        {"module": {b"core"}},
+        {"module": {b"foo"}},
+        {"function": {b"bar"}},
+        {"function": set()},
+    ]
+
+
+def test_frame_index():
+    frames = [
+        {"function": "panic", "platform": "native"},
+        {"function": "panic", "platform": "javascript"},
+        {"function": "main", "platform": "native"},
+    ]
+    index = FrameIndex([create_match_frame(frame, "python") for frame in frames])
+
+    assert list(index.get_candidates({})) == [0, 1, 2]
+    assert index.get_candidates({"family": {b"native"}}) == [0, 2]
+    assert index.get_candidates({"family": {b"native"}, "function": {b"panic"}}) == [0]
+    assert index.get_candidates({"family": {b"native", b"javascript"}}) == [0, 1, 2]
+    assert index.get_candidates({"module": {b"foo"}}) == []
+
+
+@pytest.mark.parametrize("base", sorted(ENHANCEMENT_BASES))
+def test_dispatch_matches_all_frames(base):
+    """Evaluating rules only on the candidate frames of the index must yield
+    the same actions as evaluating them on all frames."""
+    frames = [
+        {"function": function, "module": module, "package": package, "platform": platform}
+        for platform in ("native", "javascript", "python")
+        for function, module, package in [
+            ("std::panicking::begin_panic", None, "/usr/lib/libstd.so"),
+            ("core::panicking::panic", "core", "/lib/libcore.so"),
+            ("__rust_start_panic", None, None),
+            ("kscrash_reportUserException", None, "/private/var/containers/Bundle/Application/x"),
+            ("main", "app", "/Users/foo/app"),
+            ("captureException", "@sentry/browser", None),
+            ("-[SentryClient crash]", None, "Sentry.framework/Sentry"),
+        ]
+    ]
+    match_frames = [create_match_frame(frame, "native") for frame in frames]
+    index = FrameIndex(match_frames)
+
+    for rule in ENHANCEMENT_BASES[base].iter_rules():
+        assert (
+            rule.get_matching_frame_actions(
+                match_frames,
+                "native",
+                candidates=index.get_candidates(rule.dispatch),
+                cache=MatchCache(),
+            )
+            == rule.get_matching_frame_actions(match_frames, "native", cache=MatchCache())
+        )
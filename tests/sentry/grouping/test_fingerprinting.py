@@ -1,7 +1,10 @@
+from unittest import mock
+
 import pytest
 
 from sentry.grouping.api import get_default_grouping_config_dict
 from sentry.grouping.fingerprinting import FingerprintingRules, InvalidFingerprintingConfig
+from sentry.utils.glob import glob_match
 from tests.sentry.grouping import with_fingerprint_input
 
 GROUPING_CONFIG = get_default_grouping_config_dict()
@@ -184,3 +187,48 @@ def test_event_hash_variant(insta_snapshot, input):
             },
         }
     )
+
+
+def test_match_cache_shared_across_events():
+    rules = FingerprintingRules.from_config_string(
+        """
+function:assertion_failed module:foo            -> AssertionFailed, foo
+        """
+    )
+    data = {
+        "exception": {
+            "values": [
+                {
+                    "stacktrace": {"frames": [{"function": "assertion_failed", "module": "foo"}]},
+                }
+            ]
+        }
+    }
+
+    with mock.patch("sentry.grouping.fingerprinting.glob_match", wraps=glob_match) as matcher:
+        first = rules.get_fingerprint_values_for_event(data)
+        calls = matcher.call_count
+        second = rules.get_fingerprint_values_for_event(data)
+
+    assert first == second
+    assert first[1] == ["AssertionFailed", "foo"]
+    assert calls > 0
+    # The second event is matched from the cache shared across events
+    assert matcher.call_count == calls
+
+
+def test_match_cache_skips_messages():
+    rules = FingerprintingRules.from_config_string(
+        """
+message:"*connection reset*"                    -> ConnectionReset
+        """
+    )
+
+    with mock.patch("sentry.grouping.utils._shared_match_cache") as shared_cache:
+        for index in range(3):
+            values = rules.get_fingerprint_values_for_event(
+                {"logentry": {"formatted": f"request {index} failed: connection reset by peer"}}
+            )
+            assert values[1] == ["ConnectionReset"]
+
+    assert not shared_cache.set.called
@@ -30,16 +30,19 @@ from sentry.incidents.models import (
 )
 from sentry.incidents.subscription_processor import (
     SubscriptionProcessor,
+    alert_rule_cache,
     build_alert_rule_stat_keys,
     build_alert_rule_trigger_stat_key,
     build_trigger_stat_keys,
     get_alert_rule_stats,
+    get_and_record_comparison_history,
     get_redis_client,
     partition,
+    prefetch_alert_rules,
     update_alert_rule_stats,
 )
 from sentry.models import Integration
-from sentry.snuba.models import QueryDatasets, QuerySubscription, SnubaQueryEventType
+from sentry.snuba.models import QueryDatasets, QuerySubscription, SnubaQuery, SnubaQueryEventType
 from sentry.testutils import SnubaTestCase, TestCase
 from sentry.testutils.helpers.datetime import iso_format
 from sentry.utils import json
@@ -1547,6 +1550,33 @@ class ProcessUpdateTest(TestCase, SnubaTestCase):
         self.assert_trigger_exists_with_status(incident, trigger, TriggerStatus.RESOLVED)
         self.assert_actions_resolved_for_incident(incident, [self.action])
 
+    def test_comparison_alert_history(self):
+        rule = self.comparison_rule_below
+        trigger = self.trigger
+        with self.options({"incidents.comparison-history-enabled": True}):
+            processor = self.send_update(rule, 4, timedelta(minutes=-10), subscription=self.sub)
+            # Shouldn't trigger, since there is no history or data in the comparison period yet
+            self.assert_trigger_counts(processor, trigger, 0, 0)
+            self.assert_no_active_incident(rule)
+            self.metrics.incr.assert_has_calls(
+                [
+                    call("incidents.alert_rules.comparison_history", tags={"result": "miss"}),
+                    call("incidents.alert_rules.skipping_update_comparison_value_invalid"),
+                ]
+            )
+
+            self.metrics.incr.reset_mock()
+            with patch("sentry.incidents.subscription_processor.raw_query") as raw_query:
+                processor = self.send_update(rule, 1, timedelta(minutes=-9), subscription=self.sub)
+            # Should trigger, 1/4 == 25% < 50%, using the previous update instead of Snuba
+            raw_query.assert_not_called()
+            self.metrics.incr.assert_any_call(
+                "incidents.alert_rules.comparison_history", tags={"result": "hit"}
+            )
+            incident = self.assert_active_incident(rule)
+            self.assert_trigger_exists_with_status(incident, trigger, TriggerStatus.ACTIVE)
+            self.assert_actions_fired_for_incident(incident, [self.action])
+
     def test_comparison_alert_different_aggregate(self):
         rule = self.comparison_rule_above
         update_alert_rule(rule, aggregate="count_unique(tags[sentry:user])")
@@ -1678,6 +1708,75 @@ class TestGetAlertRuleStats(TestCase):
         assert resolve_counts == {3: 2, 4: 4}
 
 
+class TestPrefetchAlertRules(TestCase):
+    def setUp(self):
+        super().setUp()
+        alert_rule_cache.clear()
+
+    def test(self):
+        alert_rule = self.create_alert_rule()
+        trigger = create_alert_rule_trigger(alert_rule, CRITICAL_TRIGGER_LABEL, 100)
+        other_alert_rule = self.create_alert_rule()
+        subscriptions = list(
+            QuerySubscription.objects.filter(
+                snuba_query__in=[alert_rule.snuba_query, other_alert_rule.snuba_query]
+            )
+        )
+
+        with self.assertNumQueries(2):
+            prefetch_alert_rules(subscriptions)
+        with self.assertNumQueries(0):
+            prefetch_alert_rules(subscriptions)
+
+        subscription = alert_rule.snuba_query.subscriptions.get()
+        with patch.object(AlertRule.objects, "get_for_subscription") as mock_get, patch.object(
+            AlertRuleTrigger.objects, "get_for_alert_rule"
+        ) as mock_get_triggers:
+            processor = SubscriptionProcessor(subscription)
+        assert not mock_get.called
+        assert not mock_get_triggers.called
+        assert processor.alert_rule == alert_rule
+        assert processor.triggers == [trigger]
+
+        # Changes to the alert rule drop it from the cache.
+        create_alert_rule_trigger(alert_rule, WARNING_TRIGGER_LABEL, 50)
+        assert alert_rule_cache.get(subscription.id) is None
+
+
+class TestGetAndRecordComparisonHistory(TestCase):
+    def test(self):
+        alert_rule = AlertRule(id=1, comparison_delta=120)
+        sub = QuerySubscription(
+            project_id=2, subscription_id="abc", snuba_query=SnubaQuery(resolution=60)
+        )
+        start = datetime.utcnow().replace(tzinfo=pytz.utc, second=0, microsecond=0)
+
+        def record(minutes, value):
+            return get_and_record_comparison_history(
+                alert_rule, sub, start + timedelta(minutes=minutes), value
+            )
+
+        assert record(0, 10) is None
+        assert record(1, 11) is None
+        assert record(2, 12) == 10
+        assert record(3, 13) == 11
+        # No update at minute 4, so the comparison for minute 6 is missing
+        assert record(5, 15) == 13
+        assert record(6, 16) is None
+        # The history holds 4 slots, the one for minute 9 was last written at minute 5
+        assert record(11, 21) is None
+        assert record(13, 23) == 21
+
+    def test_too_many_slots(self):
+        alert_rule = AlertRule(id=1, comparison_delta=int(timedelta(days=7).total_seconds()))
+        sub = QuerySubscription(
+            project_id=2, subscription_id="abc", snuba_query=SnubaQuery(resolution=60)
+        )
+        timestamp = datetime.utcnow().replace(tzinfo=pytz.utc)
+        assert get_and_record_comparison_history(alert_rule, sub, timestamp, 10) is None
+        assert not get_redis_client().exists("{alert_rule:1:project:2}:comparison:abc")
+
+
 class TestUpdateAlertRuleStats(TestCase):
     def test(self):
         alert_rule = AlertRule(id=1)
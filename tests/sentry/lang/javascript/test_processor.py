@@ -1,3 +1,4 @@
+import base64
 import errno
 import re
 import unittest
@@ -9,6 +10,7 @@ from unittest.mock import ANY, MagicMock, call, patch
 import pytest
 import responses
 from requests.exceptions import RequestException
+from sentry_sdk import Hub
 from symbolic import SourceMapTokenMatch
 
 from sentry import http, options
@@ -25,10 +27,13 @@ from sentry.lang.javascript.processor import (
     fetch_release_file,
     fetch_sourcemap,
     generate_module,
+    get_fetch_executor,
     get_max_age,
     get_release_file_cache_key,
     get_release_file_cache_key_meta,
+    run_fetch,
     should_retry_fetch,
+    sourcemap_view_cache,
     trim_line,
 )
 from sentry.models import EventError, File, Release, ReleaseFile
@@ -1023,6 +1028,72 @@ class FetchSourcemapTest(TestCase):
         with pytest.raises(UnparseableSourcemap):
             fetch_sourcemap("http://example.com")
 
+    @override_options({"processing.sourcemap-view-cache-max-bytes": 1024 * 1024})
+    def test_release_sourcemaps_are_cached_in_process(self):
+        project = self.create_project()
+        release = Release.objects.create(organization_id=project.organization_id, version="abc")
+        release.add_project(project)
+        sourcemap = base64.b64decode(base64_sourcemap[len("data:application/json;base64,") :])
+        file = File.objects.create(name="file.min.js.map", type="release.file")
+        file.putfile(BytesIO(sourcemap))
+        ReleaseFile.objects.create(
+            name="http://example.com/file.min.js.map",
+            release_id=release.id,
+            organization_id=project.organization_id,
+            file=file,
+        )
+        sourcemap_view_cache.clear()
+
+        with patch(
+            "sentry.lang.javascript.processor.fetch_file", wraps=fetch_file
+        ) as mock_fetch_file:
+            first = fetch_sourcemap("http://example.com/file.min.js.map", release=release)
+            second = fetch_sourcemap("http://example.com/file.min.js.map", release=release)
+
+        assert mock_fetch_file.call_count == 1
+        assert first is second
+        assert list(first) == [SourceMapTokenMatch(0, 0, 1, 0, src="/test.js", src_id=0)]
+
+        sourcemap_view_cache.clear()
+
+    @responses.activate
+    @override_options({"processing.sourcemap-view-cache-max-bytes": 1024 * 1024})
+    def test_scraped_sourcemaps_without_release_are_not_cached(self):
+        responses.add(
+            responses.GET, "http://example.com", body="xxxx", content_type="application/json"
+        )
+        sourcemap_view_cache.clear()
+
+        with pytest.raises(UnparseableSourcemap):
+            fetch_sourcemap("http://example.com")
+
+        assert len(sourcemap_view_cache) == 0
+
+    @responses.activate
+    @override_options({"processing.sourcemap-view-cache-max-bytes": 1024 * 1024})
+    def test_scraped_sourcemaps_with_release_are_not_cached(self):
+        project = self.create_project()
+        release = Release.objects.create(organization_id=project.organization_id, version="abc")
+        release.add_project(project)
+        sourcemap = base64.b64decode(base64_sourcemap[len("data:application/json;base64,") :])
+        responses.add(
+            responses.GET,
+            "http://example.com/file.min.js.map",
+            body=sourcemap,
+            content_type="application/json",
+        )
+        sourcemap_view_cache.clear()
+
+        sourcemap_view = fetch_sourcemap("http://example.com/file.min.js.map", release=release)
+
+        assert list(sourcemap_view) == [SourceMapTokenMatch(0, 0, 1, 0, src="/test.js", src_id=0)]
+        assert len(sourcemap_view_cache) == 0
+
+        with pytest.raises(http.CannotFetch):
+            fetch_sourcemap(
+                "http://example.com/file.min.js.map", release=release, allow_scraping=False
+            )
+
 
 class TrimLineTest(unittest.TestCase):
     long_line = "The public is more familiar with bad design than good design. It is, in effect, conditioned to prefer bad design, because that is what it lives with. The new becomes threatening, the old reassuring."
@@ -1372,3 +1443,118 @@ class CacheSourceTest(TestCase):
         # now we have an error
         assert len(processor.cache.get_errors(abs_path)) == 1
         assert processor.cache.get_errors(abs_path)[0] == {"url": map_url, "type": "js_no_source"}
+
+
+class PopulateSourceCacheConcurrentlyTest(TestCase):
+    sourcemap = json.dumps(
+        {
+            "version": 3,
+            "file": "bundle.min.js",
+            "sources": ["bundle.js"],
+            "sourcesContent": ["console.log('hello');"],
+            "names": [],
+            "mappings": "AAAA",
+        }
+    )
+
+    def get_processor(self):
+        project = self.create_project()
+        return JavaScriptStacktraceProcessor(
+            data={"platform": "javascript"}, stacktrace_infos=None, project=project
+        )
+
+    @responses.activate
+    @override_options({"processing.sourcemaps-fetch-concurrency": 4})
+    def test_fetches_files_and_shared_sourcemap_once(self):
+        for name in ("a", "b"):
+            responses.add(
+                responses.GET,
+                f"http://example.com/{name}.min.js",
+                body="console.log('hello');\n//# sourceMappingURL=bundle.min.js.map",
+            )
+        responses.add(responses.GET, "http://example.com/bundle.min.js.map", body=self.sourcemap)
+
+        processor = self.get_processor()
+        processor.populate_source_cache(
+            [
+                {"abs_path": "http://example.com/a.min.js", "lineno": 1},
+                {"abs_path": "http://example.com/b.min.js", "lineno": 1},
+            ]
+        )
+
+        assert len(responses.calls) == 3
+        for name in ("a", "b"):
+            abs_path = f"http://example.com/{name}.min.js"
+            assert processor.cache.get(abs_path)
+            assert processor.cache.get_errors(abs_path) == []
+            sourcemap_url, sourcemap_view = processor.sourcemaps.get_link(abs_path)
+            assert sourcemap_url == "http://example.com/bundle.min.js.map"
+            assert sourcemap_view is not None
+        assert processor.cache.get("http://example.com/bundle.js")
+
+    @responses.activate
+    @override_options({"processing.sourcemaps-fetch-concurrency": 4})
+    def test_records_errors_per_file(self):
+        responses.add(
+            responses.GET,
+            "http://example.com/a.min.js",
+            body="console.log('hello');\n//# sourceMappingURL=a.min.js.map",
+        )
+        responses.add(responses.GET, "http://example.com/a.min.js.map", body="invalid")
+        responses.add(responses.GET, "http://example.com/b.min.js", status=404)
+
+        processor = self.get_processor()
+        processor.populate_source_cache(
+            [
+                {"abs_path": "http://example.com/a.min.js", "lineno": 1},
+                {"abs_path": "http://example.com/b.min.js", "lineno": 1},
+            ]
+        )
+
+        assert processor.cache.get_errors("http://example.com/a.min.js") == [
+            {"type": EventError.JS_INVALID_SOURCEMAP, "url": "http://example.com/a.min.js.map"}
+        ]
+        assert processor.cache.get_errors("http://example.com/b.min.js") == [
+            {
+                "type": EventError.FETCH_INVALID_HTTP_CODE,
+                "value": 404,
+                "url": "http://example.com/b.min.js",
+            }
+        ]
+
+    @responses.activate
+    @override_options({"processing.sourcemaps-fetch-concurrency": 4})
+    def test_respects_max_fetches(self):
+        for name in ("a", "b", "c"):
+            responses.add(responses.GET, f"http://example.com/{name}.js", body="console.log(1);")
+
+        processor = self.get_processor()
+        processor.max_fetches = 2
+        processor.populate_source_cache(
+            [{"abs_path": f"http://example.com/{name}.js", "lineno": 1} for name in ("a", "b", "c")]
+        )
+
+        assert len(responses.calls) == 2
+        assert processor.cache.get_errors("http://example.com/c.js") == [
+            {"type": EventError.JS_TOO_MANY_REMOTE_SOURCES}
+        ]
+
+    def test_fetch_executor_replaced_without_shutdown(self):
+        executor = get_fetch_executor(2)
+        assert get_fetch_executor(2) is executor
+
+        assert get_fetch_executor(3) is not executor
+        # Threads that got the old pool before the swap can still use it.
+        assert executor.submit(lambda: 1).result() == 1
+
+    @patch("sentry.lang.javascript.processor.close_old_connections")
+    def test_run_fetch(self, mock_close_old_connections):
+        hub = Hub(Hub.current)
+
+        def fetch(value):
+            assert Hub.current is hub
+            assert mock_close_old_connections.call_count == 1
+            return value
+
+        assert get_fetch_executor(2).submit(run_fetch, hub, fetch, 1).result() == 1
+        assert mock_close_old_connections.call_count == 2
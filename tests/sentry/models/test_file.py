@@ -1,12 +1,15 @@
 import os
 from io import BytesIO
+from tempfile import TemporaryDirectory
 from unittest.mock import patch
 
 from django.core.files.base import ContentFile
 from django.db import DatabaseError
 
 from sentry.models import File, FileBlob, FileBlobIndex
+from sentry.models.file import ChunkedFileBlobIndexWrapper, fileblob_cache
 from sentry.testutils import TestCase
+from sentry.testutils.helpers.options import override_options
 
 
 class FileBlobTest(TestCase):
@@ -25,6 +28,52 @@ class FileBlobTest(TestCase):
         assert my_file1.checksum == my_file2.checksum
         assert my_file1.path == my_file2.path
 
+    def test_getfile_cache(self):
+        blob = FileBlob.from_file(ContentFile(b"foo bar"))
+
+        with TemporaryDirectory() as cache_path:
+            with override_options({"fileblob.cache-path": cache_path}):
+                with blob.getfile() as fp:
+                    assert fp.read() == b"foo bar"
+
+                with patch("sentry.models.file.get_storage") as get_storage:
+                    with blob.getfile() as fp:
+                        assert fp.read() == b"foo bar"
+                assert not get_storage.called
+
+                cached_path = os.path.join(cache_path, blob.checksum[:2], blob.checksum[2:])
+                assert os.path.isfile(cached_path)
+
+                with override_options({"fileblob.cache-size": 0}):
+                    fileblob_cache.clear_old_entries()
+                assert not os.path.exists(cached_path)
+
+    def test_getfile_cache_checksum_mismatch(self):
+        blob = FileBlob.from_file(ContentFile(b"foo bar"))
+        blob.checksum = "0" * 40
+
+        with TemporaryDirectory() as cache_path:
+            with override_options({"fileblob.cache-path": cache_path}):
+                with blob.getfile() as fp:
+                    assert fp.read() == b"foo bar"
+
+            assert os.listdir(os.path.join(cache_path, "00")) == []
+
+    def test_getfile_cache_unwritable(self):
+        blob = FileBlob.from_file(ContentFile(b"foo bar"))
+
+        with TemporaryDirectory() as temp_dir:
+            # A path that cannot be written to, not even by root.
+            cache_path = os.path.join(temp_dir, "cache")
+            with open(cache_path, "wb"):
+                pass
+
+            with override_options({"fileblob.cache-path": cache_path}):
+                with patch("sentry.utils.metrics.incr") as incr:
+                    with blob.getfile() as fp:
+                        assert fp.read() == b"foo bar"
+                incr.assert_any_call("filestore.blob-cache.error", sample_rate=1.0)
+
     def test_generate_unique_path(self):
         path = FileBlob.generate_unique_path()
         assert path
@@ -154,6 +203,31 @@ class FileTest(TestCase):
             with self.assertRaises(ValueError):
                 fp.seek(0, 666)
 
+    def test_read_ahead(self):
+        bytes = BytesIO(b"abcdefghijklmnopqrstuvwxyz")
+        file1 = File.objects.create(name="baz.js", type="default", size=26)
+        file1.putfile(bytes, 5)
+
+        with file1.getfile(read_ahead=2) as fp:
+            assert fp.read(3) == b"abc"
+            assert [pos for pos, _ in fp.file._pending] == [1, 2]
+
+            assert fp.read(10) == b"defghijklm"
+            assert [pos for pos, _ in fp.file._pending] == [3, 4]
+
+            fp.seek(1)
+            assert [pos for pos, _ in fp.file._pending] == [1, 2]
+            assert fp.read() == b"bcdefghijklmnopqrstuvwxyz"
+
+    def test_read_ahead_max_bytes(self):
+        file1 = File.objects.create(name="baz.js", type="default", size=26)
+        file1.putfile(BytesIO(b"abcdefghijklmnopqrstuvwxyz"), 5)
+        indexes = FileBlobIndex.objects.filter(file=file1).select_related("blob").order_by("offset")
+
+        with ChunkedFileBlobIndexWrapper(indexes, read_ahead=4, read_ahead_max_bytes=12) as fp:
+            assert [pos for pos, _ in fp._pending] == [1, 2]
+            assert fp.read() == b"abcdefghijklmnopqrstuvwxyz"
+
     def test_multi_chunk_prefetch(self):
         random_data = os.urandom(1 << 25)
 
@@ -75,6 +75,27 @@ class ProjectOwnershipTestCase(TestCase):
             ([ActorTuple(self.team.id, Team), ActorTuple(self.user.id, User)], [rule_a, rule_b]),
         )
 
+    def test_get_owners_after_schema_change(self):
+        rule_a = Rule(Matcher("path", "*.py"), [Owner("team", self.team.slug)])
+        rule_b = Rule(Matcher("path", "*.py"), [Owner("user", self.user.email)])
+        data = {"stacktrace": {"frames": [{"filename": "foo.py"}]}}
+
+        ownership = ProjectOwnership.objects.create(
+            project_id=self.project.id, schema=dump_schema([rule_a]), fallthrough=True
+        )
+        self.assert_ownership_equals(
+            ProjectOwnership.get_owners(self.project.id, data),
+            ([ActorTuple(self.team.id, Team)], [rule_a]),
+        )
+
+        # The compiled schema of the previous revision is not reused.
+        ownership.schema = dump_schema([rule_b])
+        ownership.save()
+        self.assert_ownership_equals(
+            ProjectOwnership.get_owners(self.project.id, data),
+            ([ActorTuple(self.user.id, User)], [rule_b]),
+        )
+
     def test_get_owners_when_codeowners_exists_and_no_issueowners(self):
         # This case will never exist bc we create a ProjectOwnership record if none exists when creating a ProjectCodeOwner record.
         # We have this testcase for potential corrupt data.
@@ -0,0 +1,95 @@
+import random
+
+import pytest
+
+from sentry.ownership.grammar import CompiledSchema, Matcher, Owner, Rule
+from sentry.testutils.skips import requires_benchmark
+
+RULE_COUNT = 5000
+
+
+def generate_rules(count):
+    # A CODEOWNERS file for a large monorepo: mostly directories owned by
+    # teams, some file types and a few catch-all patterns.
+    rng = random.Random(0)
+    owner = [Owner("team", "owners")]
+    rules = [
+        Rule(Matcher("codeowners", "*"), owner),
+        Rule(Matcher("codeowners", "*.md"), owner),
+        Rule(Matcher("codeowners", "**/migrations/"), owner),
+    ]
+    while len(rules) < count:
+        kind = rng.random()
+        service = f"services/service{rng.randrange(500)}"
+        module = f"module{rng.randrange(20)}"
+        if kind < 0.5:
+            pattern = f"/{service}/{module}/"
+        elif kind < 0.7:
+            pattern = f"/{service}/{module}/*.py"
+        elif kind < 0.85:
+            pattern = f"{service}/**/handlers/"
+        elif kind < 0.95:
+            pattern = f"file{rng.randrange(1000)}.py"
+        else:
+            pattern = f"*.ext{rng.randrange(50)}"
+        rules.append(Rule(Matcher("codeowners", pattern), owner))
+    return rules
+
+
+def generate_events(count):
+    rng = random.Random(1)
+    events = []
+    for _ in range(count):
+        frames = []
+        for _ in range(20):
+            service = f"services/service{rng.randrange(500)}"
+            module = f"module{rng.randrange(20)}"
+            frames.append(
+                {
+                    "filename": f"{service}/{module}/file{rng.randrange(1000)}.py",
+                    "abs_path": f"/srv/app/{service}/{module}/file{rng.randrange(1000)}.py",
+                }
+            )
+        events.append({"stacktrace": {"frames": frames}})
+    return events
+
+
+@pytest.fixture(scope="module")
+def rules():
+    return generate_rules(RULE_COUNT)
+
+
+@pytest.fixture(scope="module")
+def events():
+    return generate_events(20)
+
+
+def match_naive(rules, events):
+    return [[rule for rule in rules if rule.test(event)] for event in events]
+
+
+def match_compiled(compiled, events):
+    return [compiled.matching_rules(event) for event in events]
+
+
+def test_compiled_matches_naive(rules, events):
+    assert match_compiled(CompiledSchema(rules), events) == match_naive(rules, events)
+
+
+@requires_benchmark
+def test_benchmark_codeowners_naive(rules, events, benchmark):
+    benchmark.extra_info["rules"] = len(rules)
+    benchmark.pedantic(match_naive, args=(rules, events), rounds=3)
+
+
+@requires_benchmark
+def test_benchmark_codeowners_compiled(rules, events, benchmark):
+    benchmark.extra_info["rules"] = len(rules)
+    compiled = CompiledSchema(rules)
+    benchmark(match_compiled, compiled, events)
+
+
+@requires_benchmark
+def test_benchmark_codeowners_compile(rules, benchmark):
+    benchmark.extra_info["rules"] = len(rules)
+    benchmark(CompiledSchema, rules)
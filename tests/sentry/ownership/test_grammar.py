@@ -1,6 +1,7 @@
 import pytest
 
 from sentry.ownership.grammar import (
+    CompiledSchema,
     Matcher,
     Owner,
     Rule,
@@ -214,6 +215,8 @@ def _assert_matcher(matcher: Matcher, path_details, expected):
     """Helper function to reduce repeated code"""
     frames = {"stacktrace": {"frames": path_details}}
     assert matcher.test(frames) == expected
+    rule = Rule(matcher, [])
+    assert CompiledSchema([rule]).matching_rules(frames) == ([rule] if expected else [])
 
 
 @pytest.mark.parametrize(
@@ -560,6 +563,34 @@ def test_codeowners_match_fowardslash(path_details, expected):
     _assert_matcher(Matcher("codeowners", "/"), path_details, expected)
 
 
+def test_compiled_schema_matching_rules():
+    rules = [
+        Rule(Matcher("codeowners", "*.py"), [Owner("team", "python")]),
+        Rule(Matcher("path", "src/*"), [Owner("team", "issueowners")]),
+        Rule(Matcher("codeowners", "/usr/local/src/foo/"), [Owner("team", "foo")]),
+        Rule(Matcher("codeowners", "test.py"), [Owner("team", "tests")]),
+        Rule(Matcher("codeowners", "/usr/local/src/bar/"), [Owner("team", "bar")]),
+        Rule(Matcher("codeowners", "docs/"), [Owner("team", "docs")]),
+        Rule(Matcher("tags.foo", "bar"), [Owner("team", "tags")]),
+        Rule(Matcher("codeowners", "*.py"), [Owner("team", "python2")]),
+    ]
+    data = {
+        "stacktrace": {
+            "frames": [
+                {"filename": "src/test.py", "abs_path": "/usr/local/src/bar/test.py"},
+                {"abs_path": "/usr/local/src/foo/main.py"},
+            ]
+        },
+        "tags": [("foo", "baz")],
+    }
+    compiled = CompiledSchema(rules)
+
+    assert len(compiled) == len(rules)
+    assert compiled.matching_rules(data) == [rule for rule in rules if rule.test(data)]
+    assert compiled.matching_rules(data) == [rules[0], rules[1], rules[2], rules[3], rules[7]]
+    assert compiled.matching_rules({}) == []
+
+
 def test_parse_code_owners():
     assert parse_code_owners(codeowners_fixture_data) == (
         ["@getsentry/frontend", "@getsentry/docs", "@getsentry/ecosystem"],
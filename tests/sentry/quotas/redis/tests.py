@@ -198,6 +198,39 @@ class RedisQuotaTest(TestCase):
         # count for these quotas and None for the others.
         assert usage == [n if q.id else None for q in quotas] + [0, 0]
 
+    def test_get_usage_many(self):
+        timestamp = time.time()
+
+        self.get_project_quota.return_value = (200, 60)
+        self.get_organization_quota.return_value = (300, 60)
+
+        other_project = self.create_project(organization=self.create_organization())
+
+        for _ in range(3):
+            self.quota.is_rate_limited(self.project, timestamp=timestamp)
+        for _ in range(5):
+            self.quota.is_rate_limited(other_project, timestamp=timestamp)
+        self.quota.refund(other_project, timestamp=timestamp)
+
+        quotas = self.quota.get_quotas(self.project)
+        other_quotas = self.quota.get_quotas(other_project) + [
+            QuotaConfig(limit=0, reason_code="disabled"),
+        ]
+
+        usage = self.quota.get_usage_many(
+            [
+                (self.project.organization_id, quotas),
+                (other_project.organization_id, other_quotas),
+                (self.project.organization_id, []),
+            ],
+            timestamp=timestamp,
+        )
+
+        assert usage == [[3, 3], [4, 4, None], []]
+        assert usage[0] == self.quota.get_usage(
+            self.project.organization_id, quotas, timestamp=timestamp
+        )
+
     @mock.patch.object(RedisQuota, "get_quotas")
     def test_refund_defaults(self, mock_get_quotas):
         timestamp = time.time()
@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from sentry.quotas.base import QuotaConfig, QuotaScope
+from sentry.quotas.redis import RedisQuota
+from sentry.testutils.skips import requires_benchmark
+
+TIMESTAMP = time.time()
+
+
+def make_requests(count):
+    return [
+        (
+            organization_id,
+            [
+                QuotaConfig(
+                    id="p",
+                    scope=QuotaScope.PROJECT,
+                    scope_id=organization_id * 10,
+                    limit=200,
+                    window=60,
+                    reason_code="project_quota",
+                ),
+                QuotaConfig(id="o", limit=300, window=60, reason_code="org_quota"),
+                QuotaConfig(id="d", limit=10000, window=86400, reason_code="daily_quota"),
+            ],
+        )
+        for organization_id in range(1, count + 1)
+    ]
+
+
+@pytest.fixture
+def quota():
+    return RedisQuota()
+
+
+@requires_benchmark
+@pytest.mark.parametrize("count", [10, 100, 1000])
+def test_benchmark_get_usage(quota, count, benchmark):
+    requests = make_requests(count)
+
+    benchmark(
+        lambda: [
+            quota.get_usage(organization_id, quotas, timestamp=TIMESTAMP)
+            for organization_id, quotas in requests
+        ]
+    )
+
+
+@requires_benchmark
+@pytest.mark.parametrize("count", [10, 100, 1000])
+def test_benchmark_get_usage_many(quota, count, benchmark):
+    requests = make_requests(count)
+
+    benchmark(lambda: quota.get_usage_many(requests, timestamp=TIMESTAMP))
@@ -1,5 +1,10 @@
+import time
+from unittest import mock
+
+from sentry.ratelimits.base import RateLimitCheck
 from sentry.ratelimits.redis import RedisRateLimiter
 from sentry.testutils import TestCase
+from sentry.utils.hashlib import md5_text
 
 
 class RedisRateLimiterTest(TestCase):
@@ -13,3 +18,101 @@ class RedisRateLimiterTest(TestCase):
     def test_simple_key(self):
         assert not self.backend.is_limited("foo", 1)
         assert self.backend.is_limited("foo", 1)
+
+    def test_check_many(self):
+        checks = [RateLimitCheck("foo", 2), RateLimitCheck("bar", 1, window=10)]
+
+        now = time.time()
+        results = self.backend.check_many(checks)
+        assert [r.is_limited for r in results] == [False, False]
+        assert [r.remaining for r in results] == [1, 0]
+        assert now < results[1].reset_time <= now + 20
+
+        # "bar" is exhausted, so nothing is consumed from "foo" either.
+        results = self.backend.check_many(checks)
+        assert [r.is_limited for r in results] == [False, True]
+        assert [r.remaining for r in results] == [1, 0]
+
+        assert not self.backend.is_limited("foo", 2)
+        assert self.backend.is_limited("foo", 2)
+
+    def test_zero_limit(self):
+        result = self.backend.check_many([RateLimitCheck("foo", 0)])[0]
+        assert result.is_limited
+        assert result.remaining == 0
+
+
+class AlgorithmsTest(TestCase):
+    def test_fixed_window(self):
+        backend = RedisRateLimiter(algorithm="fixed-window")
+        window_start = 1634567880.0
+
+        with mock.patch("sentry.ratelimits.redis.time", return_value=window_start + 59):
+            assert not backend.is_limited("foo", 1)
+            assert backend.is_limited("foo", 1)
+
+        # The next window starts from scratch.
+        with mock.patch("sentry.ratelimits.redis.time", return_value=window_start + 61):
+            assert not backend.is_limited("foo", 1)
+
+    def test_fixed_window_key_layout(self):
+        backend = RedisRateLimiter()
+        window_start = 1634567880.0
+
+        with mock.patch("sentry.ratelimits.redis.time", return_value=window_start + 59):
+            assert not backend.is_limited("foo", 1, self.project)
+
+        # Counters are kept where they were before other algorithms existed.
+        key = f"rl:{md5_text('foo').hexdigest()}:{self.project.id}:{int(window_start / 60)}"
+        with backend.cluster.map() as client:
+            result = client.get(key)
+        assert result.value == b"1"
+
+    def test_algorithm_per_check(self):
+        backend = RedisRateLimiter()
+        window_start = 1634567880.0
+
+        def is_limited(key, algorithm=None):
+            check = RateLimitCheck(key, 2, algorithm=algorithm)
+            return backend.check_many([check])[0].is_limited
+
+        with mock.patch("sentry.ratelimits.redis.time", return_value=window_start + 59):
+            for _ in range(2):
+                assert not is_limited("foo", algorithm="sliding-window")
+                assert not is_limited("bar")
+
+        with mock.patch("sentry.ratelimits.redis.time", return_value=window_start + 61):
+            assert is_limited("foo", algorithm="sliding-window")
+            assert not is_limited("bar")
+
+    def test_sliding_window(self):
+        backend = RedisRateLimiter(algorithm="sliding-window")
+        window_start = 1634567880.0
+
+        with mock.patch("sentry.ratelimits.redis.time", return_value=window_start + 59):
+            assert not backend.is_limited("foo", 2)
+            assert not backend.is_limited("foo", 2)
+
+        # Most of the previous window still overlaps.
+        with mock.patch("sentry.ratelimits.redis.time", return_value=window_start + 61):
+            assert backend.is_limited("foo", 2)
+
+        with mock.patch("sentry.ratelimits.redis.time", return_value=window_start + 100):
+            assert not backend.is_limited("foo", 2)
+
+    def test_token_bucket(self):
+        backend = RedisRateLimiter(algorithm="token-bucket")
+        now = 1634567880.0
+
+        with mock.patch("sentry.ratelimits.redis.time", return_value=now):
+            assert not backend.is_limited("foo", 2)
+            assert not backend.is_limited("foo", 2)
+            assert backend.is_limited("foo", 2)
+
+        # One token is refilled every 30 seconds.
+        with mock.patch("sentry.ratelimits.redis.time", return_value=now + 30):
+            result = backend.check_many([RateLimitCheck("foo", 2)])[0]
+            assert not result.is_limited
+            assert result.remaining == 0
+            assert result.reset_time == now + 90
+            assert backend.is_limited("foo", 2)
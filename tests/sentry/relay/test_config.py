@@ -1,7 +1,11 @@
 import pytest
 
 from sentry.models import ProjectKey
-from sentry.relay.config import get_project_config
+from sentry.relay.config import (
+    get_project_config,
+    get_project_configs,
+    restrict_project_config_to_key,
+)
 from sentry.testutils.helpers import Feature
 from sentry.utils.safe import get_path
 
@@ -119,3 +123,42 @@ def test_project_config_with_span_attributes(default_project, insta_snapshot):
 
     cfg = cfg.to_dict()
     insta_snapshot(cfg["config"]["spanAttributes"])
+
+
+def _strip_volatile(cfg):
+    cfg = cfg.to_dict()
+    for key in ("lastChange", "lastFetch", "rev"):
+        cfg.pop(key, None)
+    return cfg
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("full", [False, True], ids=["slim_config", "full_config"])
+def test_get_project_configs(default_project, factories, full):
+    other_project = factories.create_project(organization=default_project.organization)
+    other_project.update_option("sentry:relay_pii_config", PII_CONFIG)
+    projects = [default_project, other_project]
+    project_keys = {
+        project.id: list(ProjectKey.objects.filter(project=project)) for project in projects
+    }
+
+    with Feature({"organizations:filters-and-sampling": True}):
+        configs = get_project_configs(projects, full_config=full, project_keys=project_keys)
+        for project in projects:
+            expected = get_project_config(
+                project, full_config=full, project_keys=project_keys[project.id]
+            )
+            assert _strip_volatile(configs[project.id]) == _strip_volatile(expected)
+
+
+@pytest.mark.django_db
+def test_restrict_project_config_to_key(default_project, default_projectkey):
+    other_key = ProjectKey.objects.create(project=default_project)
+    project_config = get_project_config(
+        default_project, project_keys=[default_projectkey, other_key]
+    )
+
+    cfg = restrict_project_config_to_key(default_project, project_config, other_key)
+    expected = get_project_config(default_project, project_keys=[other_key])
+    assert _strip_volatile(cfg) == _strip_volatile(expected)
+    assert [key["publicKey"] for key in cfg.to_dict()["publicKeys"]] == [other_key.public_key]
@@ -12,7 +12,7 @@ from sentry.notifications.types import ActionTargetType
 from sentry.rules import init_registry
 from sentry.rules.conditions import EventCondition
 from sentry.rules.filters.base import EventFilter
-from sentry.rules.processor import RuleProcessor
+from sentry.rules.processor import RuleProcessor, RuleSnapshot, bulk_get_rule_status
 from sentry.testutils import TestCase
 
 EMAIL_ACTION_DATA = {
@@ -161,6 +161,68 @@ class RuleProcessorTest(TestCase):
             # creates no rows.
             self.run_query_test(rp, 2)
 
+    def test_bulk_get_rule_status_many_groups(self):
+        rule_2 = Rule.objects.create(
+            project=self.event.project,
+            data={"conditions": [EVERY_EVENT_COND_DATA], "actions": [EMAIL_ACTION_DATA]},
+        )
+        other_group = self.create_group(project=self.project)
+        GroupRuleStatus.objects.create(rule=self.rule, group=other_group, project=self.project)
+        group_rules = [
+            (self.event.group, [self.rule, rule_2]),
+            (other_group, [self.rule, rule_2]),
+        ]
+
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            statuses = bulk_get_rule_status(group_rules)
+        # One query to fetch, one to create and one to fetch the created statuses.
+        assert len(queries.captured_queries) == 3
+
+        assert set(statuses) == {
+            (group.id, rule.id)
+            for group in (self.event.group, other_group)
+            for rule in (self.rule, rule_2)
+        }
+        for (group_id, rule_id), status in statuses.items():
+            assert (status.group_id, status.rule_id) == (group_id, rule_id)
+        assert (
+            GroupRuleStatus.objects.filter(group__in=[self.event.group, other_group]).count() == 4
+        )
+
+        # Everything is cached now.
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            assert bulk_get_rule_status(group_rules) == statuses
+        assert len(queries.captured_queries) == 0
+
+    def test_snapshot(self):
+        snapshot = RuleSnapshot.for_groups([self.event.group])
+        assert snapshot.get_rules(self.project.id) == [self.rule]
+
+        rp = RuleProcessor(
+            self.event,
+            is_new=True,
+            is_regression=True,
+            is_new_group_environment=True,
+            has_reappeared=True,
+            snapshot=snapshot,
+        )
+        cache.clear()
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            results = list(rp.apply())
+        assert len(results) == 1
+        assert not [
+            q
+            for q in queries.captured_queries
+            if "grouprulestatus" in str(q) and "UPDATE" not in str(q)
+        ]
+
+        # The shared status is updated, so the rule doesn't fire again for the
+        # next event of the group in the batch.
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as queries:
+            results = list(rp.apply())
+        assert len(results) == 0
+        assert not [q for q in queries.captured_queries if "grouprulestatus" in str(q)]
+
     @patch(
         "sentry.constants._SENTRY_RULES",
         [
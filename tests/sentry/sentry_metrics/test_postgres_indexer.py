@@ -1,3 +1,6 @@
+from time import time
+from unittest.mock import patch
+
 from sentry.sentry_metrics.indexer.models import MetricsKeyIndexer
 from sentry.sentry_metrics.indexer.postgres import PGStringIndexer
 from sentry.testutils.cases import TestCase
@@ -23,3 +26,37 @@ class PostgresIndexerTest(TestCase):
         # test invalid values
         assert PGStringIndexer().resolve("beep") is None
         assert PGStringIndexer().reverse_resolve(1234) is None
+
+    def test_local_cache(self):
+        indexer = PGStringIndexer(local_cache_size=10)
+        results = indexer.bulk_record(strings=["hello", "hey"])
+
+        with self.assertNumQueries(0):
+            assert indexer.bulk_record(strings=["hello", "hey"]) == results
+            assert indexer.resolve("hello") == results["hello"]
+            assert indexer.reverse_resolve(results["hey"]) == "hey"
+
+        # strings recorded in this process replace negative entries
+        assert indexer.resolve("hi") is None
+        hi = indexer.record("hi")
+        assert indexer.resolve("hi") == hi
+
+    @patch("sentry.sentry_metrics.indexer.postgres.metrics.incr")
+    def test_local_cache_disabled(self, mock_incr):
+        indexer = PGStringIndexer(local_cache_size=0)
+        hello = indexer.record("hello")
+        assert indexer.resolve("hello") == hello
+        assert indexer.resolve("hi") is None
+        assert not mock_incr.called
+
+    def test_local_cache_negative_entries_expire(self):
+        indexer = PGStringIndexer(local_cache_size=10, local_cache_negative_ttl=60)
+        assert indexer.resolve("hello") is None
+        assert indexer.reverse_resolve(1234) is None
+
+        # recorded by another process
+        hello = PGStringIndexer().record("hello")
+        assert indexer.resolve("hello") is None
+
+        with patch("sentry.sentry_metrics.indexer.postgres.time.time", return_value=time() + 61):
+            assert indexer.resolve("hello") == hello
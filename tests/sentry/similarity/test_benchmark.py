@@ -0,0 +1,46 @@
+import pytest
+
+from sentry.interfaces.stacktrace import Frame
+from sentry.similarity import features, text_shingle
+from sentry.similarity.signatures import MinHashSignatureBuilder, SlicedMinHashSignatureBuilder
+from sentry.testutils.skips import requires_benchmark
+from sentry.utils.iterators import shingle
+
+MESSAGE = (
+    "OperationalError: could not connect to server: Connection refused\n"
+    '\tIs the server running on host "db.internal" (10.0.0.12) and accepting\n'
+    "\tTCP/IP connections on port 5432?"
+)
+
+FRAMES = [
+    Frame.to_python(
+        {
+            "function": f"handle_{i}",
+            "module": f"myapp.services.module_{i % 7}",
+            "filename": f"myapp/services/module_{i % 7}.py",
+            "in_app": i % 3 != 0,
+        }
+    )
+    for i in range(40)
+]
+
+# Encoded features as the similarity feature set indexes them.
+FEATURES = {
+    "exception:message:character-shingles": [
+        features.encoder.dumps(value) for value in text_shingle(5, MESSAGE)
+    ],
+    "exception:stacktrace:pairs": [features.encoder.dumps(value) for value in shingle(2, FRAMES)],
+    "message:message:character-shingles": [
+        features.encoder.dumps(value) for value in text_shingle(5, "Payment failed for order")
+    ],
+}
+
+
+@requires_benchmark
+@pytest.mark.parametrize("builder", [MinHashSignatureBuilder, SlicedMinHashSignatureBuilder])
+@pytest.mark.parametrize("label", list(FEATURES))
+def test_benchmark_signature(label, builder, benchmark):
+    # The parameters used by the similarity index.
+    get_signature = builder(16, 0xFFFF)
+    benchmark.extra_info["features"] = len(FEATURES[label])
+    benchmark(get_signature, FEATURES[label])
@@ -1,14 +1,17 @@
 from collections import Counter
 from unittest import TestCase
 
-from sentry.similarity.signatures import MinHashSignatureBuilder
+from sentry.similarity.signatures import MinHashSignatureBuilder, SlicedMinHashSignatureBuilder
 
 
 class MinHashSignatureBuilderTestCase(TestCase):
+    builder = MinHashSignatureBuilder
+    stable_signature = [24146, 35463, 32982, 5089]
+
     def test_signatures(self):
         n = 32
         r = 0xFFFF
-        get_signature = MinHashSignatureBuilder(n, r)
+        get_signature = self.builder(n, r)
         assert get_signature({"foo", "bar", "baz"}) == get_signature({"foo", "bar", "baz"})
 
         assert len(get_signature("hello world")) == n
@@ -28,3 +31,18 @@ class MinHashSignatureBuilderTestCase(TestCase):
         self.assertAlmostEqual(
             similarity, estimation, delta=0.1  # totally made up constant, seems reasonable
         )
+
+    def test_stable_signatures(self):
+        # Signatures must not change, or existing indexes become useless.
+        get_signature = self.builder(4, 0xFFFF)
+        assert get_signature([b"foo", b"bar", b"baz"]) == self.stable_signature
+
+
+class SlicedMinHashSignatureBuilderTestCase(MinHashSignatureBuilderTestCase):
+    builder = SlicedMinHashSignatureBuilder
+    stable_signature = [17761, 501, 7101, 29471]
+
+    def test_partial_digest(self):
+        # Columns beyond a multiple of eight come from a truncated digest.
+        features = [b"foo", b"bar", b"baz"]
+        assert self.builder(12, 0xFFFF)(features) == self.builder(16, 0xFFFF)(features)[:12]
@@ -1,3 +1,4 @@
+import threading
 import unittest
 from copy import deepcopy
 from datetime import timedelta
@@ -12,8 +13,11 @@ from sentry.snuba.models import QueryDatasets, QuerySubscription
 from sentry.snuba.query_subscription_consumer import (
     InvalidMessageError,
     InvalidSchemaError,
+    PartitionWorkerPool,
     QuerySubscriptionConsumer,
     register_subscriber,
+    register_subscriber_prefetch,
+    subscriber_prefetch_registry,
     subscriber_registry,
 )
 from sentry.snuba.subscriptions import create_snuba_query, create_snuba_subscription
@@ -114,6 +118,79 @@ class HandleMessageTest(BaseQuerySubscriptionTest, TestCase):
         mock_callback.assert_called_once_with(data["payload"], sub)
 
 
+class PrefetchSubscriptionsTest(BaseQuerySubscriptionTest, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.orig_prefetch_registry = deepcopy(subscriber_prefetch_registry)
+
+    def tearDown(self):
+        super().tearDown()
+        subscriber_prefetch_registry.clear()
+        subscriber_prefetch_registry.update(self.orig_prefetch_registry)
+
+    def build_mock_message(self, data, topic=None):
+        message = super().build_mock_message(data, topic)
+        message.error.return_value = None
+        return message
+
+    def test_prefetch(self):
+        registration_key = "registered_prefetch_test"
+        mock_callback = mock.Mock()
+        mock_prefetch = mock.Mock()
+        register_subscriber(registration_key)(mock_callback)
+        register_subscriber_prefetch(registration_key)(mock_prefetch)
+        with self.tasks():
+            snuba_query = create_snuba_query(
+                QueryDatasets.EVENTS,
+                "hello",
+                "count()",
+                timedelta(minutes=10),
+                timedelta(minutes=1),
+                None,
+            )
+            sub = create_snuba_subscription(self.project, registration_key, snuba_query)
+        sub.refresh_from_db()
+
+        data = self.valid_wrapper
+        data["payload"]["subscription_id"] = sub.subscription_id
+        messages = [
+            self.build_mock_message(data),
+            self.build_mock_message(data),
+            self.build_mock_message({"invalid": "message"}),
+        ]
+        with self.assertNumQueries(1):
+            payloads = self.consumer.prefetch_subscriptions(messages)
+        mock_prefetch.assert_called_once_with([sub])
+        assert [p and p["subscription_id"] for p in payloads] == [
+            sub.subscription_id,
+            sub.subscription_id,
+            None,
+        ]
+
+        # Messages are not parsed again.
+        get_from_cache = mock.patch.object(QuerySubscription.objects, "get_from_cache")
+        parse = mock.patch.object(self.consumer, "parse_message_value")
+        with get_from_cache as mock_get_from_cache, parse as mock_parse, self.assertNumQueries(0):
+            for message, contents in zip(messages[:2], payloads[:2]):
+                self.consumer.handle_message(message, contents)
+        assert not mock_get_from_cache.called
+        assert not mock_parse.called
+        assert mock_callback.call_count == 2
+
+        # Already cached subscriptions are not fetched again.
+        mock_prefetch.reset_mock()
+        with self.assertNumQueries(0):
+            self.consumer.prefetch_subscriptions(messages)
+        mock_prefetch.assert_called_once_with([sub])
+
+        # Saving the subscription drops it from the cache.
+        sub.update(status=QuerySubscription.Status.DISABLED.value)
+        mock_callback.reset_mock()
+        self.consumer.prefetch_subscriptions(messages)
+        self.consumer.handle_message(messages[0])
+        assert not mock_callback.called
+
+
 class ParseMessageValueTest(BaseQuerySubscriptionTest, unittest.TestCase):
     def run_test(self, message):
         self.consumer.parse_message_value(json.dumps(message))
@@ -186,3 +263,107 @@ class RegisterSubscriberTest(unittest.TestCase):
         with self.assertRaises(Exception) as cm:
             register_subscriber("hello")(other_callback)
         assert str(cm.exception) == "Handler already registered for hello"
+
+
+class CommitOffsetsTest(BaseQuerySubscriptionTest, TestCase):
+    metrics = patcher("sentry.snuba.query_subscription_consumer.metrics")
+
+    def test_partition_lag(self):
+        consumer = self.consumer
+        consumer.consumer = mock.Mock()
+        consumer.consumer.get_watermark_offsets.side_effect = [(0, 15), None]
+        consumer.offsets = {0: 10, 1: 5, 2: None}
+
+        consumer.commit_offsets()
+
+        committed = consumer.consumer.commit.call_args[1]["offsets"]
+        assert [(tp.partition, tp.offset) for tp in committed] == [(0, 10), (1, 5)]
+        self.metrics.gauge.assert_called_once_with(
+            "snuba_query_subscriber.partition_lag", 5, tags={"partition": "0"}
+        )
+
+    @mock.patch("sentry.snuba.query_subscription_consumer.close_old_connections")
+    def test_process_pooled_message(self, close_old_connections):
+        calls = []
+        close_old_connections.side_effect = lambda: calls.append("close")
+        with mock.patch.object(
+            self.consumer, "handle_message", side_effect=lambda *args: calls.append("handle")
+        ):
+            self.consumer.process_pooled_message(mock.Mock())
+        assert calls == ["close", "handle", "close"]
+
+
+class PartitionWorkerPoolTest(unittest.TestCase):
+    def build_message(self, partition, offset):
+        message = mock.Mock()
+        message.partition.return_value = partition
+        message.offset.return_value = offset
+        return message
+
+    def test_order_within_partition(self):
+        processed = {}
+        completed = {}
+        lock = threading.Lock()
+
+        def process(message):
+            with lock:
+                processed.setdefault(message.partition(), []).append(message.offset())
+
+        def on_done(message):
+            completed[message.partition()] = message.offset() + 1
+
+        pool = PartitionWorkerPool(process, on_done, max_workers=4, max_pending=10)
+        for offset in range(100):
+            pool.submit(self.build_message(offset % 3, offset))
+        pool.wait()
+        pool.shutdown()
+
+        assert processed == {p: list(range(p, 100, 3)) for p in range(3)}
+        assert completed == {0: 100, 1: 98, 2: 99}
+        assert pool.pending == 0
+        assert pool.pending_by_partition() == {}
+
+    def test_slow_partition(self):
+        # A partition that is stuck doesn't hold up the others.
+        unblock = threading.Event()
+        completed = []
+
+        def process(message):
+            if message.partition() == 0:
+                unblock.wait()
+
+        pool = PartitionWorkerPool(process, completed.append, max_workers=2, max_pending=10)
+        blocked = self.build_message(0, 0)
+        pool.submit(blocked)
+        other = [self.build_message(1, offset) for offset in range(5)]
+        for message in other:
+            pool.submit(message)
+
+        pool.wait([1])
+        assert completed == other
+        assert pool.pending_by_partition() == {0: 1}
+
+        unblock.set()
+        pool.wait()
+        pool.shutdown()
+        assert completed == other + [blocked]
+
+    def test_error(self):
+        completed = []
+
+        def process(message):
+            if message.offset() == 1:
+                raise ValueError("bad message")
+
+        pool = PartitionWorkerPool(process, completed.append, max_workers=1, max_pending=10)
+        messages = [self.build_message(0, offset) for offset in range(3)]
+        with self.assertRaises(ValueError):
+            for message in messages:
+                pool.submit(message)
+            pool.wait()
+        pool.shutdown()
+
+        # Nothing after the failed message is processed.
+        assert completed == messages[:1]
+        with self.assertRaises(ValueError):
+            pool.raise_for_error()
@@ -0,0 +1,84 @@
+from unittest import mock
+
+from sentry.incidents.models import AlertRule
+from sentry.snuba.models import QuerySubscription
+from sentry.snuba.subscription_cache import (
+    SubscriptionMetadataCache,
+    invalidate_subscription_metadata,
+)
+from sentry.testutils import TestCase
+
+
+class SubscriptionMetadataCacheTest(TestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = self.create_cache()
+        self.cache.refresh_version()
+
+    def create_cache(self, models=("sentry.QuerySubscription",)):
+        return SubscriptionMetadataCache("test", models=models, ttl=60, max_size=10)
+
+    def test_get_many(self):
+        self.cache.set_many({"a": 1, "b": 2})
+        assert self.cache.get_many(["a", "c"]) == {"a": 1}
+        assert self.cache.get("b") == 2
+        assert self.cache.get("c") is None
+        assert self.cache.missing(["a", "b", "c"]) == {"c"}
+
+    @mock.patch("sentry.snuba.subscription_cache.time")
+    def test_ttl(self, mock_time):
+        mock_time.time.return_value = 1000
+        self.cache.set_many({"a": 1})
+        mock_time.time.return_value = 1060
+        assert self.cache.get("a") == 1
+        mock_time.time.return_value = 1061
+        assert self.cache.missing(["a"]) == {"a"}
+        assert self.cache.get("a") is None
+        assert len(self.cache) == 0
+
+    @mock.patch("sentry.utils.metrics.timing")
+    @mock.patch("sentry.utils.metrics.incr")
+    @mock.patch("sentry.snuba.subscription_cache.time")
+    def test_metrics(self, mock_time, mock_incr, mock_timing):
+        mock_time.time.return_value = 1000
+        self.cache.set_many({"a": 1})
+        mock_time.time.return_value = 1010
+        self.cache.get_many(["a", "b", "c"])
+        mock_incr.assert_has_calls(
+            [mock.call("test.hit", amount=1), mock.call("test.miss", amount=2)]
+        )
+        mock_timing.assert_called_once_with("test.staleness", 10)
+
+    def test_invalidate(self):
+        other = self.create_cache()
+        other.refresh_version()
+        unrelated = self.create_cache(models=["sentry.AlertRule"])
+        unrelated.refresh_version()
+        self.cache.set_many({"a": 1})
+        other.set_many({"a": 1})
+        unrelated.set_many({"a": 1})
+
+        invalidate_subscription_metadata(sender=QuerySubscription)
+        # Caches in this process are cleared right away.
+        assert self.cache.get("a") is None
+        # Caches of other models are left alone.
+        unrelated.refresh_version()
+        assert unrelated.get("a") == 1
+
+        other.set_many({"a": 1})
+        other.refresh_version()
+        # The version changed since the last refresh, as it would have if the model
+        # had been saved by another process.
+        assert other.get("a") is None
+
+        other.set_many({"a": 1})
+        other.refresh_version()
+        assert other.get("a") == 1
+
+        invalidate_subscription_metadata(sender=AlertRule)
+        assert other.get("a") == 1
+
+    def test_model_signals(self):
+        self.cache.set_many({"a": 1})
+        self.create_alert_rule()
+        assert self.cache.get("a") is None
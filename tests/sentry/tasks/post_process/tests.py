@@ -1,6 +1,8 @@
 from datetime import timedelta
 from unittest.mock import ANY, Mock, patch
 
+import pytest
+from celery.exceptions import SoftTimeLimitExceeded
 from django.utils import timezone
 
 from sentry.eventstore.processing import event_processing_store
@@ -18,7 +20,7 @@ from sentry.models import (
 )
 from sentry.ownership.grammar import Matcher, Owner, Rule, dump_schema
 from sentry.tasks.merge import merge_groups
-from sentry.tasks.post_process import post_process_group
+from sentry.tasks.post_process import post_process_group, post_process_group_batch
 from sentry.testutils import TestCase
 from sentry.testutils.helpers import with_feature
 from sentry.testutils.helpers.datetime import before_now, iso_format
@@ -538,6 +540,142 @@ class PostProcessGroupTest(TestCase):
             )
 
 
+class PostProcessGroupBatchTest(TestCase):
+    @patch("sentry.rules.processor.RuleProcessor")
+    def test_batch(self, mock_processor):
+        event = self.store_event(
+            data={"message": "testing", "fingerprint": ["group-1"]}, project_id=self.project.id
+        )
+        other_event = self.store_event(
+            data={"message": "testing", "fingerprint": ["group-2"]}, project_id=self.project.id
+        )
+        mock_processor.return_value.apply.return_value = []
+
+        post_process_group_batch(
+            events=[
+                {
+                    "is_new": True,
+                    "is_regression": False,
+                    "is_new_group_environment": True,
+                    "cache_key": write_event_to_cache(event),
+                    "group_id": event.group_id,
+                },
+                {
+                    "is_new": False,
+                    "is_regression": False,
+                    "is_new_group_environment": False,
+                    "cache_key": "total-rubbish",
+                    "group_id": event.group_id,
+                },
+                {
+                    "is_new": True,
+                    "is_regression": False,
+                    "is_new_group_environment": True,
+                    "cache_key": write_event_to_cache(other_event),
+                    "group_id": other_event.group_id,
+                },
+            ]
+        )
+
+        assert mock_processor.call_count == 2
+        for (args, kwargs), expected in zip(mock_processor.call_args_list, [event, other_event]):
+            assert args == (EventMatcher(expected), True, False, True, False)
+            rules = kwargs["snapshot"].get_rules(self.project.id)
+            assert rules is not None
+            assert kwargs["snapshot"].get_rule_statuses(expected.group_id, rules) is not None
+
+    @patch("sentry.rules.processor.RuleProcessor")
+    def test_batch_continues_after_failure(self, mock_processor):
+        event = self.store_event(
+            data={"message": "testing", "fingerprint": ["group-1"]}, project_id=self.project.id
+        )
+        other_event = self.store_event(
+            data={"message": "testing", "fingerprint": ["group-2"]}, project_id=self.project.id
+        )
+        mock_processor.return_value.apply.side_effect = [Exception("boom"), []]
+        cache_keys = [write_event_to_cache(event), write_event_to_cache(other_event)]
+
+        post_process_group_batch(
+            events=[
+                {
+                    "is_new": True,
+                    "is_regression": False,
+                    "is_new_group_environment": True,
+                    "cache_key": cache_key,
+                    "group_id": e.group_id,
+                }
+                for cache_key, e in zip(cache_keys, [event, other_event])
+            ]
+        )
+
+        assert mock_processor.return_value.apply.call_count == 2
+        assert event_processing_store.get(cache_keys[0]) is not None
+        assert event_processing_store.get(cache_keys[1]) is None
+
+    def make_batch(self, *events):
+        return [
+            {
+                "is_new": True,
+                "is_regression": False,
+                "is_new_group_environment": True,
+                "cache_key": write_event_to_cache(event),
+                "group_id": event.group_id,
+            }
+            for event in events
+        ]
+
+    @patch("sentry.rules.processor.RuleProcessor")
+    def test_batch_repeated_cache_key(self, mock_processor):
+        event = self.store_event(data={"message": "testing"}, project_id=self.project.id)
+        mock_processor.return_value.apply.return_value = []
+
+        post_process_group_batch(events=self.make_batch(event) * 2)
+
+        assert mock_processor.return_value.apply.call_count == 1
+
+    @patch("sentry.tasks.post_process.PostProcessSnapshot.prefetch")
+    @patch("sentry.rules.processor.RuleProcessor")
+    def test_batch_prefetch_failure(self, mock_processor, mock_prefetch):
+        event = self.store_event(
+            data={"message": "testing", "fingerprint": ["group-1"]}, project_id=self.project.id
+        )
+        other_event = self.store_event(
+            data={"message": "testing", "fingerprint": ["group-2"]}, project_id=self.project.id
+        )
+        mock_processor.return_value.apply.return_value = []
+        mock_prefetch.side_effect = Exception("boom")
+        events = self.make_batch(event, other_event)
+
+        post_process_group_batch(events=events)
+
+        assert mock_processor.return_value.apply.call_count == 2
+        for (args, kwargs), expected in zip(mock_processor.call_args_list, [event, other_event]):
+            assert args == (EventMatcher(expected), True, False, True, False)
+            assert kwargs.get("snapshot") is None
+        for task_kwargs in events:
+            assert event_processing_store.get(task_kwargs["cache_key"]) is None
+
+    @patch("sentry.rules.processor.RuleProcessor")
+    def test_batch_soft_time_limit(self, mock_processor):
+        event = self.store_event(data={"message": "testing"}, project_id=self.project.id)
+        mock_processor.return_value.apply.side_effect = SoftTimeLimitExceeded()
+
+        with pytest.raises(SoftTimeLimitExceeded):
+            post_process_group_batch(events=self.make_batch(event))
+
+    @patch("sentry.tasks.post_process.BATCH_TIME_BUDGET", -1)
+    @patch("sentry.tasks.post_process.post_process_group_batch.delay")
+    @patch("sentry.rules.processor.RuleProcessor")
+    def test_batch_time_budget(self, mock_processor, mock_delay):
+        event = self.store_event(data={"message": "testing"}, project_id=self.project.id)
+        events = self.make_batch(event)
+
+        post_process_group_batch(events=events)
+
+        assert not mock_processor.called
+        mock_delay.assert_called_once_with(events=events)
+
+
 class PostProcessGroupAssignmentTest(TestCase):
     def make_ownership(self, extra_rules=None):
         self.user_2 = self.create_user()
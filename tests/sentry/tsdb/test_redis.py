@@ -1,5 +1,7 @@
+import time
 from contextlib import contextmanager
 from datetime import datetime, timedelta
+from unittest import mock
 
 import pytest
 import pytz
@@ -179,6 +181,85 @@ class RedisTSDBTest(TestCase):
         results = self.db.get_sums(TSDBModel.project, [1, 2], dts[0], dts[-1], environment_id=1)
         assert results == {1: 0, 2: 0}
 
+    def test_write_buffer(self):
+        db = RedisTSDB(
+            rollups=((ONE_HOUR, 24),),
+            vnodes=64,
+            hosts={i - 6: {"db": i} for i in range(6, 9)},
+            write_buffer_interval_ms=60 * 1000,
+            write_buffer_max_operations=5,
+        )
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        epoch = int(to_timestamp(now)) - int(to_timestamp(now)) % ONE_HOUR
+        model = TSDBModel.users_affected_by_group
+
+        db.incr(TSDBModel.project, 1, now)
+        db.incr(TSDBModel.project, 1, now, count=2)
+        db.record(model, 1, ("foo", "bar"), now)
+        db.record(model, 1, ("bar", "baz"), now)
+
+        # nothing has been written yet
+        assert len(db.write_buffer) == 4
+        assert db.get_range(TSDBModel.project, [1], now, now) == {1: [(epoch, 0)]}
+        assert db.get_distinct_counts_totals(model, [1], now, now) == {1: 0}
+
+        db.write_buffer.flush()
+        assert len(db.write_buffer) == 0
+        assert db.get_range(TSDBModel.project, [1], now, now) == {1: [(epoch, 3)]}
+        assert db.get_distinct_counts_totals(model, [1], now, now) == {1: 3}
+
+        # reaching the maximum number of buffered operations flushes the buffer
+        db.incr_multi([(TSDBModel.project, i) for i in range(1, 6)], now)
+        assert len(db.write_buffer) == 0
+        assert db.get_range(TSDBModel.project, [1], now, now) == {1: [(epoch, 4)]}
+
+    def test_write_buffer_interval(self):
+        db = RedisTSDB(
+            rollups=((ONE_HOUR, 24),),
+            vnodes=64,
+            hosts={i - 6: {"db": i} for i in range(6, 9)},
+            write_buffer_interval_ms=50,
+        )
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        epoch = int(to_timestamp(now)) - int(to_timestamp(now)) % ONE_HOUR
+
+        db.incr(TSDBModel.project, 1, now)
+        # the background thread flushes the write once it is due
+        for _ in range(100):
+            if not len(db.write_buffer):
+                break
+            time.sleep(0.01)
+        assert len(db.write_buffer) == 0
+        assert db.get_range(TSDBModel.project, [1], now, now) == {1: [(epoch, 1)]}
+
+    def test_get_range_closed_bucket_cache(self):
+        now = datetime.utcnow().replace(tzinfo=pytz.UTC)
+        before = now - timedelta(hours=1)
+
+        def get_counts(**kwargs):
+            results = self.db.get_range(
+                TSDBModel.project, [1, 2], before, now, rollup=ONE_HOUR, **kwargs
+            )
+            return {key: [count for _, count in points] for key, points in results.items()}
+
+        self.db.incr(TSDBModel.project, 1, before)
+        self.db.incr(TSDBModel.project, 1, now)
+        with mock.patch("sentry.tsdb.redis.cache") as mock_cache:
+            mock_cache.get_many.return_value = {}
+            assert get_counts(use_cache=True) == {1: [1, 1], 2: [0, 0]}
+        # one cache entry per series, holding the counts of its closed buckets
+        assert len(mock_cache.get_many.call_args[0][0]) == 2
+        assert sorted(mock_cache.set_many.call_args[0][0].values()) == [[0], [1]]
+
+        assert get_counts(use_cache=True) == {1: [1, 1], 2: [0, 0]}
+
+        self.db.incr(TSDBModel.project, 1, before)
+        self.db.incr(TSDBModel.project, 1, now)
+        self.db.incr(TSDBModel.project, 2, before)
+        # only the bucket that has ended is served from the cache
+        assert get_counts(use_cache=True) == {1: [1, 2], 2: [0, 0]}
+        assert get_counts() == {1: [2, 2], 2: [1, 0]}
+
     def test_count_distinct(self):
         now = datetime.utcnow().replace(tzinfo=pytz.UTC) - timedelta(hours=4)
         dts = [now + timedelta(hours=i) for i in range(4)]
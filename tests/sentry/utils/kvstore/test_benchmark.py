@@ -0,0 +1,76 @@
+import itertools
+
+import pytest
+from redis import Redis
+
+from sentry.testutils.skips import requires_benchmark
+from sentry.utils.kvstore.redis import RedisKVStorage
+
+BATCH_SIZE = 100
+
+
+@pytest.fixture
+def store():
+    store = RedisKVStorage(Redis(db=6))
+    yield store
+    store.destroy()
+
+
+@pytest.fixture
+def keys():
+    counter = itertools.count()
+    return lambda: [f"kvstore/benchmark/{next(counter)}" for _ in range(BATCH_SIZE)]
+
+
+def write_single(store, keys):
+    for key in keys:
+        store.set(key, b"x" * 256)
+
+
+def write_batched(store, keys):
+    store.set_many([(key, b"x" * 256, None) for key in keys])
+
+
+def read_single(store, keys):
+    return [store.get(key) for key in keys]
+
+
+def read_batched(store, keys):
+    return list(store.get_many(keys))
+
+
+def delete_single(store, keys):
+    for key in keys:
+        store.delete(key)
+
+
+def delete_batched(store, keys):
+    store.delete_many(keys)
+
+
+@requires_benchmark
+@pytest.mark.parametrize("write", [write_single, write_batched], ids=["single", "batched"])
+def test_benchmark_set(store, keys, write, benchmark):
+    benchmark.pedantic(lambda k: write(store, k), setup=lambda: ((keys(),), {}), rounds=50)
+
+
+@requires_benchmark
+@pytest.mark.parametrize("read", [read_single, read_batched], ids=["single", "batched"])
+def test_benchmark_get(store, keys, read, benchmark):
+    def setup():
+        batch = keys()
+        write_batched(store, batch)
+        return (batch,), {}
+
+    benchmark.pedantic(lambda k: read(store, k), setup=setup, rounds=50)
+
+
+@requires_benchmark
+@pytest.mark.parametrize("delete", [delete_single, delete_batched], ids=["single", "batched"])
+def test_benchmark_delete(store, keys, delete, benchmark):
+    def setup():
+        batch = keys()
+        write_batched(store, batch)
+        return (batch,), {}
+
+    benchmark.pedantic(lambda k: delete(store, k), setup=setup, rounds=50)
@@ -125,3 +125,32 @@ def test_multiple_key_operations(properties: Properties) -> None:
     store.delete_many(all_keys)
 
     assert dict(store.get_many(all_keys)) == {}
+
+
+def test_set_many(properties: Properties) -> None:
+    store = properties.store
+
+    items = dict(itertools.islice(properties.items, 10))
+    keys = list(items.keys())
+
+    # Test writing a mix of items with and without TTLs.
+    store.set_many(
+        [
+            (key, value, timedelta(seconds=30) if i % 2 else None)
+            for i, (key, value) in enumerate(items.items())
+        ]
+    )
+    assert dict(store.get_many(keys)) == items
+
+    # Test overwriting existing items.
+    new_items = {key: next(properties.values) for key in keys[:5]}
+    store.set_many([(key, value, None) for key, value in new_items.items()])
+    assert dict(store.get_many(keys)) == {**items, **new_items}
+
+    # Test the empty cases.
+    store.set_many([])
+    assert dict(store.get_many([])) == {}
+    store.delete_many([])
+
+    store.delete_many(keys)
+    assert dict(store.get_many(keys)) == {}
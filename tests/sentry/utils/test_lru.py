@@ -0,0 +1,99 @@
+from unittest import mock
+
+from sentry.utils.lru import LRUCache
+
+
+def test_get_and_set():
+    cache = LRUCache(2)
+
+    assert cache.get("a") is None
+    assert cache.get("a", 1) == 1
+
+    cache.set("a", "A")
+    assert cache.get("a") == "A"
+    assert "a" in cache
+    assert len(cache) == 1
+
+
+def test_get_many():
+    cache = LRUCache(2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+
+    assert cache.get_many(["a", "c"]) == {"a": "A"}
+
+    # "a" was used by ``get_many``, so "b" is evicted first
+    cache.set("c", "C")
+    assert "a" in cache
+    assert "b" not in cache
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(2)
+    cache.set("a", "A")
+    cache.set("b", "B")
+
+    # touching "a" makes "b" the least recently used entry
+    assert cache.get("a") == "A"
+    cache.set("c", "C")
+
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+
+def test_weights():
+    cache = LRUCache(10)
+    cache.set("a", "A", weight=4)
+    cache.set("b", "B", weight=4)
+    assert cache.weight == 8
+
+    cache.set("c", "C", weight=4)
+    assert "a" not in cache
+    assert cache.weight == 8
+
+    # replacing an entry accounts for the previous weight
+    cache.set("b", "B", weight=1)
+    assert cache.weight == 5
+
+    # entries larger than the whole cache are not stored
+    cache.set("d", "D", weight=11)
+    assert "d" not in cache
+    assert cache.weight == 5
+
+    cache.delete("b")
+    assert cache.weight == 4
+
+    cache.clear()
+    assert cache.weight == 0
+    assert len(cache) == 0
+
+
+def test_callable_max_weight():
+    max_weight = [2]
+    cache = LRUCache(lambda: max_weight[0])
+    cache.set("a", "A")
+    cache.set("b", "B")
+
+    max_weight[0] = 1
+    cache.set("c", "C")
+    assert len(cache) == 1
+    assert "c" in cache
+
+
+@mock.patch("sentry.utils.lru.metrics")
+def test_metrics(mock_metrics):
+    cache = LRUCache(1, metrics_key="test.lru")
+    cache.get("a")
+    cache.set("a", "A")
+    cache.get("a")
+    cache.set("b", "B")
+    cache.get_many(["a", "b", "c"])
+
+    assert mock_metrics.incr.call_args_list == [
+        mock.call("test.lru.miss", amount=1, sample_rate=1.0),
+        mock.call("test.lru.hit", amount=1, sample_rate=1.0),
+        mock.call("test.lru.evict", amount=1, sample_rate=1.0),
+        mock.call("test.lru.hit", amount=1, sample_rate=1.0),
+        mock.call("test.lru.miss", amount=2, sample_rate=1.0),
+    ]
@@ -1,3 +1,5 @@
+import threading
+import time
 import unittest
 from datetime import datetime, timedelta
 from unittest import mock
@@ -5,18 +7,26 @@ from unittest import mock
 import pytest
 import pytz
 from django.utils import timezone
+from snuba_sdk.column import Column
+from snuba_sdk.entity import Entity
+from snuba_sdk.query import Query
 
 from sentry.models import GroupRelease, Project, Release
 from sentry.testutils import TestCase
+from sentry.utils import json
 from sentry.utils.snuba import (
     Dataset,
+    QueryDeadlineExceeded,
     SnubaQueryParams,
     UnqualifiedQueryError,
     _prepare_query_params,
+    _query_before_deadline,
+    bulk_snql_query,
     get_json_type,
     get_query_params_to_update_for_projects,
     get_snuba_column_name,
     get_snuba_translators,
+    iter_bulk_snql_query,
     quantize_time,
 )
 
@@ -354,3 +364,88 @@ class QuantizeTimeTest(unittest.TestCase):
                 break
 
         assert i != j
+
+
+def make_query(name):
+    return Query(dataset="events", match=Entity("events"), select=[Column(name)])
+
+
+def make_response(name):
+    return mock.Mock(status=200, data=json.dumps({"data": [{"name": name}]}).encode("utf-8"))
+
+
+class BulkSnqlQueryTest(unittest.TestCase):
+    def setUp(self):
+        self.queries = [make_query(name) for name in ("a", "b", "c")]
+
+    def run_query(self, params, timeout=None):
+        query, forward, reverse = params[0]
+        name = query.select[0].name
+        if name == "b":
+            raise QueryDeadlineExceeded("too slow")
+        return make_response(name), forward, reverse
+
+    @mock.patch("sentry.utils.snuba._snql_query")
+    def test_error_fails_request(self, snql_query):
+        snql_query.side_effect = self.run_query
+        with pytest.raises(QueryDeadlineExceeded):
+            bulk_snql_query(self.queries, timeout=1)
+
+    @mock.patch("sentry.utils.snuba._snql_query")
+    def test_partial_results(self, snql_query):
+        snql_query.side_effect = self.run_query
+        results = bulk_snql_query(self.queries, timeout=1, allow_partial=True)
+        assert [r and r["data"] for r in results] == [[{"name": "a"}], None, [{"name": "c"}]]
+        for call in snql_query.call_args_list:
+            assert 0 < call[1]["timeout"] <= 1
+
+    @mock.patch("sentry.utils.snuba._snql_query")
+    def test_deadline_while_running(self, snql_query):
+        released = threading.Event()
+
+        def run_query(params, timeout=None):
+            query, forward, reverse = params[0]
+            name = query.select[0].name
+            if name == "b":
+                # outlives the deadline of the request
+                released.wait(5)
+            return make_response(name), forward, reverse
+
+        snql_query.side_effect = run_query
+        try:
+            with pytest.raises(QueryDeadlineExceeded):
+                bulk_snql_query(self.queries, timeout=0.1)
+
+            results = bulk_snql_query(self.queries, timeout=0.1, allow_partial=True)
+            assert [r and r["data"] for r in results] == [[{"name": "a"}], None, [{"name": "c"}]]
+        finally:
+            released.set()
+
+    @mock.patch("sentry.utils.snuba._snql_query")
+    def test_iter_yields_in_completion_order(self, snql_query):
+        started = threading.Event()
+        first_consumed = threading.Event()
+
+        def run_query(params, timeout=None):
+            query, forward, reverse = params[0]
+            name = query.select[0].name
+            if name == "a":
+                started.set()
+                # only completes once the other result has been handed out
+                assert first_consumed.wait(5)
+            return make_response(name), forward, reverse
+
+        snql_query.side_effect = run_query
+        results = iter_bulk_snql_query(self.queries[:2])
+        # the queries run before the first result is requested
+        assert started.wait(5)
+        assert next(results)[0] == 1
+        first_consumed.set()
+        assert next(results)[0] == 0
+        assert list(results) == []
+
+    def test_deadline_before_start(self):
+        query_fn = mock.Mock()
+        with pytest.raises(QueryDeadlineExceeded):
+            _query_before_deadline(query_fn, (), time.time() - 1)
+        assert not query_fn.called
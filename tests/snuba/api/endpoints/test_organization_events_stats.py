@@ -670,7 +670,7 @@ class OrganizationEventsStatsEndpointTest(APITestCase, SnubaTestCase):
 
         assert mock_query.call_count == 1
 
-    @mock.patch("sentry.snuba.discover.bulk_raw_query", return_value=[{"data": []}])
+    @mock.patch("sentry.snuba.discover.iter_bulk_raw_query", return_value=[(0, {"data": []})])
     def test_invalid_interval(self, mock_query):
         self.do_request(
             data={
@@ -847,7 +847,7 @@ class OrganizationEventsStatsEndpointTestWithSnql(OrganizationEventsStatsEndpoin
         self.features["organizations:discover-use-snql"] = True
 
     # Separate test for now to keep the patching simpler
-    @mock.patch("sentry.snuba.discover.bulk_snql_query", return_value=[{"data": []}])
+    @mock.patch("sentry.snuba.discover.iter_bulk_snql_query", return_value=[(0, {"data": []})])
     def test_invalid_interval(self, mock_query):
         self.do_request(
             data={
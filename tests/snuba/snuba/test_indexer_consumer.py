@@ -78,17 +78,18 @@ class MetricsIndexerWorkerTest(TestCase):
         mock_message.value = MagicMock(return_value=json.dumps(metrics_payload))
 
         parsed = metrics_worker.process_message(mock_message)
-        assert parsed["tags"] == {
-            PGStringIndexer().resolve(string=k): PGStringIndexer().resolve(string=str(v))
-            for k, v in payload["tags"].items()
-        }
-        assert parsed["metric_id"] == PGStringIndexer().resolve(string=payload["name"])
+        assert parsed == metrics_payload
 
         if with_exception:
             with pytest.raises(Exception, match="didn't get all the callbacks: 1 left"):
                 metrics_worker.flush_batch([parsed])
         else:
             metrics_worker.flush_batch([parsed])
+            assert parsed["tags"] == {
+                PGStringIndexer().resolve(string=k): PGStringIndexer().resolve(string=str(v))
+                for k, v in payload["tags"].items()
+            }
+            assert parsed["metric_id"] == PGStringIndexer().resolve(string=payload["name"])
             producer.produce.assert_called_with(
                 topic="snuba-metrics",
                 key=None,
@@ -96,6 +97,46 @@ class MetricsIndexerWorkerTest(TestCase):
                 on_delivery=metrics_worker.callback,
             )
 
+    @pytest.mark.django_db
+    @patch("sentry.sentry_metrics.indexer.indexer_consumer.process_indexed_metrics")
+    @patch("confluent_kafka.Producer")
+    def test_resolves_whole_batch_at_once(self, producer, mock_task):
+        producer.flush = MagicMock(return_value=0)
+        metrics_worker = MetricsIndexerWorker(producer=producer)
+
+        batch = []
+        for release in ("sentry-test@1.0.2", "sentry-test@1.0.3"):
+            mock_message = Mock()
+            mock_message.value = MagicMock(
+                return_value=json.dumps(
+                    {**payload, "tags": {**payload["tags"], "release": release}}
+                )
+            )
+            batch.append(metrics_worker.process_message(mock_message))
+
+        with patch(
+            "sentry.sentry_metrics.indexer.indexer_consumer.indexer.bulk_record",
+            wraps=PGStringIndexer().bulk_record,
+        ) as bulk_record:
+            metrics_worker.flush_batch(batch)
+
+        assert bulk_record.call_count == 1
+        assert set(bulk_record.call_args[0][0]) == {
+            "session",
+            "environment",
+            "production",
+            "release",
+            "sentry-test@1.0.2",
+            "sentry-test@1.0.3",
+            "session.status",
+            "init",
+        }
+        assert [message["tags"][PGStringIndexer().resolve("release")] for message in batch] == [
+            PGStringIndexer().resolve("sentry-test@1.0.2"),
+            PGStringIndexer().resolve("sentry-test@1.0.3"),
+        ]
+        assert producer.produce.call_count == 2
+
 
 class MetricsIndexerConsumerTest(TestCase):
     def _get_producer(self, topic):